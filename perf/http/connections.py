@@ -0,0 +1,126 @@
+'''
+Compare `HttpServer` (one thread per connection) with `AsyncHttpServer` (single event loop) at high connection counts.
+For each server mode and connection count, the server runs in a subprocess.
+The client opens the connections, makes one request on each so that they are all established keep-alive connections,
+then reports the server's thread count and resident memory,
+and the throughput of keep-alive requests spread across all connections.
+
+Usage: connections.py [-connections N ...] [-requests N]
+Linux only: thread counts and memory are read from /proc.
+'''
+
+import resource
+from argparse import ArgumentParser
+from asyncio import gather, open_connection, run as asyncio_run, StreamReader, StreamWriter, wait_for
+from os import devnull
+from subprocess import PIPE, Popen
+from sys import argv, executable
+from threading import Thread
+from time import perf_counter
+from typing import IO
+
+from pithy.http.server import AsyncHttpServer, HttpServer
+from pithy.web import Request, Response
+from pithy.web.app import WebApp
+
+
+modes = ('threaded', 'async')
+
+
+def main() -> None:
+  if len(argv) == 3 and argv[1] == '--serve':
+    serve(argv[2])
+    return
+
+  parser = ArgumentParser(description='Compare pithy HTTP server modes at high connection counts.')
+  parser.add_argument('-connections', type=int, nargs='+', default=[100, 1_000, 4_000])
+  parser.add_argument('-requests', type=int, default=20_000, help='Total keep-alive requests per measurement.')
+  parser.add_argument('-timeout', type=float, default=120, help='Seconds before a measurement is abandoned.')
+  args = parser.parse_args()
+
+  # Each connection needs a file descriptor in both the client and server processes.
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+  resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+  print(f'{"mode":8}  {"conns":>6}  {"threads":>7}  {"RSS MB":>7}  {"req/s":>9}')
+  for n in args.connections:
+    for mode in modes:
+      proc = Popen([executable, __file__, '--serve', mode], stdout=PIPE, text=True)
+      try:
+        assert proc.stdout is not None
+        port = read_port(proc.stdout)
+        threads, rss, rate = asyncio_run(wait_for(measure(proc.pid, port, n, args.requests), args.timeout))
+        print(f'{mode:8}  {n:6}  {threads:7}  {rss/1024:7.1f}  {rate:9,.0f}', flush=True)
+      except TimeoutError:
+        print(f'{mode:8}  {n:6}  timed out after {args.timeout} seconds', flush=True)
+      except OSError as e:
+        print(f'{mode:8}  {n:6}  failed: {e}', flush=True)
+      finally:
+        proc.kill()
+        proc.wait()
+
+
+async def measure(pid:int, port:int, n:int, requests:int) -> tuple[int,int,float]:
+  conns = [await open_connection('127.0.0.1', port) for _ in range(n)]
+  try:
+    await gather(*(request(r, w) for r, w in conns))
+    status = read_proc_status(pid)
+    threads = int(status['Threads'])
+    rss = int(status['VmRSS'].split()[0]) # kB.
+
+    per_conn = max(1, requests // n)
+    async def drive(r:StreamReader, w:StreamWriter) -> None:
+      for _ in range(per_conn): await request(r, w)
+
+    t0 = perf_counter()
+    await gather(*(drive(r, w) for r, w in conns))
+    elapsed = perf_counter() - t0
+    return threads, rss, per_conn * n / elapsed
+  finally:
+    for _, w in conns: w.close()
+
+
+async def request(reader:StreamReader, writer:StreamWriter) -> None:
+  writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+  head = await reader.readuntil(b'\r\n\r\n')
+  length = 0
+  for line in head.split(b'\r\n'):
+    if line.lower().startswith(b'content-length:'): length = int(line.split(b':', 1)[1])
+  await reader.readexactly(length)
+
+
+def read_port(out:IO[str]) -> int:
+  'Read the port printed by the server subprocess, skipping the servers\' own startup messages.'
+  for line in out:
+    if line.strip().isdigit(): return int(line)
+  raise OSError('server exited before printing its port')
+
+
+def read_proc_status(pid:int) -> dict[str,str]:
+  with open(f'/proc/{pid}/status') as f:
+    return dict(line.rstrip('\n').split(':\t', 1) for line in f if ':\t' in line)
+
+
+class OkApp(WebApp):
+  def handle_request(self, request:Request) -> Response:
+    return Response(body=b'ok', media_type='text/plain')
+
+
+def serve(mode:str) -> None:
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+  resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+  err = open(devnull, 'w')
+  app = OkApp()
+  if mode == 'threaded':
+    threaded = HttpServer(host='127.0.0.1', port=0, app=app, err=err)
+    print(threaded.server_address[1], flush=True)
+    threaded.serve_forever()
+  elif mode == 'async':
+    server = AsyncHttpServer(host='127.0.0.1', port=0, app=app, err=err, idle_timeout=600)
+    Thread(target=lambda: (server.ready.wait(), print(server.bound_port, flush=True)), daemon=True).start()
+    server.serve_forever()
+  else:
+    raise ValueError(mode)
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,292 @@
+'''
+Load test the pithy HTTP servers on localhost.
+
+Each server mode (`HttpServer`, `AsyncHttpServer`) runs in a subprocess, serving one of two apps:
+* echo: `EchoApp`; requests PUT a body of the given size.
+* static: a `WebApp` serving local files; requests GET a file of the given size.
+
+For each combination of mode, app, body size, connection count and keep-alive setting,
+client processes drive the server with concurrent asyncio connections, each making requests back to back.
+Without keep-alive, every request opens a new connection and sends `Connection: close`.
+The report shows throughput, p50 and p99 latency, and the server's CPU time (user + system) per request.
+
+Results are appended as JSON lines to the `-results` file, tagged with the git commit and working tree state,
+and each measurement is compared with the latest result for the same scenario from a different commit.
+
+Usage: load.py [-modes M ...] [-apps A ...] [-sizes N ...] [-connections N ...] [-keep-alive on|off ...] [-requests N]
+Linux only: server CPU time is read from /proc.
+'''
+
+import json
+import resource
+from argparse import ArgumentParser
+from asyncio import gather, open_connection, run as asyncio_run, StreamReader, StreamWriter, wait_for
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as DateTime
+from itertools import product
+from os import cpu_count, devnull, makedirs, sysconf
+from os.path import abspath, dirname, exists as path_exists, join as path_join
+from platform import node as platform_node, python_version
+from statistics import quantiles
+from subprocess import CalledProcessError, PIPE, Popen, run
+from sys import argv, executable
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter
+from typing import Any, IO, NamedTuple
+
+from pithy.http.server import AsyncHttpServer, HttpServer
+from pithy.web import Request, Response
+from pithy.web.app import WebApp
+from pithy.web.echoapp import EchoApp
+
+
+modes = ('threaded', 'async')
+apps = ('echo', 'static')
+
+clock_ticks_per_second = sysconf('SC_CLK_TCK')
+
+
+class Scenario(NamedTuple):
+  mode:str
+  app:str
+  size:int
+  connections:int
+  keep_alive:bool
+
+  @property
+  def key(self) -> str:
+    return f'{self.mode}/{self.app}/{self.size}B/{self.connections}c/{"ka" if self.keep_alive else "close"}'
+
+
+class ClientResult(NamedTuple):
+  latencies:list[float] # Seconds.
+  errors:int
+  elapsed:float
+
+
+def main() -> None:
+  if len(argv) == 5 and argv[1] == '--serve':
+    serve(mode=argv[2], app_name=argv[3], static_dir=argv[4])
+    return
+
+  parser = ArgumentParser(description='Load test the pithy HTTP servers.')
+  parser.add_argument('-modes', nargs='+', choices=modes, default=modes)
+  parser.add_argument('-apps', nargs='+', choices=apps, default=apps)
+  parser.add_argument('-sizes', type=int, nargs='+', default=[64, 1<<16],
+    help='Request body sizes for echo; response body sizes for static.')
+  parser.add_argument('-connections', type=int, nargs='+', default=[1, 16, 64])
+  parser.add_argument('-keep-alive', nargs='+', choices=('on', 'off'), default=['on', 'off'])
+  parser.add_argument('-requests', type=int, default=4000, help='Total requests per measurement.')
+  parser.add_argument('-warmup', type=int, default=200, help='Requests made before each measurement.')
+  parser.add_argument('-clients', type=int, default=max(1, (cpu_count() or 1) // 2), help='Number of client processes.')
+  parser.add_argument('-timeout', type=float, default=120, help='Seconds before a measurement is abandoned.')
+  parser.add_argument('-results', default='_build/perf-http.jsonl', help='JSON lines file to append results to.')
+  parser.add_argument('-no-save', action='store_true', help='Do not append results to the results file.')
+  args = parser.parse_args()
+
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+  resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+  commit = git_describe()
+  previous = load_previous_results(args.results, commit)
+  scenarios = [Scenario(*s) for s in product(args.modes, args.apps, args.sizes, args.connections,
+    [ka == 'on' for ka in args.keep_alive])]
+
+  print(f'commit: {commit}; clients: {args.clients}; requests: {args.requests}.')
+  print(f'{"scenario":36}  {"req/s":>9}  {"p50 ms":>8}  {"p99 ms":>8}  {"CPU µs/req":>10}  {"errors":>6}  {"vs prev":>7}')
+  with TemporaryDirectory() as static_dir, ProcessPoolExecutor(max_workers=args.clients) as executor:
+    for size in args.sizes:
+      with open(path_join(static_dir, f'{size}.bin'), 'wb') as f: f.write(b'x' * size)
+    for scenario in scenarios:
+      try: result = measure(executor, scenario, static_dir=static_dir, requests=args.requests, warmup=args.warmup,
+        clients=args.clients, timeout=args.timeout)
+      except (OSError, TimeoutError) as e:
+        print(f'{scenario.key:36}  failed: {e!r}', flush=True)
+        continue
+      prev = previous.get(scenario.key)
+      change = f'{result["throughput"] / prev["throughput"] - 1:+.0%}' if prev else ''
+      print(f'{scenario.key:36}  {result["throughput"]:9,.0f}  {result["p50_ms"]:8.2f}  {result["p99_ms"]:8.2f}  '
+        f'{result["cpu_us_per_request"]:10,.0f}  {result["errors"]:6}  {change:>7}', flush=True)
+      if not args.no_save:
+        record = dict(commit=commit, time=DateTime.now().isoformat(timespec='seconds'), host=platform_node(),
+          python=python_version(), clients=args.clients, scenario=scenario.key, **scenario._asdict(), **result)
+        save_result(args.results, record)
+
+
+def measure(executor:ProcessPoolExecutor, scenario:Scenario, static_dir:str, requests:int, warmup:int, clients:int,
+ timeout:float) -> dict[str,Any]:
+  proc = Popen([executable, __file__, '--serve', scenario.mode, scenario.app, static_dir], stdout=PIPE, text=True)
+  try:
+    assert proc.stdout is not None
+    port = read_port(proc.stdout)
+    if scenario.app == 'echo':
+      method = 'PUT'
+      path = '/'
+      body = b'x' * scenario.size
+    else:
+      method = 'GET'
+      path = f'/{scenario.size}.bin'
+      body = b''
+    head = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'.encode()
+    if not scenario.keep_alive: head += b'Connection: close\r\n'
+    request = head + b'\r\n' + body
+
+    conns = [scenario.connections // clients + (i < scenario.connections % clients) for i in range(clients)]
+    conns = [c for c in conns if c]
+
+    def run_clients(total:int) -> list[ClientResult]:
+      futures = [executor.submit(run_client, port, request, c, max(1, total * c // scenario.connections),
+        scenario.keep_alive, timeout) for c in conns]
+      return [f.result(timeout=timeout + 5) for f in futures]
+
+    run_clients(warmup)
+    cpu0 = read_proc_cpu_seconds(proc.pid)
+    results = run_clients(requests)
+    cpu = read_proc_cpu_seconds(proc.pid) - cpu0
+  finally:
+    proc.kill()
+    proc.wait()
+
+  latencies = sorted(l for r in results for l in r.latencies)
+  count = len(latencies)
+  if count < 2: raise OSError('too few successful requests')
+  q = quantiles(latencies, n=100, method='inclusive')
+  return dict(
+    requests=count,
+    errors=sum(r.errors for r in results),
+    throughput=count / max(r.elapsed for r in results),
+    p50_ms=q[49] * 1e3,
+    p99_ms=q[98] * 1e3,
+    cpu_us_per_request=cpu / count * 1e6)
+
+
+def run_client(port:int, request:bytes, connections:int, requests:int, keep_alive:bool, timeout:float) -> ClientResult:
+  'Run in a client process: make `requests` requests spread over `connections` concurrent connections.'
+  return asyncio_run(wait_for(drive(port, request, connections, requests, keep_alive), timeout))
+
+
+async def drive(port:int, request:bytes, connections:int, requests:int, keep_alive:bool) -> ClientResult:
+  latencies:list[float] = []
+  errors = 0
+  per_conn = max(1, requests // connections)
+
+  async def conn_loop() -> None:
+    nonlocal errors
+    rw:tuple[StreamReader,StreamWriter]|None = None
+    for _ in range(per_conn):
+      t0 = perf_counter()
+      try:
+        if rw is None: rw = await open_connection('127.0.0.1', port)
+        reader, writer = rw
+        writer.write(request)
+        status, close = await read_response(reader)
+        if not keep_alive or close:
+          writer.close()
+          rw = None
+      except (ConnectionError, OSError, EOFError):
+        errors += 1
+        if rw is not None: rw[1].close()
+        rw = None
+        continue
+      latencies.append(perf_counter() - t0)
+      if status >= 400: errors += 1
+    if rw is not None: rw[1].close()
+
+  t0 = perf_counter()
+  await gather(*(conn_loop() for _ in range(connections)))
+  return ClientResult(latencies=latencies, errors=errors, elapsed=perf_counter() - t0)
+
+
+async def read_response(reader:StreamReader) -> tuple[int,bool]:
+  'Read a response; return the status code and whether the server will close the connection.'
+  head = await reader.readuntil(b'\r\n\r\n')
+  lines = head.split(b'\r\n')
+  status = int(lines[0].split()[1])
+  length = 0
+  chunked = False
+  close = False
+  for line in lines[1:]:
+    name, _, val = line.partition(b':')
+    name = name.strip().lower()
+    if name == b'content-length': length = int(val)
+    elif name == b'transfer-encoding': chunked = b'chunked' in val.lower()
+    elif name == b'connection': close = b'close' in val.lower()
+  if chunked:
+    while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+      await reader.readexactly(size + 2)
+    await reader.readuntil(b'\r\n')
+  else:
+    await reader.readexactly(length)
+  return status, close
+
+
+def read_port(out:IO[str]) -> int:
+  'Read the port printed by the server subprocess, skipping the servers\' own startup messages.'
+  for line in out:
+    if line.strip().isdigit(): return int(line)
+  raise OSError('server exited before printing its port')
+
+
+def read_proc_cpu_seconds(pid:int) -> float:
+  'Return the user plus system CPU time of a process.'
+  with open(f'/proc/{pid}/stat') as f: stat = f.read()
+  fields = stat[stat.rindex(')') + 2:].split() # The command name may contain spaces.
+  return (int(fields[11]) + int(fields[12])) / clock_ticks_per_second # utime and stime are fields 14 and 15.
+
+
+def git_describe() -> str:
+  'Return the short commit hash of this repository, with a "-dirty" suffix if there are uncommitted changes.'
+  repo_dir = dirname(abspath(__file__))
+  try:
+    commit = run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir, capture_output=True, text=True, check=True
+      ).stdout.strip()
+    dirty = run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir, capture_output=True, text=True
+      ).stdout.strip()
+  except (OSError, CalledProcessError):
+    return 'unknown'
+  return commit + ('-dirty' if dirty else '')
+
+
+def load_previous_results(path:str, commit:str) -> dict[str,dict[str,Any]]:
+  'Return the latest recorded result for each scenario from commits other than `commit`.'
+  previous:dict[str,dict[str,Any]] = {}
+  if not path_exists(path): return previous
+  with open(path) as f:
+    for line in f:
+      record = json.loads(line)
+      if record['commit'] != commit: previous[record['scenario']] = record
+  return previous
+
+
+def save_result(path:str, record:dict[str,Any]) -> None:
+  if dir := dirname(path): makedirs(dir, exist_ok=True)
+  with open(path, 'a') as f: print(json.dumps(record), file=f)
+
+
+class StaticApp(WebApp):
+  def handle_request(self, request:Request) -> Response:
+    return self.serve_content_from_local_fs(request)
+
+
+def serve(mode:str, app_name:str, static_dir:str) -> None:
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+  resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+  err = open(devnull, 'w')
+  app:WebApp
+  if app_name == 'echo': app = EchoApp()
+  elif app_name == 'static': app = StaticApp(local_dir=static_dir)
+  else: raise ValueError(app_name)
+  if mode == 'threaded':
+    threaded = HttpServer(host='127.0.0.1', port=0, app=app, err=err)
+    print(threaded.server_address[1], flush=True)
+    threaded.serve_forever()
+  elif mode == 'async':
+    server = AsyncHttpServer(host='127.0.0.1', port=0, app=app, err=err, idle_timeout=600)
+    Thread(target=lambda: (server.ready.wait(), print(server.bound_port, flush=True)), daemon=True).start()
+    server.serve_forever()
+  else:
+    raise ValueError(mode)
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,22 @@
+from math import sin
+from time import perf_counter
+
+from pithy.html.charts import BarSeries, chart_figure
+
+
+def main() -> None:
+  for n in [1_000, 10_000, 100_000]:
+    points = [(i, sin(i / 100) * 100 + (i % 37)) for i in range(n)]
+    print(f'\npoints: {n:,}')
+    for max_points in [None, 1_000]:
+      t0 = perf_counter()
+      fig = chart_figure(max_points=max_points, series=[BarSeries(name='s', points=points)])
+      t1 = perf_counter()
+      text = fig.render_str()
+      t2 = perf_counter()
+      node_count = sum(1 for _ in fig.find_all())
+      print(f'max_points={max_points!s:5}: nodes: {node_count:7,}; html: {len(text):10,} bytes; '
+        f'build: {(t1-t0)*1000:8.1f} ms; render: {(t2-t1)*1000:8.1f} ms')
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,39 @@
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from timeit import repeat
+
+from pithy.html import HtmlNode
+from pithy.html.loader import load_html_cached
+
+from markup_render import build_report
+
+
+def main() -> None:
+
+  for rows in [100, 1_000, 10_000]:
+    text = build_report(rows=rows, cols=10).render_str()
+    html = HtmlNode.parse(text)
+    f = BytesIO()
+    html.dump_bin(f)
+    data = f.getvalue()
+    assert HtmlNode.load_bin(BytesIO(data)) == html
+    print(f'\nrows: {rows}; html: {len(text):,} bytes; binary: {len(data):,} bytes')
+
+    reps = max(1, 10_000 // rows)
+    for name, fn in [
+      ('parse', lambda: HtmlNode.parse(text)),
+      ('load_bin', lambda: HtmlNode.load_bin(BytesIO(data))),
+      ('dump_bin', lambda: html.dump_bin(BytesIO()))]:
+      times = sorted(repeat(stmt=fn, number=reps, repeat=5))
+      print(f'{name:16}: {times[0]/reps*1000:9.3f} ms  {times[1]/reps*1000:9.3f} ms  {times[2]/reps*1000:9.3f} ms')
+
+  print('\nload_html_cached, 1000 rows: first call parses and writes the cache; later calls load it.')
+  with TemporaryDirectory() as tmp_dir:
+    path = f'{tmp_dir}/report.html'
+    with open(path, 'w') as f: f.write(build_report(rows=1_000, cols=10).render_str())
+    cold = repeat(stmt=lambda: load_html_cached(path, cache_dir=tmp_dir), number=1, repeat=1)[0]
+    warm = sorted(repeat(stmt=lambda: load_html_cached(path, cache_dir=tmp_dir), number=10, repeat=5))[0] / 10
+    print(f'{"cold":16}: {cold*1000:9.3f} ms\n{"warm":16}: {warm*1000:9.3f} ms')
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,31 @@
+from time import perf_counter
+
+from pithy.html import Div, HtmlNode
+
+from markup_render import build_report
+
+
+def main() -> None:
+  for rows in [1_000, 10_000]:
+    text = build_report(rows=rows, cols=10).render_str()
+    html = HtmlNode.parse(text)
+    print(f'\nrows: {rows:,}')
+
+    t0 = perf_counter()
+    stats = html.clean()
+    t1 = perf_counter()
+    print(f'{"first clean":16}: {(t1-t0)*1000:9.1f} ms  {stats}')
+
+    html.body.append(Div('  appended  '))
+    t0 = perf_counter()
+    stats = html.clean()
+    t1 = perf_counter()
+    print(f'{"after mutation":16}: {(t1-t0)*1000:9.1f} ms  {stats}')
+
+    t0 = perf_counter()
+    stats = html.clean(force=True)
+    t1 = perf_counter()
+    print(f'{"forced":16}: {(t1-t0)*1000:9.1f} ms  {stats}')
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,38 @@
+from timeit import repeat
+
+from pithy.html import A, Body, Div, Head, Html, P, Span
+from pithy.markup import MuIndex
+
+
+def main() -> None:
+
+  html = build_page(rows=5_000)
+  node_count = sum(1 for _ in html.find_all())
+  print(f'nodes: {node_count:,}')
+
+  queries = [
+    ('find id', lambda: html.find('p', id='p4321')),
+    ('find_all tag+cl', lambda: sum(1 for _ in html.find_all('span', cl='warn'))),
+    ('find_first cl', lambda: html.find_first(cl='footer')),
+  ]
+
+  for name, fn in queries:
+    html._index = None # Lookups from the root walk the tree when the root is not indexed.
+    walk_times = sorted(repeat(stmt=fn, number=20, repeat=3))
+    html.index()
+    index_times = sorted(repeat(stmt=fn, number=20, repeat=3))
+    print(f'{name:16}: walk {walk_times[0]/20*1000:9.3f} ms;  indexed {index_times[0]/20*1000:9.3f} ms')
+
+  build_times = sorted(repeat(stmt=lambda: MuIndex(html), number=5, repeat=3))
+  print(f'{"index build":16}: {build_times[0]/5*1000:9.3f} ms')
+
+
+def build_page(rows:int) -> Html:
+  body = Body()
+  for r in range(rows):
+    body.append(Div(P(Span(f'row {r}', cl='warn' if r % 50 == 0 else 'ok'), id=f'p{r}'), A('link', href=f'/{r}'), cl='row'))
+  body.append(Div('end', cl='footer'))
+  return Html(Head(), body)
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,57 @@
+from io import StringIO
+from timeit import repeat
+
+from pithy.html import A, Body, Div, Html, Li, Nav, Table, Tbody, Td, Th, Thead, Tr, Ul
+
+
+def main() -> None:
+
+  for rows in [100, 1_000, 10_000]:
+    html = build_report(rows=rows, cols=10)
+    node_count = sum(1 for _ in html.find_all())
+    print(f'\nrows: {rows}; nodes: {node_count:,}')
+
+    legacy = lambda: html.render_prefix + ''.join(html._render()) + '\n'
+    #^ The recursive generator renderer, which `render_str` replaces.
+    assert legacy() == html.render_str()
+
+    def render_to() -> None: html.render_to(StringIO())
+
+    reps = max(1, 100_000 // node_count)
+    for name, fn in [('legacy _render', legacy), ('render_str', html.render_str), ('render_to', render_to)]:
+      times = repeat(stmt=fn, number=reps, repeat=5)
+      times.sort()
+      print(f'{name:16}: {times[0]/reps*1000:9.3f} ms  {times[1]/reps*1000:9.3f} ms  {times[2]/reps*1000:9.3f} ms')
+
+  print('\nPage with a 500-link nav bar and 20 rows; the nav is either rebuilt per page or frozen once.')
+  frozen_nav = build_nav(links=500).freeze()
+  for name, fn in [
+    ('rebuilt nav', lambda: page_with_nav(build_nav(links=500)).render_str()),
+    ('frozen nav', lambda: page_with_nav(frozen_nav).render_str())]:
+    times = sorted(repeat(stmt=fn, number=100, repeat=5))
+    print(f'{name:16}: {times[0]/100*1000:9.3f} ms  {times[1]/100*1000:9.3f} ms  {times[2]/100*1000:9.3f} ms')
+
+
+def build_report(rows:int, cols:int) -> Html:
+  html = Html.doc(title='Report')
+  body:Body = html.body
+  table = body.append(Table(cl='report'))
+  table.append(Thead(Tr(*[Th(f'Column {c}') for c in range(cols)])))
+  tbody = table.append(Tbody())
+  for r in range(rows):
+    tbody.append(Tr(id=f'r{r}', cl='odd' if r % 2 else 'even',
+      _=[Td(Div(f'{r}.{c} & <{c}>', data_value=r*c), cl='cell', style='text-align:right') for c in range(cols)]))
+  return html
+
+
+def build_nav(links:int) -> Nav:
+  return Nav(Ul(_=[Li(A(f'Page {i}', href=f'/pages/{i}', cl='nav-link')) for i in range(links)]), cl='site-nav')
+
+
+def page_with_nav(nav:Nav) -> Html:
+  html = build_report(rows=20, cols=10)
+  html.body._.insert(0, nav)
+  return html
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,29 @@
+from timeit import repeat
+
+from pithy.html import Table, Tbody, Td, Tr
+
+
+def main() -> None:
+  rows = [(i, f'name {i}', i * 1.5, None if i % 7 else 'x', f'https://example.com/{i}') for i in range(10_000)]
+  print(f'rows: {len(rows):,}; cells: {len(rows) * len(rows[0]):,}')
+
+  def cell_init(val:object) -> Td:
+    if val is None: return Td(cl='null', _='NULL')
+    return Td(_=str(val))
+
+  def cell_raw(val:object) -> Td:
+    if val is None: return Td.raw({'class': 'null'}, ['NULL'])
+    return Td.raw(children=[str(val)])
+
+  def build_rows() -> Table: return Table().rows([cell_init(v) for v in row] for row in rows)
+  def build_init() -> Table: return Table(Tbody(_=[Tr(_=[cell_init(v) for v in row]) for row in rows]))
+  def build_from_rows() -> Table: return Table.from_rows(rows, cell_raw)
+
+  expected = build_init().render_str()
+  for name, fn in [('Table.rows', build_rows), ('Tr/Td __init__', build_init), ('Table.from_rows', build_from_rows)]:
+    assert fn().render_str() == expected, name
+    times = sorted(repeat(stmt=fn, number=1, repeat=5))
+    print(f'{name:16}: {times[0]*1000:9.1f} ms  {times[1]*1000:9.1f} ms  {times[2]*1000:9.1f} ms')
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,34 @@
+from array import array
+from math import cos, sin
+from timeit import repeat
+
+from pithy.svg import Path, Polyline
+
+
+def main() -> None:
+  n = 100_000
+  coords = array('d')
+  for i in range(n):
+    t = i / 100
+    coords.append(5000 + 4000 * cos(t / 10) + 3 * sin(t * 7))
+    coords.append(5000 + 4000 * sin(t / 10) + 3 * cos(t * 5))
+  pairs = list(zip(coords[0::2], coords[1::2]))
+  cmds = [('M', *pairs[0]), *(('L', x, y) for x, y in pairs[1:])]
+  print(f'points: {n:,}')
+
+  for name, fn in [
+    ('polyline pairs', lambda: Polyline(points=pairs)),
+    ('polyline array', lambda: Polyline(points=coords)),
+    ('polyline array p=1', lambda: Polyline(points=coords, precision=1)),
+    ('polyline array p=1 t=0.5', lambda: Polyline(points=coords, precision=1, tolerance=0.5)),
+    ('path', lambda: Path(d=cmds)),
+    ('path p=1 rel', lambda: Path(d=cmds, precision=1, relative=True)),
+    ('path p=1 rel t=0.5', lambda: Path(d=cmds, precision=1, relative=True, tolerance=0.5)),
+  ]:
+    node = fn()
+    size = len(node.render_str())
+    t = min(repeat(stmt=fn, number=1, repeat=3))
+    print(f'{name:26}: {size:11,} bytes  {t*1000:9.1f} ms')
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,52 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+In-process compression for the formats that `pithytools/bin/pack.py` produces with command line tools.
+The codec modules are imported lazily: brotli is a third party package, and `compression.zstd` requires Python 3.14.
+'''
+
+from typing import Callable, cast
+
+
+CompressFn = Callable[[bytes, int|None], bytes]
+
+
+default_levels = {
+  '.br'  : 5,
+  '.gz'  : 5,
+  '.xz'  : 4,
+  '.zst' : 6,
+}
+
+
+def compress_br(data:bytes, level:int|None=None) -> bytes:
+  from brotli import compress # type: ignore[import-untyped]
+  return cast(bytes, compress(data, quality=default_levels['.br'] if level is None else level))
+
+def compress_gz(data:bytes, level:int|None=None) -> bytes:
+  from gzip import compress
+  return compress(data, compresslevel=default_levels['.gz'] if level is None else level, mtime=0)
+  #^ A zero mtime makes the output deterministic.
+
+def compress_xz(data:bytes, level:int|None=None) -> bytes:
+  from lzma import compress
+  return compress(data, preset=default_levels['.xz'] if level is None else level)
+
+def compress_zst(data:bytes, level:int|None=None) -> bytes:
+  from compression.zstd import compress
+  return compress(data, level=default_levels['.zst'] if level is None else level)
+
+
+compress_fns:dict[str,CompressFn] = {
+  '.br'  : compress_br,
+  '.gz'  : compress_gz,
+  '.xz'  : compress_xz,
+  '.zst' : compress_zst,
+}
+
+
+def compress_fn_available(ext:str) -> bool:
+  'Return True if the codec for `ext` can be imported in this environment.'
+  try: compress_fns[ext](b'', None)
+  except ImportError: return False
+  return True
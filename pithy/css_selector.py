@@ -0,0 +1,411 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+CSS selector parsing and matching for `Mu` trees.
+
+Supported syntax:
+* type (`div`), universal (`*`), id (`#main`), and class (`.item`) selectors;
+* attribute selectors: `[k]`, `[k=v]`, `[k~=v]`, `[k|=v]`, `[k^=v]`, `[k$=v]`, `[k*=v]`, with an optional `i` flag;
+* descendant (` `), child (`>`), next-sibling (`+`), and subsequent-sibling (`~`) combinators;
+* selector lists (`a, b`);
+* pseudo-classes: `:first-child`, `:last-child`, `:only-child`, `:nth-child()`, `:nth-last-child()`,
+  `:first-of-type`, `:last-of-type`, `:only-of-type`, `:nth-of-type()`, `:nth-last-of-type()`,
+  `:empty`, `:root`, `:not()`, `:is()`, and `:where()`.
+
+Selectors are parsed once and cached by selector string.
+Matching proceeds right to left, as in browsers: each node is first tested against the rightmost compound selector,
+and only then are its ancestors and siblings tested against the remaining compounds.
+Selection is scoped to the subtree of the node on which `select` is called:
+that node can match as an ancestor or as `:root`, but it is never itself a result.
+If the tree has been indexed with `Mu.index`, the rightmost compound's tag, class, or id selects candidates from the index
+instead of traversing the whole subtree.
+'''
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, cast, Iterator, NoReturn
+
+from .markup import _attr_val_str, Mu, MuIndex
+
+
+class SelectorSyntaxError(ValueError):
+  'Raised for invalid or unsupported CSS selector syntax.'
+
+  def __init__(self, selector:str, pos:int, msg:str) -> None:
+    super().__init__(f'{msg}: {selector!r} (position {pos})')
+    self.selector = selector
+    self.pos = pos
+
+
+@dataclass(frozen=True)
+class AttrTest:
+  'An attribute selector, e.g. `[href^="https:"]`. An empty `op` tests for presence.'
+  key:str
+  op:str = ''
+  val:str = ''
+  ignore_case:bool = False
+
+  def matches(self, node:Mu) -> bool:
+    try: raw = node.attrs[self.key]
+    except KeyError: return False
+    v = _attr_val_str(raw)
+    if v is None: return False # Present(False).
+    op = self.op
+    if not op: return True
+    expected = self.val
+    if self.ignore_case:
+      v = v.lower()
+      expected = expected.lower()
+    match op:
+      case '=': return v == expected
+      case '~=': return bool(expected) and expected in v.split()
+      case '|=': return v == expected or v.startswith(expected + '-')
+      case '^=': return bool(expected) and v.startswith(expected)
+      case '$=': return bool(expected) and v.endswith(expected)
+      case '*=': return bool(expected) and expected in v
+      case _: raise ValueError(op)
+
+
+@dataclass(frozen=True)
+class PseudoTest:
+  '''
+  A pseudo-class. For the `nth-*` forms, `a` and `b` are the coefficients of `an+b`;
+  for `:not()`, `:is()`, and `:where()`, `selector` is the argument list.
+  '''
+  name:str
+  a:int = 0
+  b:int = 0
+  selector:'Selector|None' = None
+
+  def matches(self, node:Mu, ctx:'_SelectContext') -> bool:
+    name = self.name
+    if name == 'not':
+      assert self.selector is not None
+      return not self.selector.matches(node, ctx)
+    if name in ('is', 'where'):
+      assert self.selector is not None
+      return self.selector.matches(node, ctx)
+    if name == 'empty':
+      return not any(isinstance(c, Mu) or (c if isinstance(c, str) else c.string) for c in node._)
+    if name == 'root': return ctx.parent(node) is None
+    siblings_pos = ctx.siblings(node, of_type=name.endswith('of-type'))
+    if siblings_pos is None: return False # The scope root has no siblings in the selection context.
+    siblings, pos = siblings_pos
+    count = len(siblings)
+    if name.startswith('only'): return count == 1
+    if name.startswith('first'): return pos == 0
+    if name.startswith('last'): return pos == count - 1
+    k = (count - pos) if name.startswith('nth-last') else (pos + 1) # 1-based index, from the end for `nth-last-*`.
+    a = self.a
+    if a == 0: return k == self.b
+    n, rem = divmod(k - self.b, a)
+    return rem == 0 and n >= 0
+
+
+@dataclass(frozen=True)
+class Compound:
+  'A compound selector: an optional type selector plus id, class, attribute, and pseudo-class tests.'
+  tag:str = '' # Empty for the universal selector.
+  id:str|None = None
+  classes:tuple[str,...] = ()
+  attrs:tuple[AttrTest,...] = ()
+  pseudos:tuple[PseudoTest,...] = ()
+
+  def matches(self, node:Mu, ctx:'_SelectContext') -> bool:
+    if self.tag and node.tag != self.tag: return False
+    attrs = node.attrs
+    if self.id is not None:
+      if (node_id := attrs.get('id')) is None or str(node_id) != self.id: return False
+    if self.classes:
+      cl = attrs.get('class')
+      if not cl: return False
+      words = str(cl).split()
+      for c in self.classes:
+        if c not in words: return False
+    for attr_test in self.attrs:
+      if not attr_test.matches(node): return False
+    for pseudo in self.pseudos:
+      if not pseudo.matches(node, ctx): return False
+    return True
+
+  @property
+  def is_indexable(self) -> bool:
+    'Whether an index can select candidates for this compound.'
+    return bool(self.tag or self.id is not None or self.classes)
+
+
+@dataclass(frozen=True)
+class Complex:
+  '''
+  A complex selector, stored right to left: `compounds[0]` is the rightmost (subject) compound,
+  and `combinators[i]` relates `compounds[i]` to `compounds[i+1]`, which is to its left.
+  '''
+  compounds:tuple[Compound,...]
+  combinators:tuple[str,...]
+
+  def matches(self, node:Mu, ctx:'_SelectContext') -> bool:
+    return self.compounds[0].matches(node, ctx) and self._matches_left(0, node, ctx)
+
+  def _matches_left(self, i:int, node:Mu, ctx:'_SelectContext') -> bool:
+    'Given that `node` matches compound `i`, test the remaining compounds to the left.'
+    if i + 1 == len(self.compounds): return True
+    comb = self.combinators[i]
+    left = self.compounds[i+1]
+    if comb == '>':
+      parent = ctx.parent(node)
+      return parent is not None and left.matches(parent, ctx) and self._matches_left(i+1, parent, ctx)
+    if comb == ' ':
+      ancestor = ctx.parent(node)
+      while ancestor is not None:
+        if left.matches(ancestor, ctx) and self._matches_left(i+1, ancestor, ctx): return True
+        ancestor = ctx.parent(ancestor)
+      return False
+    siblings_pos = ctx.siblings(node)
+    if siblings_pos is None: return False
+    siblings, pos = siblings_pos
+    if comb == '+':
+      if pos == 0: return False
+      prev = siblings[pos-1]
+      return left.matches(prev, ctx) and self._matches_left(i+1, prev, ctx)
+    assert comb == '~', comb
+    for prev in reversed(siblings[:pos]):
+      if left.matches(prev, ctx) and self._matches_left(i+1, prev, ctx): return True
+    return False
+
+
+@dataclass(frozen=True)
+class Selector:
+  'A parsed selector list. Obtain instances with `parse_selector`, which caches them.'
+  text:str
+  complexes:tuple[Complex,...]
+
+  def matches(self, node:Mu, ctx:'_SelectContext') -> bool:
+    for cx in self.complexes:
+      if cx.matches(node, ctx): return True
+    return False
+
+
+  def select(self, root:Mu) -> Iterator[Mu]:
+    'Yield the matching descendants of `root` in document order.'
+    if root._orig is not None: root = root._orig
+    index = root._live_index()
+    if index is not None and all(cx.compounds[0].is_indexable for cx in self.complexes):
+      return self._select_indexed(root, index)
+    return self._select_walk(root)
+
+
+  def _select_walk(self, root:Mu) -> Iterator[Mu]:
+    parents:dict[int,Mu] = {}
+    ctx = _SelectContext(lambda node: parents.get(id(node)))
+    complexes = self.complexes
+    stack:list[tuple[Mu,Mu]] = [(c, root) for c in reversed(root._) if isinstance(c, Mu)]
+    while stack:
+      node, parent = stack.pop()
+      parents[id(node)] = parent
+      for cx in complexes:
+        if cx.matches(node, ctx):
+          yield node
+          break
+      stack.extend((c, node) for c in reversed(node._) if isinstance(c, Mu))
+
+
+  def _select_indexed(self, root:Mu, index:MuIndex) -> Iterator[Mu]:
+    ctx = _SelectContext(lambda node: None if node is root else index.parent(node))
+    if len(self.complexes) == 1:
+      cx = self.complexes[0]
+      subject = cx.compounds[0]
+      for node in index.candidates(root, type_or_tag=subject.tag, cl=_first(subject.classes), id=subject.id):
+        if cx.matches(node, ctx): yield node
+      return
+    # Selector list: merge the matches of each complex selector into document order.
+    matches:dict[int,Mu] = {}
+    for cx in self.complexes:
+      subject = cx.compounds[0]
+      for node in index.candidates(root, type_or_tag=subject.tag, cl=_first(subject.classes), id=subject.id):
+        if cx.matches(node, ctx):
+          pos = index.position(node)
+          assert pos is not None
+          matches[pos] = node
+    for pos in sorted(matches): yield matches[pos]
+
+
+
+class _SelectContext:
+  'Parent lookup and cached sibling positions for a single selection.'
+
+  def __init__(self, parent:Callable[[Mu],Mu|None]) -> None:
+    self.parent = parent
+    self._siblings:dict[tuple[int,str|None],tuple[list[Mu],dict[int,int]]] = {}
+
+  def siblings(self, node:Mu, of_type:bool=False) -> tuple[list[Mu],int]|None:
+    '''
+    Return the element children of the parent of `node` (only those with the same tag if `of_type`)
+    and the position of `node` among them, or None if `node` has no parent in the selection context.
+    '''
+    parent = self.parent(node)
+    if parent is None: return None
+    key = (id(parent), node.tag if of_type else None)
+    try: siblings, positions = self._siblings[key]
+    except KeyError:
+      if of_type: siblings = [c for c in parent._ if isinstance(c, Mu) and c.tag == node.tag]
+      else: siblings = [c for c in parent._ if isinstance(c, Mu)]
+      positions = { id(c): i for i, c in enumerate(siblings) }
+      self._siblings[key] = (siblings, positions)
+    return (siblings, positions[id(node)])
+
+
+def _first(items:tuple[str,...]) -> str: return items[0] if items else ''
+
+
+@lru_cache(maxsize=512)
+def parse_selector(text:str) -> Selector:
+  'Parse a CSS selector list. Results are cached by selector string.'
+  parser = _Parser(text)
+  selector = parser.parse_list(nested=False)
+  if parser.pos < len(text): parser.error('unexpected character')
+  return selector
+
+
+_escape = r'\\(?:[0-9a-fA-F]{1,6}(?:\r\n|[ \t\r\n\f])?|.)' # A hex escape consumes one following whitespace character.
+_ident = rf'(?:-?(?:[_a-zA-Z\u00a0-\U0010ffff]|{_escape})(?:[-\w\u00a0-\U0010ffff]|{_escape})*)'
+_ident_re = re.compile(_ident)
+_ws_re = re.compile(r'\s*')
+_combinator_re = re.compile(r'\s*([>+~])\s*|\s+')
+_attr_re = re.compile(r'''\[\s*(?P<key>[^\s~|^$*=\]]+)\s*(?:(?P<op>[~|^$*]?=)\s*
+  (?:(?P<ident>-?[-\w\u00a0-\U0010ffff]+)|"(?P<dq>(?:[^"\\]|\\.)*)"|'(?P<sq>(?:[^'\\]|\\.)*)')\s*(?P<flag>[iIsS])?\s*)?\]''',
+  re.VERBOSE)
+_nth_re = re.compile(r'\s*(?:(?P<keyword>odd|even)|(?P<a>[-+]?\d*)n\s*(?:(?P<b_sign>[-+])\s*(?P<b_n>\d+))?|(?P<b>[-+]?\d+))\s*$',
+  re.IGNORECASE)
+_escape_re = re.compile(r'\\(?:([0-9a-fA-F]{1,6})(?:\r\n|[ \t\r\n\f])?|(.))', re.DOTALL)
+
+_simple_pseudos = frozenset({'first-child', 'last-child', 'only-child', 'first-of-type', 'last-of-type', 'only-of-type',
+  'empty', 'root'})
+_nth_pseudos = frozenset({'nth-child', 'nth-last-child', 'nth-of-type', 'nth-last-of-type'})
+_selector_pseudos = frozenset({'not', 'is', 'where'})
+
+
+def _unescape(s:str) -> str: return _escape_re.sub(_unescape_match, s) if '\\' in s else s
+
+
+def _unescape_match(m:re.Match) -> str:
+  hex_digits, char = m.groups()
+  if hex_digits is None: return cast(str, char)
+  code = int(hex_digits, 16)
+  # As in CSS Syntax, null, surrogate, and out-of-range code points are replaced.
+  return '\ufffd' if code == 0 or 0xd800 <= code <= 0xdfff or code > 0x10ffff else chr(code)
+
+
+class _Parser:
+
+  def __init__(self, text:str) -> None:
+    self.text = text
+    self.pos = 0
+
+
+  def error(self, msg:str) -> NoReturn:
+    raise SelectorSyntaxError(self.text, self.pos, msg)
+
+
+  def parse_list(self, nested:bool) -> Selector:
+    'Parse a comma-separated list of complex selectors, stopping at the end of text or (if `nested`) a closing paren.'
+    start = self.pos
+    complexes = [self.parse_complex()]
+    text = self.text
+    while True:
+      self.pos = _ws_re.match(text, self.pos).end() # type: ignore[union-attr]
+      if self.pos < len(text) and text[self.pos] == ',':
+        self.pos += 1
+        complexes.append(self.parse_complex())
+      else: break
+    if nested and not (self.pos < len(text) and text[self.pos] == ')'): self.error('expected `)`')
+    return Selector(text=text[start:self.pos].strip(), complexes=tuple(complexes))
+
+
+  def parse_complex(self) -> Complex:
+    text = self.text
+    self.pos = _ws_re.match(text, self.pos).end() # type: ignore[union-attr]
+    compounds = [self.parse_compound()]
+    combinators:list[str] = []
+    while self.pos < len(text):
+      m = _combinator_re.match(text, self.pos)
+      if not m: break
+      end = m.end()
+      if end == len(text) or text[end] in ',)': # Trailing whitespace.
+        if m.group(1): self.error('expected selector after combinator')
+        break
+      self.pos = end
+      combinators.append(m.group(1) or ' ')
+      compounds.append(self.parse_compound())
+    compounds.reverse()
+    combinators.reverse()
+    return Complex(compounds=tuple(compounds), combinators=tuple(combinators))
+
+
+  def parse_compound(self) -> Compound:
+    text = self.text
+    start = self.pos
+    tag = ''
+    id:str|None = None
+    classes:list[str] = []
+    attrs:list[AttrTest] = []
+    pseudos:list[PseudoTest] = []
+    if self.pos < len(text) and text[self.pos] == '*':
+      self.pos += 1
+    elif m := _ident_re.match(text, self.pos):
+      tag = _unescape(m.group())
+      self.pos = m.end()
+    while self.pos < len(text):
+      c = text[self.pos]
+      if c == '#':
+        id = _unescape(self.parse_ident(self.pos + 1))
+      elif c == '.':
+        classes.append(_unescape(self.parse_ident(self.pos + 1)))
+      elif c == '[':
+        m = _attr_re.match(text, self.pos)
+        if not m: self.error('invalid attribute selector')
+        val = m['ident'] or _unescape(m['dq'] or m['sq'] or '')
+        flag = m['flag'] or ''
+        attrs.append(AttrTest(key=_unescape(m['key']), op=m['op'] or '', val=val, ignore_case=(flag.lower() == 'i')))
+        self.pos = m.end()
+      elif c == ':':
+        pseudos.append(self.parse_pseudo())
+      else: break
+    if self.pos == start: self.error('expected selector')
+    return Compound(tag=tag, id=id, classes=tuple(classes), attrs=tuple(attrs), pseudos=tuple(pseudos))
+
+
+  def parse_ident(self, pos:int) -> str:
+    m = _ident_re.match(self.text, pos)
+    if not m:
+      self.pos = pos
+      self.error('expected identifier')
+    self.pos = m.end()
+    return m.group()
+
+
+  def parse_pseudo(self) -> PseudoTest:
+    text = self.text
+    if text.startswith('::', self.pos): self.error('pseudo-elements are not supported')
+    name = self.parse_ident(self.pos + 1).lower()
+    if name in _simple_pseudos: return PseudoTest(name=name)
+    if not (self.pos < len(text) and text[self.pos] == '('):
+      self.error(f'unsupported pseudo-class: `:{name}`')
+    self.pos += 1
+    if name in _selector_pseudos:
+      selector = self.parse_list(nested=True)
+      self.pos += 1 # Closing paren.
+      return PseudoTest(name=name, selector=selector)
+    if name in _nth_pseudos:
+      end = text.find(')', self.pos)
+      if end < 0: self.error('expected `)`')
+      m = _nth_re.match(text[self.pos:end])
+      if not m: self.error(f'invalid argument to `:{name}`')
+      self.pos = end + 1
+      if kw := m['keyword']: return PseudoTest(name=name, a=2, b=(1 if kw.lower() == 'odd' else 0))
+      if (b := m['b']) is not None: return PseudoTest(name=name, a=0, b=int(b))
+      a_str = m['a']
+      a = -1 if a_str == '-' else 1 if a_str in ('', '+') else int(a_str)
+      b = int(m['b_sign'] + m['b_n']) if m['b_n'] else 0
+      return PseudoTest(name=name, a=a, b=b)
+    self.error(f'unsupported pseudo-class: `:{name}()`')
@@ -37,6 +37,25 @@ def render_csv(*, quoting:Quoting|None=None, header:Sequence[str]|None, rows:Ite
     return f.getvalue()
 
 
+def iter_csv_chunks(*, quoting:Quoting|None=None, header:Sequence[str]|None, rows:Iterable[Sequence],
+ chunk_size:int=1<<16) -> Iterator[str]:
+  '''
+  Render CSV incrementally, as a stream of strings of at least `chunk_size` characters (except for the last).
+  `rows` is consumed lazily, so it can be a generator over a large result set.
+  '''
+  if quoting is None: quoting = QUOTE_MINIMAL
+  with StringIO() as f:
+    w = csv.writer(f, quoting=quoting)
+    if header is not None: w.writerow(header)
+    for row in rows:
+      w.writerow(row)
+      if f.tell() >= chunk_size:
+        yield f.getvalue()
+        f.seek(0)
+        f.truncate()
+    if tail := f.getvalue(): yield tail
+
+
 def load_csv(file:TextIO, *,
  dialect:str|Dialect|type[Dialect]='excel',
  delimiter:str|None=None,
@@ -13,6 +13,7 @@ An axis can be categorical or numeric.
 
 import re
 from math import ceil, floor, log10
+from random import Random
 from typing import Any, Callable, Iterable, Self
 
 from ...range import NumRange
@@ -29,6 +30,7 @@ PathCommand = tuple
 PointTransform = Callable[[tuple], V2F]
 TickFmt = Callable[[float], Any]
 Plotter = Callable[[Div, PointTransform, Any], None]
+Downsampler = Callable[[list[V2F], int], list[int]] # Takes transformed points and a budget; returns selected indices.
 
 
 
@@ -39,7 +41,7 @@ class ChartSeries:
   '''
 
   def __init__(self, *, name:str, cl:str='', legend:str='', x:Any=0, y:Any=1, points:Iterable[Any],
-   plotter:Plotter|None=None, attrs:dict[str,Any]|None=None) -> None:
+   plotter:Plotter|None=None, downsampler:Downsampler|None=None, attrs:dict[str,Any]|None=None) -> None:
 
     self.name = name
     self.cl = cl or clean_class_for_name(name)
@@ -48,6 +50,7 @@ class ChartSeries:
     self.y = y
     self.points = list(points)
     self.plotter = plotter
+    self.downsampler = downsampler
     self.attrs = attrs
 
     self.bounds = (
@@ -77,16 +80,40 @@ class ChartSeries:
       return (False, els)
 
 
-  def make_series_div(self, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any]) -> Div:
+  def make_series_div(self, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any], max_points:int|None=None
+   ) -> Div:
     '''
     Creates the div for the series visualization.
     Subclasses should typically leave this as is and instead override `fill_vis_div`.
     '''
     div = Div(cl=('series', self.kind_class, self.cl))
-    self.fill_vis_div(div=div, transform_x=transform_x, transform_y=transform_y)
+    self.fill_vis_div(div=div, transform_x=transform_x, transform_y=transform_y, max_points=max_points)
     return div
 
 
+  def vis_points(self, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any], max_points:int|None=None
+   ) -> list[V2F]:
+    '''
+    Transform the series points into visualization coordinates.
+    If `max_points` is specified and the series is larger, the transformed points are downsampled
+    using `downsampler` if it was provided, or else the `downsample` method of the series kind.
+    '''
+    x = self.x
+    y = self.y
+    points = [(transform_x(p[x]), transform_y(p[y])) for p in self.points]
+    if max_points is None or len(points) <= max_points: return points
+    downsampler = self.downsampler or self.downsample
+    return [points[i] for i in downsampler(points, max_points)]
+
+
+  def downsample(self, points:list[V2F], max_points:int) -> list[int]:
+    '''
+    The default downsampling strategy for the series kind.
+    The base implementation uses LTTB, which preserves the visual shape of a line.
+    '''
+    return downsample_lttb(points, max_points)
+
+
   def make_legend_item_div(self) -> Div:
     '''
     Create the div for the series legend item.
@@ -97,10 +124,11 @@ class ChartSeries:
     return div
 
 
-  def fill_vis_div(self, div:Div, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any]) -> None:
+  def fill_vis_div(self, div:Div, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any],
+   max_points:int|None=None) -> None:
     '''
     Fill the given div with the visual representation of the series.
-    Subclasses must override this method.
+    Subclasses must override this method, and should obtain their points from `vis_points`.
     '''
     raise NotImplementedError
 
@@ -125,15 +153,17 @@ class BarSeries(ChartSeries):
   def kind_class(self) -> str: return 'bar'
 
 
-  def fill_vis_div(self, div:Div, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any]) -> None:
+  def fill_vis_div(self, div:Div, transform_x:Callable[[Any],Any], transform_y:Callable[[Any],Any],
+   max_points:int|None=None) -> None:
     '''
     Fill the series visualization div with html representing the data.
     '''
-    for p in self.points:
-      i = transform_x(p[self.x])
-      v = transform_y(p[self.y])
-      style = f'--i:{i};--v:{v:.4f};'
-      div.append(Div(style=style))
+    div.extend(Div(style=f'--i:{i};--v:{v:.4f};') for i, v in self.vis_points(transform_x, transform_y, max_points))
+
+
+  def downsample(self, points:list[V2F], max_points:int) -> list[int]:
+    'Bars use min/max bucketing, which preserves the extreme values of each run of bars.'
+    return downsample_min_max(points, max_points)
 
 
 
@@ -180,9 +210,10 @@ class ChartAxis:
     return ''
 
 
-  def tick_divs(self) -> list[Div]:
+  def tick_divs(self, max_ticks:int|None=None) -> list[Div]:
     '''
     Create divs for the axis ticks.
+    `max_ticks` is an optional upper bound on the number of ticks, used to bound the DOM size of large charts.
     '''
     raise NotImplementedError
 
@@ -207,6 +238,7 @@ class CategoricalAxis(ChartAxis):
     '''
     self.labels = list(labels)
     self.label_sort_key = label_sort_key
+    self.label_indices:dict[Any,int] = {}
     super().__init__()
 
 
@@ -216,7 +248,7 @@ class CategoricalAxis(ChartAxis):
 
   def transform(self, v:Any) -> float:
     'Categorical axis returns the index of the category label.'
-    return self.labels.index(v)
+    return self.label_indices[v]
 
 
   def configure(self, series:list['ChartSeries']) -> Self:
@@ -248,6 +280,7 @@ class CategoricalAxis(ChartAxis):
         labels_set.update(series_labels)
       self.labels = sorted(labels_set, key=self.label_sort_key)
 
+    self.label_indices = {label: i for i, label in enumerate(self.labels)}
     return self
 
 
@@ -260,10 +293,16 @@ class CategoricalAxis(ChartAxis):
     return f'--n{d}:{len(self.labels)};{lll}'
 
 
-  def tick_divs(self) -> list[Div]:
+  def tick_divs(self, max_ticks:int|None=None) -> list[Div]:
+    '''
+    If `max_ticks` is specified and there are more labels, only every nth label is ticked, starting with the first.
+    '''
+    labels = self.labels
+    step = 1
+    if max_ticks is not None and len(labels) > max_ticks: step = -(-len(labels) // max(1, max_ticks)) # Ceiling division.
     return [
-      Div(style=f'--i:{i}',  _=[Span(cl='tick'), Span(cl='label', _=str(label))])
-     for (i, label) in enumerate(self.labels)]
+      Div(style=f'--i:{i}',  _=[Span(cl='tick'), Span(cl='label', _=str(labels[i]))])
+     for i in range(0, len(labels), step)]
 
 
 
@@ -341,7 +380,10 @@ class LinearAxis(NumericalAxis):
     return round((v - self.min) * self.scale, 4)
 
 
-  def tick_divs(self) -> list[Div]:
+  def tick_divs(self, max_ticks:int|None=None) -> list[Div]:
+    '''
+    Numerical ticks are already bounded by `ticks_max`; `max_ticks` is ignored.
+    '''
     ticks = self.ticks
     if not ticks:
       self.fill_ticks()
@@ -402,6 +444,7 @@ def chart_figure(*,
  y:ChartAxis|None=None,
  series:Iterable[ChartSeries]=(),
  symmetric_xy:bool=False,
+ max_points:int|None=None,
  dbg:bool=False,
  **kw_attrs:Any) -> Figure:
 
@@ -411,10 +454,18 @@ def chart_figure(*,
     `x` and `y` are optional ChartAxis objects that define the chart axes.
     `series` is a sequence of ChartSeries objects that define the chart data.
     `symmetric_xy` is a boolean that, if True, forces the x and y axes to have the same min and max values.
+    `max_points` is an optional budget for the total number of rendered data points, shared evenly between the series.
+    Series that exceed their share are downsampled after the axis transform, so that the chart DOM size is bounded;
+    each series keeps at least one point. Categorical axes with more labels than `max_points` are ticked sparsely.
   '''
 
   series = list(series)
 
+  series_max_points:int|None = None
+  if max_points is not None:
+    if max_points < 0: raise ValueError(f'max_points must be >= 0: {max_points!r}.')
+    series_max_points = max(1, max_points // max(1, len(series)))
+
   is_x_numeric = all(s.bounds[0][0] for s in series)
   is_y_numeric = all(s.bounds[1][0] for s in series)
 
@@ -436,8 +487,8 @@ def chart_figure(*,
       x.max = y.max = max(x.max, y.max)
     else: raise ValueError('cannot force symmetric axes for categorical data')
 
-  x_tick_divs = x.tick_divs()
-  y_tick_divs = y.tick_divs()
+  x_tick_divs = x.tick_divs(max_ticks=max_points)
+  y_tick_divs = y.tick_divs(max_ticks=max_points)
 
   max_tick_x_label_len = max(get_tick_div_label_len(d) for d in x_tick_divs)
 
@@ -463,14 +514,14 @@ def chart_figure(*,
   gutter_left.append(Div(cl='origin')) # Empty box.
 
   gutter_left.append(Div(cl=['ticks', 'y', y.data_class, y.kind_class], _=y_tick_divs))
-  for d in y_tick_divs: d._.reverse() # Flip the tick and label so that the tick is on the right.
+  for d in y_tick_divs: d._writable_children().reverse() # Flip the tick and label so that the tick is on the right.
 
   vis_scroll = row.append(Div(cl='vis-scroll'))
 
   vis_scroll.append(Div(cl=['ticks', 'x', x.data_class, x.kind_class], _=x_tick_divs))
 
   vis = vis_scroll.append(Div(cl='vis',
-    _=[s.make_series_div(transform_x=x.transform, transform_y=y.transform) for s in series]))
+    _=[s.make_series_div(transform_x=x.transform, transform_y=y.transform, max_points=series_max_points) for s in series]))
 
   if dbg:
     vis.extend([
@@ -523,3 +574,83 @@ def calc_min_max_of_ranges(ranges:Iterable[V2F|None], min_:float|None=None, max_
     return (0, 1)
   assert max_ is not None
   return (min_, max_)
+
+
+def downsample_lttb(points:list[V2F], max_points:int) -> list[int]:
+  '''
+  Largest-Triangle-Three-Buckets downsampling, suitable for line series.
+  `points` must be ordered by x. Returns the ascending indices of at most `max_points` selected points.
+  The first and last points are always selected; each interior bucket contributes the point that forms the largest
+  triangle with the previously selected point and the average of the next bucket.
+  '''
+  count = len(points)
+  if count <= max_points: return list(range(count))
+  if max_points < 3: return [0, count-1][:max_points]
+
+  indices = [0]
+  bucket_size = (count - 2) / (max_points - 2)
+  a = 0
+  for b in range(max_points - 2):
+    start = int(b * bucket_size) + 1
+    end = int((b + 1) * bucket_size) + 1
+    next_end = min(int((b + 2) * bucket_size) + 1, count)
+    next_len = next_end - end
+    avg_x = sum(p[0] for p in points[end:next_end]) / next_len
+    avg_y = sum(p[1] for p in points[end:next_end]) / next_len
+    ax, ay = points[a]
+    best_area = -1.0
+    for i in range(start, end):
+      x, y = points[i]
+      area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay)) # Twice the triangle area.
+      if area > best_area:
+        best_area = area
+        a = i
+    indices.append(a)
+  indices.append(count - 1)
+  return indices
+
+
+def downsample_min_max(points:list[V2F], max_points:int) -> list[int]:
+  '''
+  Min/max bucketing, suitable for bar series.
+  The points are split into `max_points // 2` buckets of consecutive points, and the points with the minimum and maximum
+  y values of each bucket are selected. Returns ascending indices.
+  '''
+  count = len(points)
+  if count <= max_points: return list(range(count))
+  if max_points < 2: return [max(range(count), key=lambda i: abs(points[i][1]))][:max_points]
+
+  indices:list[int] = []
+  n_buckets = max_points // 2
+  bucket_size = count / n_buckets
+  for b in range(n_buckets):
+    start = int(b * bucket_size)
+    end = int((b + 1) * bucket_size)
+    lo = hi = start
+    lo_y = hi_y = points[start][1]
+    for i in range(start + 1, end):
+      y = points[i][1]
+      if y < lo_y:
+        lo = i
+        lo_y = y
+      elif y > hi_y:
+        hi = i
+        hi_y = y
+    if lo < hi: indices.extend((lo, hi))
+    elif hi < lo: indices.extend((hi, lo))
+    else: indices.append(lo)
+  return indices
+
+
+def downsample_stratified(points:list[V2F], max_points:int, seed:int=0) -> list[int]:
+  '''
+  Stratified random sampling, suitable for scatter series.
+  The points are split into `max_points` buckets of consecutive points, and one point is chosen at random from each.
+  The random generator is seeded so that repeated renderings of the same data are identical. Returns ascending indices.
+  '''
+  count = len(points)
+  if count <= max_points: return list(range(count))
+  if max_points < 1: return []
+  rng = Random(seed)
+  bucket_size = count / max_points
+  return [rng.randrange(int(b * bucket_size), int((b + 1) * bucket_size)) for b in range(max_points)]
@@ -0,0 +1,38 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from pithy.html.charts import BarSeries, chart_figure, downsample_lttb, downsample_min_max, downsample_stratified
+from utest import utest
+
+
+_spike = [(float(i), 100.0 if i == 500 else 0.0) for i in range(1000)]
+
+utest([0, 1, 2], downsample_lttb, _spike[:3], 10)
+utest(True, lambda: 500 in downsample_lttb(_spike, 20)) # The spike survives.
+utest(20, lambda: len(downsample_lttb(_spike, 20)))
+utest(999, lambda: downsample_lttb(_spike, 20)[-1])
+
+_saw = [(float(i), float(i % 10)) for i in range(100)]
+utest([0, 9, 10, 19], downsample_min_max, _saw[:20], 4)
+utest(True, lambda: all(_saw[i][1] in (0.0, 9.0) for i in downsample_min_max(_saw, 20)))
+
+utest(10, lambda: len(downsample_stratified(_saw, 10)))
+utest(downsample_stratified(_saw, 10), downsample_stratified, _saw, 10) # Deterministic.
+
+def _bar_count(max_points:int|None) -> int:
+  fig = chart_figure(max_points=max_points, series=[BarSeries(name='s', points=[(f'{i}', i % 7) for i in range(1000)])])
+  return len(fig.find(cl='series')._)
+
+utest(1000, _bar_count, None)
+utest(100, _bar_count, 100)
+
+def _tick_count(max_points:int|None) -> int:
+  fig = chart_figure(max_points=max_points, series=[BarSeries(name='s', points=[(f'{i}', i % 7) for i in range(1000)])])
+  return len(fig.find(cl='vis-scroll').find(cl='ticks')._)
+
+utest(1000, _tick_count, None)
+utest(100, _tick_count, 100)
+utest(84, _tick_count, 90) # Every 12th label.
+
+utest([], downsample_stratified, _saw, 0)
+utest(3, lambda: len(chart_figure(max_points=2,
+  series=[BarSeries(name=f's{j}', points=[(f'{i}', i) for i in range(10)]) for j in range(3)]).find(cl='vis')._))
@@ -1,10 +1,45 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
-from typing import Any, BinaryIO, cast, TextIO
+from hashlib import blake2b
+from os import listdir, remove, replace as os_replace, stat
+from os.path import abspath, join as path_join
+from typing import Any, BinaryIO, cast, Iterable, Iterator, TextIO
 
 from ..loader import FileOrPath
-from . import HtmlNode
+from ..markup import Mu
+from . import Html, HtmlNode
 
 
 def load_html(file_or_path:FileOrPath, encoding:str='utf8', **kwargs:Any) -> Any:
   return HtmlNode.parse_file(cast(str|TextIO|BinaryIO, file_or_path), encoding=encoding, **kwargs)
+
+
+def iterparse_html(file_or_path:FileOrPath, tags:Iterable[str], encoding:str='utf8', **kwargs:Any) -> Iterator[Mu]:
+  'Incrementally parse a large HTML document, yielding subtrees for the elements in `tags` with bounded memory.'
+  return HtmlNode.iterparse(file_or_path, tags, encoding=encoding, **kwargs)
+
+
+def load_html_cached(path:str, cache_dir:str, encoding:str='utf8', **kwargs:Any) -> Html:
+  '''
+  Parse the HTML document at `path`, caching the resulting tree in `cache_dir` using the `Mu.dump_bin` encoding.
+  The cache entry is keyed by the absolute path and the parsing arguments, and is valid for the file's current mtime and size.
+  When the source file changes, the stale entry is replaced.
+  The cache is an optimization: unreadable entries are reparsed, and write failures are ignored.
+  '''
+  st = stat(path)
+  key = blake2b(f'{abspath(path)}\0{encoding}\0{sorted(kwargs.items())!r}'.encode(), digest_size=16).hexdigest()
+  cache_name = f'{key}-{st.st_mtime_ns}-{st.st_size}.mu'
+  cache_path = path_join(cache_dir, cache_name)
+  try:
+    with open(cache_path, 'rb') as f: return cast(Html, HtmlNode.load_bin(f))
+  except Exception: pass # Missing, corrupt or incompatible cache file; it will be rewritten.
+
+  html = HtmlNode.parse_file(path, encoding=encoding, **kwargs)
+  tmp_path = f'{cache_path}.{id(html)}.tmp'
+  try:
+    with open(tmp_path, 'wb') as f: html.dump_bin(f)
+    os_replace(tmp_path, cache_path)
+    for name in listdir(cache_dir): # Remove entries for previous versions of the same file.
+      if name.startswith(key) and name.endswith('.mu') and name != cache_name: remove(path_join(cache_dir, name))
+  except OSError: pass # Read-only or missing cache directories are not an error.
+  return html
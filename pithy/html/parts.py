@@ -77,3 +77,70 @@ def pagination_control(*, count:int|None, limit:int, offset:int, href:str='', hx
       last[url_key]  = f'{url}offset={last_offset}'
 
   return div
+
+
+def keyset_pagination_control(*, count:int|None, count_is_approx:bool=False, shown:int, first_key:str|None,
+ last_key:str|None, has_prev:bool, has_next:bool, href:str='', hx_get:str='', params:Mapping[str,Any],
+ link_attrs:MuAttrs|None=None) -> Div:
+  """
+  Generate a pagination control component for keyset (seek) pagination.
+
+  Unlike `pagination_control`, pages are addressed by the encoded keys of the first and last rows shown,
+  using the `before`, `after` and `last` query parameters, so the cost of fetching a page does not grow with its depth.
+
+  Args:
+    count (int | None): Total count of results, if known.
+    count_is_approx (bool): Whether `count` is an estimate.
+    shown (int): Number of results on the current page.
+    first_key (str | None): Encoded key of the first row shown, used for the previous page link.
+    last_key (str | None): Encoded key of the last row shown, used for the next page link.
+    has_prev (bool): Whether there are results before the current page.
+    has_next (bool): Whether there are results after the current page.
+    href (str): Base URL for pagination links.
+    hx_get (str): hx-get attribute for pagination links (mutually exclusive with `href`).
+    params (Mapping[str, str]): Parameters for generating pagination links. Paging parameters are omitted.
+  """
+
+  if href and hx_get: raise ValueError("`href` and `hx_get` cannot both be provided")
+
+  if link_attrs is None: link_attrs = {}
+
+  first = A(cl='icon', _='⏮️', **link_attrs)
+  prev  = A(cl='icon', _='◀️', **link_attrs)
+  next_ = A(cl='icon', _='▶️', **link_attrs)
+  last  = A(cl='icon', _='⏭️', **link_attrs)
+  icons = (first, prev, next_, last)
+
+  msg = Span(cl='msg')
+  div = Div(*icons, msg, cl='pagination-control')
+
+  approx = '~' if count_is_approx else ''
+  if not shown:
+    msg.append('No results.')
+  elif count is None:
+    msg.append(f'{shown:,} results shown.')
+  elif not (has_prev or has_next):
+    msg.append(f'{shown:,} results.')
+  else:
+    msg.append(f'{shown:,} results shown of {approx}{count:,}.')
+
+  use_hx = bool(hx_get)
+  url_key = 'hx-get' if use_hx else 'href'
+  url = hx_get if use_hx else href
+  if '#' in url: raise ValueError("`href`/`hx_get` cannot contain fragment character '#'")
+  if '?' not in url: url += '?'
+  elif not url.endswith('&'): url += '&'
+  qp = f'{urlencode(tuple((k, str(v)) for k, v in params.items() if k not in _paging_keys))}'
+  if qp: url += f'{qp}&'
+
+  if has_prev:
+    first[url_key] = url
+    if first_key is not None: prev[url_key] = f'{url}{urlencode({"before": first_key})}'
+  if has_next:
+    if last_key is not None: next_[url_key] = f'{url}{urlencode({"after": last_key})}'
+    last[url_key] = f'{url}last=1'
+
+  return div
+
+
+_paging_keys = frozenset(('offset', 'after', 'before', 'last'))
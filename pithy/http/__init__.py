@@ -1,8 +1,9 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
-from email.utils import formatdate as format_email_date
+from email.utils import formatdate as format_email_date, parsedate_to_datetime as parse_email_date
 from http import HTTPStatus
 from time import time as unix_epoch_time
+from typing import Iterable
 
 
 http_status_response_strings = { s : f'{s.value} {s.phrase}'  for s in HTTPStatus }
@@ -45,3 +46,112 @@ def format_header_date(timestamp:float|None=None) -> str:
   'Format `timestamp` or now for an HTTP header value.'
   if timestamp is None: timestamp = unix_epoch_time()
   return format_email_date(timestamp, usegmt=True)
+
+
+def parse_header_date(value:str) -> float|None:
+  'Parse an HTTP header date into a timestamp. Returns None if the value is not a valid date.'
+  try: dt = parse_email_date(value)
+  except (TypeError, ValueError, IndexError): return None
+  if dt.tzinfo is None: return None # RFC 9110 5.6.7: HTTP dates are always GMT.
+  return dt.timestamp()
+
+
+class UnsatisfiableRange(ValueError):
+  'Raised by `parse_byte_range` when no requested range overlaps the representation.'
+
+
+def parse_byte_range(value:str, size:int) -> tuple[int,int]|None:
+  '''
+  Parse the value of a `Range` request header for a representation of `size` bytes.
+  Returns the (start, end) byte offsets of the range, where `end` is exclusive.
+  Returns None if the header is malformed, uses a unit other than bytes, or specifies multiple ranges;
+  RFC 9110 14.2 allows a server to ignore such headers and send the full representation.
+  Raises `UnsatisfiableRange` if the range does not overlap the representation.
+  See https://www.rfc-editor.org/rfc/rfc9110#section-14.1.
+  '''
+  unit, eq, spec = value.partition('=')
+  if not eq or unit.strip().lower() != 'bytes' or ',' in spec: return None
+  first, dash, last = spec.strip().partition('-')
+  if not dash: return None
+  # Validate the digits explicitly: `int` also accepts signs, underscores, whitespace and non-ASCII digits.
+  if not (first or last) or any(part and not (part.isascii() and part.isdigit()) for part in (first, last)): return None
+  if first: # `first-last` or `first-`.
+    start = int(first)
+    end = int(last) + 1 if last else size
+    if end <= start and last: return None
+  else: # Suffix range `-length`.
+    start = max(0, size - int(last))
+    end = size
+  if start >= size: raise UnsatisfiableRange(value)
+  return start, min(end, size)
+
+
+def if_range_matches(if_range:str, etag:str, last_modified:str) -> bool:
+  '''
+  Evaluate an `If-Range` precondition against the validators of the selected representation.
+  An entity tag matches only a strong, identical `etag`; a date matches only an identical `last_modified`.
+  An empty validator never matches.
+  See https://www.rfc-editor.org/rfc/rfc9110#section-13.1.5.
+  '''
+  if_range = if_range.strip()
+  if if_range.startswith(('"', 'W/')):
+    return bool(etag) and not etag.startswith('W/') and if_range == etag
+  if not last_modified: return False
+  date = parse_header_date(if_range)
+  return date is not None and date == parse_header_date(last_modified)
+
+
+def etag_list_matches(header:str, etag:str) -> bool:
+  '''
+  Evaluate an `If-None-Match` header value (a comma-separated list of entity tags, or '*') against `etag`,
+  using the weak comparison function. An empty `etag` never matches.
+  See https://www.rfc-editor.org/rfc/rfc9110#section-13.1.2.
+  '''
+  if not etag: return False
+  header = header.strip()
+  if header == '*': return True
+  opaque = etag.removeprefix('W/')
+  return any(tag.strip().removeprefix('W/') == opaque for tag in header.split(','))
+
+
+content_coding_exts = {
+  'br'   : '.br',
+  'zstd' : '.zst',
+  'gzip' : '.gz',
+}
+#^ Content codings that can be served from compressed files, in order of server preference, mapped to file extensions.
+
+
+def parse_accept_encoding(value:str) -> dict[str,float]:
+  '''
+  Parse an `Accept-Encoding` header value into a dict mapping lowercase coding names to quality values.
+  'x-gzip' is treated as 'gzip'. Malformed quality values are treated as 1.
+  See https://www.rfc-editor.org/rfc/rfc9110#section-12.5.3.
+  '''
+  codings:dict[str,float] = {}
+  for item in value.split(','):
+    coding, _, params = item.partition(';')
+    coding = coding.strip().lower()
+    if not coding: continue
+    if coding == 'x-gzip': coding = 'gzip'
+    q = 1.0
+    for param in params.split(';'):
+      k, _, v = param.partition('=')
+      if k.strip().lower() == 'q':
+        try: q = float(v)
+        except ValueError: pass
+    codings[coding] = q
+  return codings
+
+
+def negotiate_content_codings(accept_encoding:str, codings:Iterable[str]) -> list[str]:
+  '''
+  Return the members of `codings` that are acceptable according to an `Accept-Encoding` header value,
+  ordered by descending quality value and then by their order in `codings`, which expresses server preference.
+  A '*' entry applies to codings not otherwise listed.
+  '''
+  accepted = parse_accept_encoding(accept_encoding)
+  default_q = accepted.get('*', 0.0)
+  ranked = [(-accepted.get(coding, default_q), i, coding) for i, coding in enumerate(codings)]
+  ranked.sort()
+  return [coding for q, _, coding in ranked if q < 0]
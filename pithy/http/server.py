@@ -11,27 +11,35 @@ Since then it has been completely rewritten.
 curl -X POST -H 'Expect: 100-continue' -d "user=name&pass=12345" http://localhost:8080
 '''
 
+import socket
 import sys
+from asyncio import (AbstractEventLoop, Event as AsyncEvent, get_running_loop, IncompleteReadError, run as asyncio_run,
+  start_server, StreamReader, StreamWriter, wait_for)
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as DateTime
 from http import HTTPStatus
 from http.client import HTTPException, HTTPMessage, parse_headers
-from io import BufferedReader
+from io import BufferedReader, BytesIO
 from os import environ
-from shutil import copyfileobj
 from socket import socket as Socket
 from socketserver import StreamRequestHandler, ThreadingTCPServer
 from sys import exc_info, stderr
+from threading import Event
 from traceback import print_exception
-from typing import BinaryIO, cast, IO, TextIO
+from typing import BinaryIO, Callable, cast, Iterator, TextIO, TypeVar
 from urllib.parse import SplitResult as Url, urlsplit as url_split
 
-from ..web import Request, Response, ResponseError
+from ..web import content_length_for_file, is_streamed_body, Request, Response, ResponseError
 from ..web.app import WebApp
-from . import http_methods
+from . import format_header_date, http_methods
 
 
 __version__ = '0'
 
+_R = TypeVar('_R')
+
+_msg_more = getattr(socket, 'MSG_MORE', 0) # Linux only.
+
 
 class UnrecoverableServerError(Exception):
   'An error occurred for which the server cannot recover.'
@@ -208,47 +216,8 @@ class HttpRequestHandler(StreamRequestHandler):
 
 
   def parse_request(self) -> None:
-    if len(self.request_line_bytes) > 65536:
-      raise ResponseError(HTTPStatus.REQUEST_URI_TOO_LONG, reason='Request-URI Too Long')
-    self.request_line = request_line = str(self.request_line_bytes, 'latin1').rstrip('\r\n')
-    words = request_line.split(' ')
-    if not words:
-      raise ResponseError(HTTPStatus.BAD_REQUEST, 'Empty request line')
-    if len(words) != 3:
-      raise ResponseError(HTTPStatus.BAD_REQUEST, f'Bad request syntax: {request_line!r}')
-    method, target, version = words
-    try:
-      if not version.startswith('HTTP/'): raise ValueError
-      base_version_number = version.split('/', 1)[1]
-      version_numbers = base_version_number.split('.')
-      # RFC 2145 section 3.1 says:
-      # * there can be only one '.';
-      # * major and minor numbers MUST be treated as separate integers;
-      # * HTTP/2.4 is a lower version than HTTP/2.13, which in turn is lower than HTTP/12.3;
-      # * Leading zeros MUST be ignored by recipients.
-      if len(version_numbers) != 2: raise ValueError
-      version_number = (int(version_numbers[0]), int(version_numbers[1]))
-    except (ValueError, IndexError):
-      raise ResponseError(HTTPStatus.BAD_REQUEST, f'Bad request version: {version!r}')
-    if version_number < (1, 1) or version_number >= (2, 0):
-      raise ResponseError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, f'Unsupported HTTP version: {version_number}')
-
-    if method not in http_methods:
-      raise ResponseError(HTTPStatus.BAD_REQUEST, f'Unrecognized HTTP method: {method!r}')
-
-    self.method = method
-    self.target = target
-    try: self.url = url_split(target)
-    except ValueError: pass
-
-    # Parse headers.
-    try: raw_headers = parse_headers(cast(BinaryIO, self.rfile), _class=HTTPMessage)
-    except HTTPException as exc:
-      raise ResponseError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, f'{type(exc)}: {exc}')
-    for key, val in raw_headers.items():
-      # Conversion to dict must take into account possible reapeated headers, which by the spec should be joined into a single comma-separated value.
-      try: self.headers[key] = f'{self.headers[key]}, {val}'
-      except KeyError: self.headers[key] = val
+    self.request_line, self.method, self.target, self.url = parse_request_line(self.request_line_bytes)
+    self.headers = parse_request_headers(cast(BinaryIO, self.rfile))
 
     # Respect connection directive.
     conn_type = self.headers.get('Connection', '').lower()
@@ -271,15 +240,10 @@ class HttpRequestHandler(StreamRequestHandler):
 
     if self.close_connection:
       headers['Connection'] = 'close'
+    if is_streamed_body(response.body):
+      headers['Transfer-Encoding'] = 'chunked'
 
-    buffer = bytearray(f'{self.server.protocol_version} {status.value} {reason}\r\n'.encode('latin1'))
-    for k, v in headers.items():
-      buffer.extend(k.encode('latin1'))
-      buffer.extend(b': ')
-      assert isinstance(v, (float, int, str))
-      buffer.extend(str(v).encode('latin1'))
-      buffer.extend(b'\r\n')
-    buffer.extend(b'\r\n')
+    buffer = format_response_head(self.server.protocol_version, response, reason)
 
     if self.server.dbg:
       resp_str = buffer.decode('latin1', errors='replace')
@@ -287,20 +251,59 @@ class HttpRequestHandler(StreamRequestHandler):
         print(f'  DBG: {line!r}', file=self.server.err)
       print(file=self.server.err)
 
+    body = response.body
+    try:
+      if self.method == 'HEAD' or not body:
+        self.wfile.write(buffer)
+      elif isinstance(body, BufferedReader):
+        self.send_file_body(buffer, body, response.file_range)
+      elif isinstance(body, (bytes, bytearray)):
+        buffer.extend(body) # Coalesce the head and body into a single write.
+        self.wfile.write(buffer)
+      else:
+        self.send_chunked_body(buffer, body)
+    finally:
+      close_body(body)
+
+
+  def send_chunked_body(self, head:bytearray, chunks:Iterator[bytes]) -> None:
+    '''
+    Send the response head followed by a streamed body, using chunked transfer coding.
+    The head is coalesced with the first chunk.
+    If the body iterator raises, the error is logged and the connection is closed without the terminating chunk,
+    so that the client can tell that the response is incomplete.
+    '''
+    buffer = head
+    try:
+      for chunk in chunks:
+        if not chunk: continue # An empty chunk would terminate the body.
+        frame_chunk(buffer, chunk)
+        self.wfile.write(buffer)
+        buffer = bytearray()
+    except Exception as exc:
+      print('Exception while streaming response body to client:', self.client_address, file=self.server.err)
+      print_exception(type(exc), exc, exc.__traceback__, file=self.server.err)
+      self.close_connection = True
+      if buffer: self.wfile.write(buffer) # Send the head if the first chunk failed.
+      return
+    buffer.extend(b'0\r\n\r\n')
     self.wfile.write(buffer)
 
-    body = response.body
-    if self.method != 'HEAD' and body:
-      if isinstance(body, BufferedReader):
-        try: copyfileobj(cast(IO, body), self.wfile)
-        except OSError as e:
-          # No way to report the error to the client at this point.
-          print(f'Error while writing response body file: {e}', file=self.server.err)
-      elif body:
-        self.wfile.write(body)
 
-    if isinstance(body, BufferedReader):
-      body.close()
+  def send_file_body(self, head:bytearray, file:BufferedReader, file_range:tuple[int,int]|None) -> None:
+    '''
+    Send the response head followed by a file body.
+    The file is sent with `socket.sendfile`, which avoids copying through Python buffers where `os.sendfile` is available.
+    The head is sent with `MSG_MORE` where available, so that the kernel coalesces it with the start of the file.
+    '''
+    start, end = file_range or (0, content_length_for_file(file))
+    sock = self.connection
+    sock.sendall(head, _msg_more)
+    try: sock.sendfile(file, start, end - start)
+    except OSError as e:
+      # No way to report the error to the client at this point, and the connection is no longer in a known state.
+      print(f'Error while writing response body file: {e}', file=self.server.err)
+      self.close_connection = True
 
 
   def log_message(self, msg:str, *, file:TextIO) -> None:
@@ -311,3 +314,405 @@ class HttpRequestHandler(StreamRequestHandler):
   def client_address_ip(self) -> str:
     '''Return the client address, omitting the port.'''
     return cast(str, self.client_address[0])
+
+
+class AsyncHttpServer:
+  '''
+  AsyncHttpServer is an HTTP/1.1 server that drives all connections from a single asyncio event loop.
+  It implements the same `WebApp` / `Request` / `Response` contract as `HttpServer`,
+  but an idle keep-alive connection costs a suspended coroutine rather than a thread.
+
+  Request lines, headers and bodies are read without blocking the loop.
+  The request body is read completely before the app is called, up to `max_body_size` bytes;
+  chunked request bodies are not supported.
+  `WebApp.handle_request` is synchronous, so app calls are run on a thread pool of `workers` threads.
+  Connections are closed after `idle_timeout` seconds without a new request,
+  and when reading the rest of a request or writing a response takes longer than `request_timeout` seconds.
+  '''
+
+  unrecoverable_exception_types = HttpServer.unrecoverable_exception_types
+  server_version = HttpServer.server_version
+  protocol_version = HttpServer.protocol_version
+
+  max_line_length = 65537 # Same limit as `HttpRequestHandler.handle_one_request`.
+  max_header_count = 100 # Same limit as http.client.parse_headers.
+
+  # Instance properties.
+  app:WebApp
+  dbg:bool
+  host:str
+  port:int
+  err:TextIO
+  workers:int
+  idle_timeout:float
+  request_timeout:float
+  max_body_size:int
+  bound_port:int
+  ready:Event
+
+
+  def __init__(self, *, host:str, port:int, app:WebApp, err:TextIO=stderr, workers:int=8, idle_timeout:float=15.0,
+   request_timeout:float=30.0, max_body_size:int=1<<26) -> None:
+
+    self.host = host
+    self.port = port
+    self.app = app
+    self.err = err
+    self.workers = workers
+    self.idle_timeout = idle_timeout
+    self.request_timeout = request_timeout
+    self.max_body_size = max_body_size
+
+    self.dbg = environ.get('DEBUG') is not None
+    self.bound_port = 0 # Set once the server is listening; differs from `port` when `port` is 0.
+    self.ready = Event() # Set once the server is listening.
+    self._stopped = Event()
+    self._loop:AbstractEventLoop|None = None
+    self._shutdown_event:AsyncEvent|None = None
+    self._executor:ThreadPoolExecutor|None = None
+    self._writers:set[StreamWriter] = set()
+    self._unrecoverable_error:BaseException|None = None
+
+
+  def serve_forever(self) -> None:
+    'Run the event loop on the calling thread until `shutdown` is called.'
+    asyncio_run(self.serve())
+
+
+  def shutdown(self) -> None:
+    '''
+    Stop the server and block until it has finished.
+    As with `socketserver.BaseServer.shutdown`, this must be called from a thread other than the serving thread.
+    '''
+    self.ready.wait()
+    assert self._loop is not None and self._shutdown_event is not None
+    self._loop.call_soon_threadsafe(self._shutdown_event.set)
+    self._stopped.wait()
+
+
+  async def serve(self) -> None:
+    'Serve until `shutdown` is called. Use this instead of `serve_forever` to run the server on an existing event loop.'
+    self._loop = get_running_loop()
+    self._shutdown_event = AsyncEvent()
+    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='AsyncHttpServer')
+    self._stopped.clear()
+    try:
+      server = await start_server(self.handle_connection, host=self.host, port=self.port, reuse_address=True,
+        limit=self.max_line_length)
+      self.bound_port = server.sockets[0].getsockname()[1]
+      print(f'Serving {self.host}:{self.bound_port}…')
+      self.ready.set()
+      await self._shutdown_event.wait()
+      server.close()
+      for writer in tuple(self._writers): writer.close()
+      await server.wait_closed()
+    finally:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+      self.ready.set() # Do not leave `shutdown` callers blocked if the server failed to start.
+      self._stopped.set()
+    if self._unrecoverable_error is not None:
+      raise UnrecoverableServerError from self._unrecoverable_error
+
+
+  async def handle_connection(self, reader:StreamReader, writer:StreamWriter) -> None:
+    'Handle all requests on a single connection.'
+    self._writers.add(writer)
+    peer = writer.get_extra_info('peername')
+    client_ip = str(peer[0]) if peer else '?'
+    reuse_count = 0
+    try:
+      while await self.handle_one_request(reader, writer, client_ip):
+        reuse_count += 1
+    except ConnectionAbortedError: pass # Closed by the server after logging the cause.
+    except (ConnectionResetError, BrokenPipeError, IncompleteReadError):
+      self.log_message(client_ip, f'Connection reset by peer after {reuse_count} requests.')
+    except TimeoutError as e:
+      self.log_message(client_ip, f'Request timed out: {e}')
+    finally:
+      self._writers.discard(writer)
+      writer.close()
+      try: await writer.wait_closed()
+      except OSError: pass
+
+
+  async def handle_one_request(self, reader:StreamReader, writer:StreamWriter, client_ip:str) -> bool:
+    '''
+    Handle a single HTTP request. Return True if the connection should be kept alive.
+    '''
+    try: request_line_bytes = await wait_for(reader.readline(), self.idle_timeout)
+    except TimeoutError: return False # Idle connection; close it silently.
+    except ValueError: request_line_bytes = b'' # The line exceeded the stream limit.
+    else:
+      # If no data is received, do not send a response; just close the connection.
+      if not request_line_bytes: return False
+
+    request_line = ''
+    method = ''
+    request:Request|None = None
+    close_connection = True
+    try:
+      if not request_line_bytes: raise ResponseError(HTTPStatus.REQUEST_URI_TOO_LONG, reason='Request-URI Too Long')
+      request_line, method, target, url = parse_request_line(request_line_bytes)
+      header_bytes = await wait_for(self.read_header_block(reader), self.request_timeout)
+      headers = parse_request_headers(BytesIO(header_bytes))
+      close_connection = 'close' in headers.get('Connection', '').lower()
+
+      if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        raise ResponseError(HTTPStatus.NOT_IMPLEMENTED, reason='Chunked request bodies are not supported')
+
+      request = Request(
+        method=method,
+        scheme='http', # TODO: this is not accurate.
+        host=self.host,
+        port=self.bound_port,
+        path=url.path,
+        query=url.query,
+        body_file=BytesIO(),
+        err=self.err,
+        is_multiprocess=False,
+        is_multithread=True,
+        headers=headers)
+
+      if request.content_length > self.max_body_size:
+        raise ResponseError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, reason='Request body too large')
+
+      # Handle 'Expect' header.
+      if headers.get('Expect', '').lower() == '100-continue':
+        expect_response = await self.run_app(self.app.handle_expect_100_continue, request)
+        await self.send_response(writer, client_ip, request_line, method, expect_response, close_connection)
+        if expect_response.status != HTTPStatus.CONTINUE:
+          # See the corresponding comment in `HttpRequestHandler.handle_one_request`.
+          return False
+
+      if request.content_length > 0:
+        body = await wait_for(reader.readexactly(request.content_length), self.request_timeout)
+        request.body_file = BytesIO(body)
+
+    except ResponseError as e:
+      close_connection = True
+      response = e.response(method)
+      if request is None: # The app cannot fill in the headers without a request.
+        response.headers['Date'] = format_header_date()
+        response.headers['Connection'] = 'close'
+      else:
+        self.app.fill_response_headers(request, response, close_connection=True)
+      await self.send_response(writer, client_ip, request_line, method, response, close_connection, reason=e.reason)
+      return False
+
+    try: response, reason, close_connection = await self.run_app(self.respond, request, close_connection)
+    except Exception as exc:
+      self.handle_error(client_ip, exc)
+      response = ResponseError(HTTPStatus.INTERNAL_SERVER_ERROR).response(method)
+      self.app.fill_response_headers(request, response, close_connection=True)
+      reason = ''
+      close_connection = True
+
+    await self.send_response(writer, client_ip, request_line, method, response, close_connection, reason=reason)
+    return not close_connection
+
+
+  def respond(self, request:Request, close_connection:bool) -> tuple[Response,str,bool]:
+    '''
+    Call the app to handle a request and fill in the response headers.
+    This runs on a worker thread.
+    Returns the response, the reason phrase, and whether the connection should be closed.
+    '''
+    app = self.app
+    try:
+      response = app.handle_request(request)
+      reason = ''
+    except ResponseError as e:
+      close_connection = True
+      response = e.response(request.method)
+      reason = e.reason
+    app.fill_response_headers(request, response, close_connection=close_connection)
+    return response, reason, close_connection
+
+
+  async def run_app(self, fn:Callable[...,_R], *args:object) -> _R:
+    'Run a synchronous app function on the worker thread pool.'
+    assert self._loop is not None
+    return await self._loop.run_in_executor(self._executor, fn, *args)
+
+
+  async def read_header_block(self, reader:StreamReader) -> bytes:
+    'Read the header lines of a request, including the terminating empty line.'
+    lines:list[bytes] = []
+    while True:
+      try: line = await reader.readline()
+      except ValueError:
+        raise ResponseError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, reason='Header line too long') from None
+      if not line: raise IncompleteReadError(b''.join(lines), None)
+      lines.append(line)
+      if line in (b'\r\n', b'\n'): return b''.join(lines)
+      if len(lines) > self.max_header_count:
+        raise ResponseError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, reason='Too many headers')
+
+
+  async def send_response(self, writer:StreamWriter, client_ip:str, request_line:str, method:str, response:Response,
+   close_connection:bool, reason:str='') -> None:
+    '''
+    Send the response to the client.
+    Adds a `Connection: close` header if `close_connection` is set.
+    '''
+    status = response.status
+    headers = response.headers
+
+    self.log_message(client_ip, f'{status.value} {reason} {request_line!r}')
+
+    if close_connection:
+      headers['Connection'] = 'close'
+    if is_streamed_body(response.body):
+      headers['Transfer-Encoding'] = 'chunked'
+
+    buffer = format_response_head(self.protocol_version, response, reason)
+
+    if self.dbg:
+      resp_str = buffer.decode('latin1', errors='replace')
+      for line in resp_str.splitlines(keepends=True):
+        print(f'  DBG: {line!r}', file=self.err)
+      print(file=self.err)
+
+    body = response.body
+    try:
+      if method == 'HEAD' or not body:
+        writer.write(buffer)
+      elif isinstance(body, BufferedReader):
+        writer.write(buffer)
+        await wait_for(writer.drain(), self.request_timeout)
+        assert self._loop is not None
+        start, end = response.file_range or (0, content_length_for_file(body))
+        try: await self._loop.sendfile(writer.transport, body, start, end - start)
+        except OSError as e:
+          # No way to report the error to the client at this point.
+          print(f'Error while writing response body file: {e}', file=self.err)
+          raise ConnectionResetError from e
+      elif isinstance(body, (bytes, bytearray)):
+        buffer.extend(body) # Coalesce the head and body into a single write.
+        writer.write(buffer)
+      else:
+        await self.send_chunked_body(writer, client_ip, buffer, body)
+      await wait_for(writer.drain(), self.request_timeout)
+    finally:
+      close_body(body)
+
+
+  async def send_chunked_body(self, writer:StreamWriter, client_ip:str, head:bytearray, chunks:Iterator[bytes]) -> None:
+    '''
+    Send the response head followed by a streamed body, using chunked transfer coding.
+    The body iterator is advanced on the worker thread pool, since producing chunks may block or take significant time.
+    If the iterator raises, the error is logged and the connection is aborted without the terminating chunk.
+    '''
+    buffer = head
+    while True:
+      try: chunk = await self.run_app(next, chunks, None)
+      except Exception as exc:
+        self.handle_error(client_ip, exc)
+        writer.write(buffer)
+        raise ConnectionAbortedError('response body stream failed') from exc
+      if chunk is None: break
+      if not chunk: continue # An empty chunk would terminate the body.
+      frame_chunk(buffer, chunk)
+      writer.write(buffer)
+      buffer = bytearray()
+      await wait_for(writer.drain(), self.request_timeout)
+    buffer.extend(b'0\r\n\r\n')
+    writer.write(buffer)
+
+
+  def handle_error(self, client_ip:str, exc:Exception) -> None:
+    '''
+    Log an exception raised by the app.
+    As with `HttpServer.handle_error`, unrecoverable errors stop the server.
+    '''
+    print('Exception while handling request from client:', client_ip, file=self.err)
+    print_exception(type(exc), exc, exc.__traceback__, file=self.err)
+    print('-'*40, file=self.err)
+    if isinstance(exc, self.unrecoverable_exception_types):
+      self._unrecoverable_error = exc
+      assert self._shutdown_event is not None
+      self._shutdown_event.set()
+
+
+  def log_message(self, client_ip:str, msg:str) -> None:
+    'Base logging function called by all others.'
+    print(f'{DateTime.now()}  {client_ip}: {msg}', file=self.err)
+
+
+def parse_request_line(request_line_bytes:bytes) -> tuple[str,str,str,Url]:
+  '''
+  Parse an HTTP/1.1 request line.
+  Returns the decoded request line, the method, the target, and the split target URL.
+  Raises `ResponseError` for malformed or unsupported requests.
+  '''
+  if len(request_line_bytes) > 65536:
+    raise ResponseError(HTTPStatus.REQUEST_URI_TOO_LONG, reason='Request-URI Too Long')
+  request_line = str(request_line_bytes, 'latin1').rstrip('\r\n')
+  words = request_line.split(' ')
+  if not words:
+    raise ResponseError(HTTPStatus.BAD_REQUEST, 'Empty request line')
+  if len(words) != 3:
+    raise ResponseError(HTTPStatus.BAD_REQUEST, f'Bad request syntax: {request_line!r}')
+  method, target, version = words
+  try:
+    if not version.startswith('HTTP/'): raise ValueError
+    base_version_number = version.split('/', 1)[1]
+    version_numbers = base_version_number.split('.')
+    # RFC 2145 section 3.1 says:
+    # * there can be only one '.';
+    # * major and minor numbers MUST be treated as separate integers;
+    # * HTTP/2.4 is a lower version than HTTP/2.13, which in turn is lower than HTTP/12.3;
+    # * Leading zeros MUST be ignored by recipients.
+    if len(version_numbers) != 2: raise ValueError
+    version_number = (int(version_numbers[0]), int(version_numbers[1]))
+  except (ValueError, IndexError):
+    raise ResponseError(HTTPStatus.BAD_REQUEST, f'Bad request version: {version!r}')
+  if version_number < (1, 1) or version_number >= (2, 0):
+    raise ResponseError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, f'Unsupported HTTP version: {version_number}')
+
+  if method not in http_methods:
+    raise ResponseError(HTTPStatus.BAD_REQUEST, f'Unrecognized HTTP method: {method!r}')
+
+  try: url = url_split(target)
+  except ValueError: url = url_split('')
+  return request_line, method, target, url
+
+
+def parse_request_headers(file:BinaryIO) -> dict[str,str]:
+  'Parse request headers from `file` into a dict, joining repeated headers.'
+  try: raw_headers = parse_headers(file, _class=HTTPMessage)
+  except HTTPException as exc:
+    raise ResponseError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, f'{type(exc)}: {exc}')
+  headers:dict[str,str] = {}
+  for key, val in raw_headers.items():
+    # Conversion to dict must take into account possible reapeated headers, which by the spec should be joined into a single comma-separated value.
+    try: headers[key] = f'{headers[key]}, {val}'
+    except KeyError: headers[key] = val
+  return headers
+
+
+def frame_chunk(buffer:bytearray, chunk:bytes) -> None:
+  'Append `chunk` to `buffer` with chunked transfer coding framing.'
+  buffer.extend(b'%x\r\n' % len(chunk))
+  buffer.extend(chunk)
+  buffer.extend(b'\r\n')
+
+
+def close_body(body:object) -> None:
+  'Close a file or streamed response body, if it supports closing.'
+  if isinstance(body, (bytes, bytearray)) or body is None: return
+  close = getattr(body, 'close', None)
+  if close is not None: close()
+
+
+def format_response_head(protocol_version:str, response:Response, reason:str) -> bytearray:
+  'Format the status line and headers of a response, including the terminating empty line.'
+  buffer = bytearray(f'{protocol_version} {response.status.value} {reason}\r\n'.encode('latin1'))
+  for k, v in response.headers.items():
+    buffer.extend(k.encode('latin1'))
+    buffer.extend(b': ')
+    assert isinstance(v, (float, int, str))
+    buffer.extend(str(v).encode('latin1'))
+    buffer.extend(b'\r\n')
+  buffer.extend(b'\r\n')
+  return buffer
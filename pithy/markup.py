@@ -12,15 +12,21 @@ Some use cases include:
 '''
 
 import re
+from bisect import bisect_left, bisect_right
 from collections import Counter
-from functools import wraps
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from hashlib import blake2b
 from inspect import get_annotations
+from io import Writer
 from itertools import chain
-from typing import Any, Callable, cast, ClassVar, Generator, Iterable, Iterator, Mapping, Match, overload, Self, TypeVar
+from types import MappingProxyType
+from typing import (Any, BinaryIO, Callable, cast, ClassVar, Generator, Iterable, Iterator, Mapping, Match, overload,
+  ParamSpec, Self, TypeVar)
 from xml.etree.ElementTree import Element
 
 from .exceptions import ConflictingValues, DeleteNode, FlattenNode, MultipleMatchesError, NoMatchError
-from .iterable import window_iter, window_pairs
+from .iterable import window_pairs
 from .json import render_json
 from .reprs import repr_lim
 from .string import EscapedStr
@@ -32,6 +38,7 @@ except ImportError: Comment = object() # type: ignore[assignment] # Comment is a
 
 
 _T = TypeVar('_T')
+_P = ParamSpec('_P')
 
 # Attr values are currently Any so that we can preserve exact numerical values and pass lists/dicts as JSON.
 MuAttrs = dict[str,Any]
@@ -104,11 +111,16 @@ class Mu:
     'class': -1,
   }
 
-  __slots__ = ('attrs', '_', '_orig', '_parent')
+  render_prefix:ClassVar[str] = '' # Text preceding the root node when rendering a document, e.g. a doctype declaration.
+
+  __slots__ = ('attrs', '_', '_orig', '_parent', '_frozen', '_index', '_is_clean')
 
   # Instance attributes.
   attrs:MuAttrs
-  _:list['MuChild']
+  _:list['MuChild']|tuple['MuChild',...] # A tuple once frozen; see `freeze`.
+  _frozen:'_FrozenRender|None' # Set on the root of a frozen subtree by `freeze`.
+  _index:'MuIndex|None' # Set on every node of an indexed tree by `index`.
+  _is_clean:bool # Set by `clean` and cleared when children are mutated through the node API.
 
   def __init__(self,
    *_mu_positional_children:'MuChildLax', # Children can be passed as positional arguments.
@@ -157,6 +169,9 @@ class Mu:
 
     self._orig = _orig
     self._parent = _parent
+    self._frozen = None
+    self._index = None
+    self._is_clean = False
 
     # TODO: disallow both positional children and `_` arguments.
 
@@ -225,11 +240,15 @@ class Mu:
 
   def __contains__(self, key:str) -> bool: return key in self.attrs
 
-  def __delitem__(self, key:str) -> Any: del self.attrs[key]
+  def __delitem__(self, key:str) -> Any:
+    if key in _indexed_attrs: self._invalidate_index()
+    del self._writable_attrs()[key]
 
   def __getitem__(self, key:str) -> Any: return self.attrs[key]
 
-  def __setitem__(self, key:str, val:Any) -> Any: self.attrs[key] = val
+  def __setitem__(self, key:str, val:Any) -> Any:
+    if key in _indexed_attrs: self._invalidate_index()
+    self._writable_attrs()[key] = val
 
   def get(self, key:str, default:Any=None) -> Any: return self.attrs.get(key, default)
 
@@ -251,7 +270,25 @@ class Mu:
     If kwargs are provided, those keys will have underscores replaced with hyphens.
     '''
     kwargs = { k.replace('_', '-'): v for k, v in kwargs.items() }
-    self.attrs.update(attrs, **kwargs)
+    self._invalidate_index()
+    self._writable_attrs().update(attrs, **kwargs)
+
+
+  def _writable_attrs(self) -> MuAttrs:
+    '''
+    Return the attrs dict, first replacing the shared empty mapping of a `raw` node with a new dict.
+    `subnode` calls this before aliasing the attrs, so that a subnode and its original always share a dict.
+    '''
+    attrs = self.attrs
+    if attrs is _empty_attrs: attrs = self.attrs = {}
+    return attrs
+
+
+  def _writable_children(self) -> list['MuChild']:
+    'Return the children list for mutation. Raises TypeError if the node is frozen, in which case the children are a tuple.'
+    children = self._
+    if isinstance(children, tuple): raise TypeError(f'cannot mutate the children of a frozen node: {self}')
+    return children
 
 
   @classmethod
@@ -279,24 +316,108 @@ class Mu:
   @classmethod
   def from_etree(cls:type['Mu'], el:Element) -> 'Mu':
     '''
-    Create a Mu object (possibly subclass by tag) from a standard library element tree.
+    Create a Mu object (possibly subclass by tag) from a standard library or lxml element tree.
     Note: this handles lxml comment objects specially, by turning them into nodes with a '!COMMENT' tag.
+    The conversion is iterative, so arbitrarily deep trees do not hit the recursion limit.
+    Attribute mappings are copied, so the resulting tree does not reference the element tree.
     '''
+    root = cls._node_from_etree(el)
+    # Each node is created before its children, with a children list that is filled as the element's children are visited.
+    # Note: we use the dynamically chosen class of each node to create its children,
+    # so that we can transition between subclass families of Mu, particularly between HTML and SVG.
+    stack:list[tuple[Mu,Iterator[Element]]] = [(root, iter(el))]
+    while stack:
+      node, el_iter = stack[-1]
+      child_el = next(el_iter, None)
+      if child_el is None:
+        stack.pop()
+        continue
+      child = type(node)._node_from_etree(child_el)
+      children = node._writable_children()
+      children.append(child)
+      tail = child_el.tail
+      if tail: children.append(tail)
+      stack.append((child, iter(child_el)))
+    return root
+
+
+  @classmethod
+  def _node_from_etree(cls, el:Element) -> 'Mu':
+    'Create a childless node for `el`, containing only its leading text.'
     tag = el.tag
     if tag is Comment: tag = '!COMMENT' # `Comment` is a cython object; convert it to a string.
-    # Collect children.
-    attrs = el.attrib
-    children:MuChildren = []
     text = el.text
-    if text: children.append(text)
     TagClass = cls.tag_types.get(tag, cls.generic_tag_type)
-    for child in el:
-      children.append(TagClass.from_etree(child))
-      #^ Note: we use the dynamically chosen TagClass when recursing,
-      # so that we can transition between subclass families of Mu, particularly between HTML and SVG.
-      text = child.tail
-      if text: children.append(text)
-    return TagClass(tag=tag, attrs=attrs, _=children)
+    return TagClass(tag=tag, attrs=dict(el.attrib), _=([text] if text else []))
+
+
+  @classmethod
+  def iterparse(cls, file:Any, tags:Iterable[str], *, html:bool=False, **kwargs:Any) -> Iterator['Mu']:
+    '''
+    Incrementally parse a document with `lxml.etree.iterparse`, yielding a Mu subtree for each element whose tag is in `tags`.
+    `file` is a path or binary file object; `kwargs` are passed to `iterparse` (e.g. `encoding`, `huge_tree`).
+    Only the outermost matching elements are yielded; matches nested inside them are part of their subtrees.
+    After each subtree is converted, the element is cleared and the completed preceding siblings of it and its ancestors
+    are deleted, so memory use is bounded by the size of the largest subtree rather than the size of the document.
+    Text and elements outside of matching subtrees are discarded.
+    '''
+    from lxml import etree
+    tags = tuple(tags)
+    if not tags: raise ValueError('iterparse requires at least one tag.')
+    open_matches = 0 # Number of currently open matching elements; only outermost matches are converted.
+    for event, el in etree.iterparse(file, events=('start', 'end'), tag=tags, html=html, **kwargs):
+      if event == 'start':
+        open_matches += 1
+        continue
+      open_matches -= 1
+      if open_matches: continue
+      yield cls.from_etree(el)
+      el.clear(keep_tail=False)
+      for node in chain((el,), el.iterancestors()):
+        parent = node.getparent()
+        if parent is None: break
+        while node.getprevious() is not None: del parent[0]
+        #^ Delete completed preceding siblings. These are always at the front of the parent,
+        # because earlier siblings were deleted in the same manner.
+
+
+  @classmethod
+  def raw(cls, attrs:MuAttrs|None=None, children:list['MuChild']|None=None, *, tag:str='') -> Self:
+    '''
+    Trusted constructor that bypasses the validation and normalization performed by `__init__`.
+    This is intended for bulk construction from data that is already known to be valid, e.g. by deserializers and table builders.
+    `attrs` keys must be final (hyphenated) names, and `children` must contain only `str`, `EscapedStr` and `Mu` values.
+    Both are used by reference, and subclass initializers are not called.
+    `tag` should only be set for classes with a `tag` slot, when it differs from the class tag.
+    If `attrs` is omitted, the node shares a read-only empty mapping until the first write through the node API
+    (e.g. `node[key] = val`, `update`, or the `cl` and `id` setters); direct writes to `node.attrs` require a dict.
+    '''
+    node = object.__new__(cls)
+    if tag: node.tag = tag # type: ignore[misc]
+    node.attrs = _empty_attrs if attrs is None else attrs
+    node._ = [] if children is None else children
+    node._orig = None
+    node._parent = None
+    node._frozen = None
+    node._index = None
+    node._is_clean = False
+    return node
+
+
+  @classmethod
+  def load_bin(cls:type['Mu'], file:BinaryIO) -> 'Mu':
+    '''
+    Read a tree written by `dump_bin`. Node types are chosen by `tag_types` dispatch, as with `from_raw`.
+    This is roughly three times faster than parsing the original HTML or XML document.
+    '''
+    from .markup_bin import load_mu_bin
+    return load_mu_bin(cls, file)
+
+
+  def dump_bin(self, file:BinaryIO) -> None:
+    'Write a compact msgpack encoding of the tree to `file`. See `pithy.markup_bin`.'
+    from .markup_bin import dump_mu_bin
+    dump_mu_bin(self, file)
 
 
   @property
@@ -308,15 +429,19 @@ class Mu:
 
   @property
   def parent(self) -> 'Mu':
-    'If the node is a subnode, return the parent. Otherwise raise ValueError.'
-    if self._parent is None: raise ValueError(f'node is not a subnode: {self}')
-    return self._parent
+    '''
+    If the node is a subnode, return the parent. Otherwise, if the node is part of an indexed tree, return the parent
+    as recorded by the index. Otherwise raise ValueError.
+    '''
+    if self._parent is not None: return self._parent
+    if (index := self._live_index()) is not None and (parent := index.parent(self)) is not None: return parent
+    raise ValueError(f'node is not a subnode: {self}')
 
 
   def subnode(self:_Mu, parent:'Mu') -> _Mu:
     'Create a subnode for `self` referencing the provided `parent`.'
     if self._orig is not None: raise ValueError(f'node is already a subnode: {self}')
-    return type(self)(tag=self.tag, attrs=self.attrs, _=self._, _orig=self, _parent=parent)
+    return type(self)(tag=self.tag, attrs=self._writable_attrs(), _=self._, _orig=self, _parent=parent)
 
 
   def child_items(self, ws:bool=False, traversable:bool=False) -> Iterator[tuple[int,'MuChild']]:
@@ -385,10 +510,10 @@ class Mu:
     return str(self.attrs.get('class', ''))
 
   @cl.setter
-  def cl(self, val:str) -> None: self.attrs['class'] = val
+  def cl(self, val:str) -> None: self['class'] = val
 
   @cl.deleter
-  def cl(self) -> None: del self.attrs['class']
+  def cl(self) -> None: del self['class']
 
 
   @property
@@ -399,23 +524,27 @@ class Mu:
   @classes.setter
   def classes(self, val:str|Iterable[str]) -> None:
     if not isinstance(val, str): val = ' '.join(val)
-    self.attrs['class'] = val
+    self['class'] = val
 
   @classes.deleter
-  def classes(self) -> None: del self.attrs['class']
+  def classes(self) -> None: del self['class']
 
 
   def prepend_class(self, cl:str) -> Self:
-    try: existing = self.attrs['class']
-    except KeyError: self.attrs['class'] = cl
-    else: self.attrs['class'] = f'{cl} {existing}'
+    self._invalidate_index()
+    attrs = self._writable_attrs()
+    try: existing = attrs['class']
+    except KeyError: attrs['class'] = cl
+    else: attrs['class'] = f'{cl} {existing}'
     return self
 
 
   def append_class(self, cl:str) -> Self:
-    try: existing = self.attrs['class']
-    except KeyError: self.attrs['class'] = cl
-    else: self.attrs['class'] = f'{existing} {cl}'
+    self._invalidate_index()
+    attrs = self._writable_attrs()
+    try: existing = attrs['class']
+    except KeyError: attrs['class'] = cl
+    else: attrs['class'] = f'{existing} {cl}'
     return self
 
 
@@ -423,10 +552,10 @@ class Mu:
   def id(self) -> str: return str(self.attrs.get('id', ''))
 
   @id.setter
-  def id(self, val:str) -> None: self.attrs['id'] = val
+  def id(self, val:str) -> None: self['id'] = val
 
   @id.deleter
-  def id(self) -> None: del self.attrs['id']
+  def id(self) -> None: del self['id']
 
 
   def all_ids(self) -> set[str]:
@@ -453,7 +582,9 @@ class Mu:
       assert child._orig._orig is None
       child = child._orig
     if not isinstance(child, mu_child_classes): raise TypeError(child)
-    self._.append(child)
+    self._is_clean = False
+    if self._index is not None or self._orig is not None: self._children_changed()
+    self._writable_children().append(child)
     return child # The type of child._orig is the same as child.
 
 
@@ -470,51 +601,174 @@ class Mu:
           self.append(el)
 
 
-  def clean(self, deep:bool=True) -> None:
-    # Consolidate consecutive strings.
-    children:list[MuChild] = []
-    for c in self._:
-      if isinstance(c, Mu):
-        if deep: c.clean(deep)
-      elif isinstance(c, str):
-        if not c: continue # Do not append.
-        if children and isinstance(children[-1], str): # Consolidate.
-          children[-1] += c
-          continue # Do not append.
-      else:
-        raise ValueError(c) # Not mu_child_classes.
-      children.append(c)
+  def clean(self, deep:bool=True, *, force:bool=False) -> 'MuCleanStats':
+    '''
+    Normalize the children of this node, and of all descendants if `deep` is true:
+    * consecutive strings are merged and empty strings are removed;
+    * except in whitespace-sensitive elements, text adjacent to block elements and at the edges of blocks is stripped,
+      and remaining runs of whitespace are collapsed to a single newline or space.
+    Nodes that have been cleaned and whose children have not since been mutated through the node API are skipped,
+    unless `force` is true. Direct mutation of `_` is not tracked. Returns statistics about the work done.
+    '''
+    stats = MuCleanStats()
+    stack:list[Mu] = [self]
+    while stack:
+      node = stack.pop()
+      stats.nodes_visited += 1
+      if deep:
+        for c in node._:
+          if isinstance(c, Mu): stack.append(c)
+      if node._is_clean and not force:
+        stats.nodes_skipped += 1
+        continue
+      node._clean_children(stats)
+    return stats
+
 
+  def _clean_children(self, stats:'MuCleanStats') -> None:
+    '''
+    Clean the children list of this node in a single pass. See `clean`.
+    Each run of strings is merged, and then stripped according to the block status of the neighboring elements.
+    '''
+    tag = self.tag
     inline_tags = self.inline_tags
+    normalize_ws = tag not in self.ws_sensitive_tags
+    is_block = tag not in inline_tags
+    old_children = self._
+    children:list[MuChild] = []
+    changed = False
+    text = '' # The pending run of strings.
+    text_count = 0 # The number of strings in the pending run, which is used to detect merges.
+    prev:Mu|None = None # The element preceding the pending run.
+    for c in chain(old_children, (None,)): # The `None` sentinel flushes the final run.
+      if isinstance(c, str):
+        text += c
+        text_count += 1
+        continue
+      if c is not None and not isinstance(c, Mu): raise ValueError(c) # Not mu_child_classes.
+      if text_count:
+        if text_count > 1:
+          stats.strings_merged += text_count - 1
+          changed = True
+        orig_text = text
+        if normalize_ws:
+          # Strip strings adjacent to block elements. If this element is a block, strip text at beginning and end.
+          # Note that the first and last strings are only stripped at the edges of the block.
+          if prev is None:
+            if is_block: text = text.lstrip()
+            if c is None and is_block: text = text.rstrip()
+          elif c is None:
+            if is_block: text = text.rstrip()
+          else:
+            if prev.tag not in inline_tags: text = text.lstrip()
+            if c.tag not in inline_tags: text = text.rstrip()
+          # Reduce remaining, repeated whitespace down to single '\n' and ' ' characters.
+          # https://www.w3.org/TR/CSS22/text.html#white-space-model
+          # https://drafts.csswg.org/css-text-3/#white-space-phase-1
+          if text:
+            text = _ws_space_run_re.sub(' ', _ws_newline_run_re.sub('\n', text))
+        if text: children.append(text)
+        else: stats.strings_removed += 1
+        if text != orig_text or (text_count == 1 and not orig_text): changed = True
+        text = ''
+        text_count = 0
+      if c is not None:
+        children.append(c)
+        prev = c
+    self._is_clean = True
+    if changed:
+      stats.nodes_changed += 1
+      self._children_changed()
+      self._is_clean = True
+      self._writable_children()[:] = children # Mutate the original array beacuse it may be aliased by subnodes.
+
+
+  def _children_changed(self) -> None:
+    'Mark the node as needing `clean`, and invalidate the index of its tree, if any.'
+    self._is_clean = False
+    if self._orig is not None: self._orig._is_clean = False
+    self._invalidate_index()
+
+
+  # Freezing.
+
+  @property
+  def is_frozen(self) -> bool:
+    'True if the node has been frozen, either directly or as a descendant of a frozen node.'
+    return type(self._) is tuple
+
+
+  def freeze(self) -> Self:
+    '''
+    Make the subtree immutable so that its rendered text can be cached.
+    Children lists are converted to tuples and attrs dicts are copied into read-only mappings;
+    subsequent mutation raises an error. Attribute values are not copied, so list and dict values must not be mutated.
+    The subtree is rendered the first time it is needed, and containing trees splice in the cached text.
+    Returns `self`, so that construction and freezing can be chained.
+    '''
+    if self._frozen is not None: return self
+    stack:list[Mu] = [self]
+    while stack:
+      node = stack.pop()
+      if type(node._) is tuple: continue # Already frozen as part of another subtree.
+      if node._orig is not None: raise ValueError(f'cannot freeze a subnode: {node}')
+      node.attrs = cast(MuAttrs, MappingProxyType(dict(node.attrs)))
+      node._ = tuple(node._)
+      stack.extend(c for c in node._ if isinstance(c, Mu))
+    self._frozen = _FrozenRender()
+    return self
+
 
-    if self.tag not in self.ws_sensitive_tags:
-      # Strip strings adjacent to block elements.
-      for i, (p, c, n) in enumerate(window_iter(children, width=3), 1):
-        if not isinstance(c, str): continue
-        assert isinstance(p, Mu)
-        assert isinstance(n, Mu)
-        if p.tag not in inline_tags: c = c.lstrip()
-        if n.tag not in inline_tags: c = c.rstrip()
-        children[i] = c
+  def frozen_text(self) -> EscapedStr:
+    'Return the cached rendered text of a frozen node, rendering it on first use.'
+    frozen = self._frozen
+    if frozen is None: raise ValueError(f'node is not frozen: {self}')
+    if frozen.text is None:
+      parts:list[str] = []
+      self._render_parts(parts, [self], frozen_root=self)
+      frozen.text = EscapedStr(''.join(parts))
+    return frozen.text
 
-      # If this element is a block, strip text at beginning and end.
-      if children and self.tag not in inline_tags:
-        c0 = children[0]
-        if isinstance(c0, str): children[0] = c0.lstrip()
-        cl = children[-1]
-        if isinstance(cl, str): children[-1] = cl.rstrip()
 
-      children = [c for c in children if c] # Filter now-empty text elements.
+  @property
+  def content_hash(self) -> str:
+    'A hex digest of the rendered text of a frozen node, suitable for cache validation (e.g. HTTP ETags).'
+    frozen = self._frozen
+    if frozen is None: raise ValueError(f'node is not frozen: {self}')
+    if not frozen.hash:
+      frozen.hash = blake2b(self.frozen_text().string.encode(), digest_size=16).hexdigest()
+    return frozen.hash
 
-      # Reduce remaining, repeated whitespace down to single '\n' and ' ' characters.
-      # https://www.w3.org/TR/CSS22/text.html#white-space-model
-      # https://drafts.csswg.org/css-text-3/#white-space-phase-1
-      for i in range(len(children)):
-        c = children[i]
-        if isinstance(c, str):
-          children[i] = html_ws_re.sub(newline_or_space_for_ws, c)
 
-    self._[:] = children # Mutate the original array beacuse it may be aliased by subnodes.
+  # Indexing.
+
+  def index(self) -> 'MuIndex':
+    '''
+    Return the index of the tree containing this node, building an index rooted at this node if there is none.
+    Once a tree is indexed, `find_all` and the methods built on it look up candidates by tag, type, class, or id
+    instead of walking the tree, and `parent`, `next`, and `prev` work for ordinary (non-subnode) nodes.
+    Mutation through `append`, `extend`, `clean`, `visit`, and the attribute setters marks the index stale,
+    and it is rebuilt on the next lookup. Direct mutation of `attrs` or `_` is not tracked.
+    '''
+    index = self._index
+    if index is None or not index.valid: index = MuIndex(self)
+    return index
+
+
+  def _live_index(self) -> 'MuIndex|None':
+    'Return a valid index containing this node, rebuilding a stale index; None if the node has never been indexed.'
+    node = self if self._orig is None else self._orig
+    index = node._index
+    if index is None: return None
+    if not index.valid:
+      index = index.root.index()
+      if index.position(node) is None: return None # The node was removed from the indexed tree.
+    return index
+
+
+  def _invalidate_index(self) -> None:
+    index = self._index if self._orig is None else self._orig._index
+    if index is not None: index.valid = False
 
 
 
@@ -546,7 +800,10 @@ class Mu:
     'Find all matching nodes in the subtree rooted at this node.'
     pred = xml_pred(type_or_tag=type_or_tag, cl=cl, text=text, attrs=attrs)
     if text: return self._find_all_text(pred, traversable)
-    else: return self._find_all(pred, traversable)
+    if (type_or_tag or cl or 'id' in attrs) and (index := self._live_index()) is not None:
+      candidates = index.candidates(self, type_or_tag=type_or_tag, cl=cl, id=attrs.get('id'))
+      return self._find_all_indexed(index, candidates, pred, traversable)
+    return self._find_all(pred, traversable)
 
   def _find_all(self, pred:MuPred, traversable:bool) -> Iterator['Mu']:
     for c in self._:
@@ -554,6 +811,17 @@ class Mu:
         if pred(c): yield (c.subnode(self) if traversable else c)
         yield from c._find_all(pred, traversable) # Always search children. TODO: use generator send() to let consumer decide?
 
+  def _find_all_indexed(self, index:'MuIndex', candidates:list['Mu'], pred:MuPred, traversable:bool) -> Iterator['Mu']:
+    'Filter candidate nodes (in document order) found by the index. Subnodes are parented as `_find_all` would.'
+    node = self if self._orig is None else self._orig
+    for c in candidates:
+      if pred(c):
+        if traversable:
+          parent = index.parent(c)
+          assert parent is not None
+          yield c.subnode(self if parent is node else parent)
+        else: yield c
+
   def _find_all_text(self, pred:MuPred, traversable:bool) -> Generator['Mu',None,bool]:
     '''
     Use post-order algorithm to find matching text, and do not search parents of matching children.
@@ -673,8 +941,30 @@ class Mu:
     return opt_match
 
 
+  # CSS selectors.
+
+  def select(self, selector:str) -> Iterator['Mu']:
+    'Yield the descendants of this node that match the CSS `selector`, in document order. See `pithy.css_selector`.'
+    from .css_selector import parse_selector
+    return parse_selector(selector).select(self)
+
+
+  def select_first(self, selector:str) -> 'Mu':
+    'Return the first descendant that matches the CSS `selector`, or raise NoMatchError.'
+    for node in self.select(selector): return node
+    raise NoMatchError(self, selector)
+
+
   # Traversal.
 
+  def _traversal_orig_and_parent(self) -> tuple['Mu','Mu']:
+    'Return the original node and the parent for `next` and `prev`, using the index for non-subnodes.'
+    if self._orig is not None and self._parent is not None: return (self._orig, self._parent)
+    if self._orig is None and (index := self._live_index()) is not None and (parent := index.parent(self)) is not None:
+      return (self, parent)
+    raise ValueError(f'cannot traverse non-subnode: {self}')
+
+
   @overload
   def next(self, type_or_tag:type[_Mu], *, cl:str='', text:str='', traversable:bool=False, **attrs:str) -> _Mu: ...
 
@@ -682,14 +972,14 @@ class Mu:
   def next(self, type_or_tag:str='', *, cl:str='', text:str='', traversable:bool=False, **attrs:str) -> 'Mu': ...
 
   def next(self, type_or_tag:type[_Mu]|str='', *, cl:str='', text:str='', traversable:bool=False, **attrs:str) -> 'Mu':
-    if self._orig is None or self._parent is None: raise ValueError(f'cannot traverse non-subnode: {self}')
+    orig, parent = self._traversal_orig_and_parent()
     pred = xml_pred(type_or_tag=type_or_tag, cl=cl, text=text, attrs=attrs)
     found_orig = False
-    for c in self._parent._:
+    for c in parent._:
       if not isinstance(c, Mu): continue
       if found_orig:
-        if pred(c): return (c.subnode(self._parent) if traversable else c)
-      elif c is self._orig:
+        if pred(c): return (c.subnode(parent) if traversable else c)
+      elif c is orig:
         found_orig = True
     if not found_orig: raise ValueError('node was removed from parent')
     raise NoMatchError(self, fmt_xml_predicate_args(type_or_tag, cl, text, attrs))
@@ -702,14 +992,14 @@ class Mu:
   def prev(self, type_or_tag:str='', *, cl:str='', text:str='', traversable:bool=False, **attrs:str) -> 'Mu': ...
 
   def prev(self, type_or_tag:type[_Mu]|str='', *, cl:str='', text:str='', traversable:bool=False, **attrs:str) -> 'Mu':
-    if self._orig is None or self._parent is None: raise ValueError(f'cannot traverse non-subnode: {self}')
+    orig, parent = self._traversal_orig_and_parent()
     pred = xml_pred(type_or_tag=type_or_tag, cl=cl, text=text, attrs=attrs)
     found_orig = False
-    for c in reversed(self._parent._):
+    for c in reversed(parent._):
       if not isinstance(c, Mu): continue
       if found_orig:
-        if pred(c): return (c.subnode(self._parent) if traversable else c)
-      elif c is self._orig:
+        if pred(c): return (c.subnode(parent) if traversable else c)
+      elif c is orig:
         found_orig = True
     if not found_orig: raise ValueError('node was removed from parent')
     raise NoMatchError(self, fmt_xml_predicate_args(type_or_tag, cl, text, attrs))
@@ -768,7 +1058,8 @@ class Mu:
 
 
   def discard(self, attr:str) -> None:
-    try: del self.attrs[attr]
+    if attr in _indexed_attrs: self._invalidate_index()
+    try: del self._writable_attrs()[attr]
     except KeyError: pass
 
 
@@ -791,7 +1082,8 @@ class Mu:
       if first_mod_idx is not None:
         modified_children.append(c)
     if first_mod_idx is not None:
-      self._[first_mod_idx:] = modified_children
+      self._children_changed()
+      self._writable_children()[first_mod_idx:] = modified_children
 
     if post is not None: post(self)
 
@@ -850,7 +1142,10 @@ class Mu:
 
   def render(self, newline:bool=True) -> Iterator[str]:
     'Render the tree as a stream of text lines.'
-    yield from self._render()
+    if self.render_prefix: yield self.render_prefix
+    parts:list[str] = []
+    self._render_parts(parts, [self])
+    yield from parts
     if newline: yield '\n'
 
 
@@ -886,7 +1181,8 @@ class Mu:
       if isinstance(child, str):
         yield self.esc_text(child)
       elif isinstance(child, Mu):
-        yield from child._render()
+        if child._frozen is None: yield from child._render()
+        else: yield child.frozen_text().string
       elif isinstance(child, EscapedStr):
         assert isinstance(child.string, str), child.string
         yield child.string
@@ -907,12 +1203,379 @@ class Mu:
 
   def render_str(self, newline:bool=True) -> str:
     'Render the tree into a single string.'
-    return ''.join(self.render(newline=newline))
+    if type(self).render is not Mu.render: return ''.join(self.render(newline=newline)) # Custom render override.
+    parts = [self.render_prefix] if self.render_prefix else []
+    self._render_parts(parts, [self])
+    if newline: parts.append('\n')
+    return ''.join(parts)
+
+
+  def render_to(self, writer:Writer[str], newline:bool=True) -> None:
+    '''
+    Render the tree to a text writer, e.g. an open file or `io.StringIO`.
+    Output is buffered and written in chunks, so memory use is bounded for large trees.
+    '''
+    if type(self).render is not Mu.render: # Custom render override.
+      for part in self.render(newline=newline): writer.write(part)
+      return
+    parts = [self.render_prefix] if self.render_prefix else []
+    self._render_parts(parts, [self], writer=writer)
+    if newline: parts.append('\n')
+    writer.write(''.join(parts))
+
+
+  def render_chunks(self, chunk_size:int=1<<16, newline:bool=True) -> Iterator[str]:
+    '''
+    Render the tree incrementally, as a stream of strings of at least `chunk_size` characters (except for the last).
+    Rendering is suspended between chunks, so the first chunk is available before the rest of the tree is rendered,
+    and memory use is bounded for large trees. This is intended for streamed HTTP responses.
+    '''
+    buffer:list[str] = []
+    size = 0
+    for s in self._render_pieces(newline=newline):
+      buffer.append(s)
+      size += len(s)
+      if size >= chunk_size:
+        yield ''.join(buffer)
+        buffer.clear()
+        size = 0
+    if size: yield ''.join(buffer)
+
+
+  def _render_pieces(self, newline:bool) -> Iterator[str]:
+    'Helper for `render_chunks`: run the rendering engine in bounded steps, yielding the output of each step.'
+    if type(self).render is not Mu.render: # Custom render override.
+      yield from self.render(newline=newline)
+      return
+    parts = [self.render_prefix] if self.render_prefix else []
+    stack:list[MuChild] = [self]
+    while stack:
+      self._render_parts(parts, stack, limit=256)
+      yield ''.join(parts)
+      parts.clear()
+    if newline: yield '\n'
 
 
   def render_children_str(self, newline:bool=True) -> str:
     'Render the children into a single string.'
-    return ''.join(self.render_children())
+    plan = _render_plans.get(type(self)) or _RenderPlan.for_class(type(self))
+    if (plan.custom_render or plan.custom_children or not self._ or self.tag in plan.void_tags
+     or self._frozen is not None):
+      return ''.join(self.render_children())
+    # Render the node into a scratch list, then drop the head and close tags.
+    parts:list[str] = []
+    self._render_parts(parts, [self])
+    return ''.join(parts[1:-1])
+
+
+  @staticmethod
+  def _render_parts(parts:list[str], stack:list['MuChild'], writer:Writer[str]|None=None, frozen_root:'Mu|None'=None,
+   limit:int=0) -> None:
+    '''
+    The rendering engine. Renders the items of `stack`, last item first, appending output strings to `parts`.
+    Rather than recursing, each node is expanded by emitting its head tag and pushing its children and close tag,
+    along with the newlines that `render_children` would emit. Text is escaped as it is pushed.
+    Items on the stack are either already-rendered strings, EscapedStr wrappers, or Mu nodes.
+    Classes that override `_render`, `render_children`, or the attribute and text formatting methods
+    are handled by calling those methods, so the output is identical to the generator-based methods.
+    Frozen subtrees are spliced in from their cached text, except for `frozen_root`, which is being rendered to fill its cache.
+    If `writer` is provided, accumulated parts are periodically written to it and cleared.
+    If `limit` is nonzero, return once `parts` holds at least that many items; the remaining work is left on `stack`.
+    '''
+    append = parts.append
+    pop = stack.pop
+    push = stack.append
+    plans = _render_plans
+    while stack:
+      item = pop()
+      if isinstance(item, str):
+        append(item)
+        continue
+      if not isinstance(item, Mu):
+        if isinstance(item, EscapedStr):
+          append(item.string)
+          continue
+        raise TypeError(item) # Expected str, EscapedStr, or Mu.
+
+      frozen = item._frozen
+      if frozen is not None and item is not frozen_root:
+        append((frozen.text or item.frozen_text()).string)
+        continue
+
+      plan = plans.get(type(item)) or _RenderPlan.for_class(type(item))
+      if plan.custom_render:
+        parts.extend(item._render())
+        continue
+
+      tag = item.tag
+      children = item._
+      if plan.void_tags:
+        self_closing = tag in plan.void_tags
+        if self_closing and children: raise ValueError(item)
+      else:
+        self_closing = not children
+
+      attrs = item.attrs
+      if not attrs: attrs_str = ''
+      elif plan.custom_attrs: attrs_str = item.fmt_attr_items(attrs.items())
+      else: attrs_str = plan.fmt_attrs(attrs)
+
+      if self_closing:
+        append(f'<{tag}{attrs_str}/>')
+        continue
+      append(f'<{tag}{attrs_str}>')
+
+      if plan.custom_children:
+        parts.extend(item.render_children())
+        append(f'</{tag}>')
+        continue
+
+      push(f'</{tag}>')
+      inline_tags = plan.inline_tags
+      esc_text = item.esc_text if plan.custom_esc else None
+      if len(children) > 1 and (tag not in plan.ws_sensitive_tags) and (tag not in inline_tags):
+        append('\n')
+        next_is_block = True # The final child is always followed by a newline.
+        for child in reversed(children):
+          if isinstance(child, Mu):
+            is_block = child.tag not in inline_tags
+            if is_block or next_is_block: push('\n')
+            push(child)
+            next_is_block = is_block
+            continue
+          if next_is_block: push('\n')
+          if isinstance(child, str):
+            if esc_text is not None: child = esc_text(child)
+            elif '&' in child or '<' in child: child = child.replace('&', '&amp;').replace('<', '&lt;')
+          push(child)
+          next_is_block = False
+      else:
+        for child in reversed(children):
+          if isinstance(child, str):
+            if esc_text is not None: child = esc_text(child)
+            elif '&' in child or '<' in child: child = child.replace('&', '&amp;').replace('<', '&lt;')
+          push(child)
+
+      if writer is not None and len(parts) >= 4096:
+        writer.write(''.join(parts))
+        parts.clear()
+      if limit and len(parts) >= limit: return
+
+
+
+class _RenderPlan:
+  '''
+  Per-class rendering information for `Mu._render_parts`:
+  which rendering methods the class overrides, its tag sets, and a cache of attribute key orderings.
+  '''
+
+  def __init__(self, cls:type[Mu]) -> None:
+    self.custom_render = (cls._render is not Mu._render)
+    self.custom_children = (cls.render_children is not Mu.render_children)
+    self.custom_attrs = (cls.fmt_attr_items is not Mu.fmt_attr_items or cls.quote_attr_val is not Mu.quote_attr_val)
+    self.custom_esc = (cls.esc_text is not Mu.esc_text)
+    self.inline_tags = cls.inline_tags
+    self.void_tags = cls.void_tags
+    self.ws_sensitive_tags = cls.ws_sensitive_tags
+    self.attr_sort_ranks = cls.attr_sort_ranks
+    self.replaced_attrs = cls.replaced_attrs
+    self.attr_orders:dict[tuple[str,...],tuple[tuple[str,str],...]] = {}
+
+
+  @classmethod
+  def for_class(cls, mu_class:type[Mu]) -> '_RenderPlan':
+    plan = _render_plans[mu_class] = cls(mu_class)
+    return plan
+
+
+  def fmt_attrs(self, attrs:MuAttrs) -> str:
+    '''
+    Equivalent to `Mu.fmt_attr_items(attrs.items())`.
+    The sorted order and rendered prefix of each key set is cached, so sorting only happens once per distinct key set.
+    '''
+    keys = tuple(attrs)
+    try: order = self.attr_orders[keys]
+    except KeyError:
+      ranks = self.attr_sort_ranks
+      replaced_attrs = self.replaced_attrs
+      sorted_keys = sorted(keys, key=lambda k: ranks.get(k, 0))
+      order = tuple((k, f' {replaced_attrs.get(k, k)}=') for k in sorted_keys)
+      if len(self.attr_orders) >= 1024: self.attr_orders.clear()
+      self.attr_orders[keys] = order
+    parts:list[str] = []
+    for k, prefix in order:
+      v = attrs[k]
+      if type(v) is not str:
+        if type(v) is int: v = str(v)
+        else:
+          v = _attr_val_str(v)
+          if v is None: continue
+      if '&' in v or '<' in v: v = v.replace('&', '&amp;').replace('<', '&lt;')
+      if "'" in v: parts.append(f'{prefix}"{v.replace('"', '&quot;')}"')
+      else: parts.append(f"{prefix}'{v}'")
+    return ''.join(parts)
+
+
+_render_plans:dict[type[Mu],_RenderPlan] = {}
+
+
+class MuIndex:
+  '''
+  Lookup tables for the tree rooted at `root`, built by `Mu.index`.
+  Nodes are numbered in document order (pre-order, with the root at position 0).
+  Each tag, node type, class, and id maps to the ascending positions of the nodes that have it,
+  and each node records the end of its subtree range, so a query on any indexed node bisects the candidate list.
+  '''
+
+  def __init__(self, root:Mu) -> None:
+    self.root = root
+    self.valid = True
+    self.nodes:list[Mu] = []
+    self.parent_positions:list[int] = [] # Position of each node's parent; -1 for the root.
+    self.ends:list[int] = [] # Position following the last descendant of each node.
+    self.positions:dict[int,int] = {} # Maps node `id()` to position.
+    self.tag_positions:dict[str,list[int]] = {}
+    self.type_positions:dict[type[Mu],list[int]] = {} # Exact node types.
+    self.class_positions:dict[str,list[int]] = {}
+    self.id_positions:dict[str,list[int]] = {} # Keyed by `str(id)`, so that non-str id values are found by their text.
+    self._subclass_positions:dict[type,list[int]] = {}
+
+    nodes = self.nodes
+    parent_positions = self.parent_positions
+    positions = self.positions
+    tag_positions = self.tag_positions
+    type_positions = self.type_positions
+    class_positions = self.class_positions
+    id_positions = self.id_positions
+    stack:list[tuple[Mu,int]] = [(root, -1)]
+    while stack:
+      node, parent_pos = stack.pop()
+      pos = len(nodes)
+      nodes.append(node)
+      parent_positions.append(parent_pos)
+      positions[id(node)] = pos
+      prev_index = node._index
+      if prev_index is not None and prev_index is not self: prev_index.valid = False # Overlapping trees; be conservative.
+      node._index = self
+      tag_positions.setdefault(node.tag, []).append(pos)
+      type_positions.setdefault(type(node), []).append(pos)
+      attrs = node.attrs
+      if attrs:
+        if cl := attrs.get('class'):
+          for word in str(cl).split(): class_positions.setdefault(word, []).append(pos)
+        node_id = attrs.get('id')
+        if node_id is not None: id_positions.setdefault(str(node_id), []).append(pos)
+      stack.extend((c, pos) for c in reversed(node._) if isinstance(c, Mu))
+
+    # Pre-order numbering means that every descendant follows its ancestor, so subtree ends can be computed in one reverse pass.
+    ends = self.ends
+    ends.extend(range(1, len(nodes) + 1))
+    for pos in range(len(nodes) - 1, 0, -1):
+      parent_pos = parent_positions[pos]
+      if ends[parent_pos] < ends[pos]: ends[parent_pos] = ends[pos]
+
+
+  def __repr__(self) -> str:
+    return f'<MuIndex: {self.root}; nodes: {len(self.nodes)}; valid: {self.valid}>'
+
+
+  def position(self, node:Mu) -> int|None:
+    'Return the document position of `node`, or None if it is not in the index.'
+    pos = self.positions.get(id(node))
+    if pos is None or self.nodes[pos] is not node: return None
+    return pos
+
+
+  def parent(self, node:Mu) -> Mu|None:
+    'Return the parent of `node`, or None if it is the root or not in the index.'
+    pos = self.position(node)
+    if pos is None: return None
+    parent_pos = self.parent_positions[pos]
+    return None if parent_pos < 0 else self.nodes[parent_pos]
+
+
+  def candidates(self, node:Mu, *, type_or_tag:type[Mu]|str='', cl:str='', id:Any=None) -> list[Mu]:
+    '''
+    Return the descendants of `node` in document order that might match the given tag or type, class, and id.
+    The smallest applicable position list is chosen; callers must still test each candidate against the full predicate.
+    '''
+    if node._orig is not None: node = node._orig
+    pos = self.position(node)
+    if pos is None: raise ValueError(f'node is not in the index: {node}')
+    lists:list[list[int]] = []
+    if isinstance(type_or_tag, str):
+      if type_or_tag: lists.append(self.tag_positions.get(type_or_tag, []))
+    else: lists.append(self.subclass_positions(type_or_tag))
+    if cl: lists.append(self.class_positions.get(cl, []))
+    if id is not None: lists.append(self.id_positions.get(str(id), []))
+    if lists: selected = min(lists, key=len)
+    else: selected = range(len(self.nodes)) # type: ignore[assignment]
+    start = bisect_right(selected, pos)
+    end = bisect_left(selected, self.ends[pos], lo=start)
+    nodes = self.nodes
+    return [nodes[p] for p in selected[start:end]]
+
+
+  def subclass_positions(self, t:type) -> list[int]:
+    'Return the ascending positions of the nodes that are instances of `t`.'
+    try: return self._subclass_positions[t]
+    except KeyError: pass
+    lists = [p for node_type, p in self.type_positions.items() if issubclass(node_type, t)]
+    merged = lists[0] if len(lists) == 1 else sorted(chain.from_iterable(lists)) # Zero lists yields an empty list.
+    self._subclass_positions[t] = merged
+    return merged
+
+
+_indexed_attrs = frozenset({'class', 'id'}) # Attribute keys whose mutation invalidates an index.
+
+_empty_attrs = cast(MuAttrs, MappingProxyType({})) # Shared by `Mu.raw` nodes until their first attribute write.
+
+
+@dataclass
+class MuCleanStats:
+  'Statistics returned by `Mu.clean`.'
+  nodes_visited:int = 0
+  nodes_skipped:int = 0 # Nodes that were already clean.
+  nodes_changed:int = 0 # Nodes whose children were modified.
+  strings_merged:int = 0 # Strings that were merged into a preceding string.
+  strings_removed:int = 0 # Strings (or merged runs) that were empty after stripping.
+
+
+class _FrozenRender:
+  'The render cache of a frozen subtree root; both fields are filled lazily.'
+
+  __slots__ = ('text', 'hash')
+
+  def __init__(self) -> None:
+    self.text:EscapedStr|None = None
+    self.hash = ''
+
+
+def frozen_fragment(maxsize:int|None=256) -> Callable[[Callable[_P,_Mu]],Callable[_P,_Mu]]:
+  '''
+  Decorator for functions that build static or parameterized fragments, e.g. navigation bars, script blocks, or table headers.
+  Results are frozen and memoized in an LRU cache of `maxsize` entries keyed by the call arguments,
+  so each distinct fragment is built and rendered once. Arguments must be hashable.
+  '''
+  def decorator(fn:Callable[_P,_Mu]) -> Callable[_P,_Mu]:
+    @wraps(fn)
+    def freeze_result(*args:_P.args, **kwargs:_P.kwargs) -> _Mu: return fn(*args, **kwargs).freeze()
+    return cast(Callable[_P,_Mu], lru_cache(maxsize=maxsize)(freeze_result))
+  return decorator
+
+
+def _attr_val_str(v:Any) -> str|None:
+  'Convert an attribute value to a string as `Mu.fmt_attr_items` does, or return None if the attribute is not present.'
+  if isinstance(v, Present):
+    if v.is_present: v = v.val
+    else: return None
+  match v:
+    case None: return 'none'
+    case True: return 'true'
+    case False: return 'false'
+    case float(): return str(prefer_int(v))
+    case list() | dict(): return render_json(v, sort=False, indent=None)
+    case _: return str(v)
 
 
 
@@ -1022,7 +1685,8 @@ def single_child_property(constructor:Callable[[_Self],_Child]) -> property:
     child_class = get_child_class()
     for i, c in enumerate(self._):
       if isinstance(c, child_class):
-        self._[i] = val
+        self._children_changed()
+        self._writable_children()[i] = val
         return
     self.append(val)
 
@@ -1030,7 +1694,8 @@ def single_child_property(constructor:Callable[[_Self],_Child]) -> property:
     child_class = get_child_class()
     for i, c in enumerate(self._):
       if isinstance(c, child_class):
-        del self._[i]
+        self._children_changed()
+        del self._writable_children()[i]
         return
 
   doc = f'The single child element of type {class_desc}.\n' + (constructor.__doc__ or '')
@@ -1068,6 +1733,10 @@ def newline_or_space_for_ws(match:Match) -> str:
 
 # HTML defines ASCII whitespace as "U+0009 TAB, U+000A LF, U+000C FF, U+000D CR, or U+0020 SPACE."
 html_ws_re = re.compile(r'[\t\n\f\r ]+')
+
+# Used by `clean` to collapse whitespace without a per-match callback; equivalent to `html_ws_re` with `newline_or_space_for_ws`.
+_ws_newline_run_re = re.compile(r'[\t\f\r ]*\n[\t\n\f\r ]*')
+_ws_space_run_re = re.compile(r' [\t\f\r ]+|[\t\f\r][\t\f\r ]*') # Single spaces are not matched.
 html_ws_split_re = re.compile(r'(?P<space>[\t\n\f\r ])|[^\t\n\f\r ]+')
 
 _word_re = re.compile(r'[-\w]+')
@@ -0,0 +1,146 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Compact binary encoding of `Mu` trees using msgpack. See `Mu.dump_bin` and `Mu.load_bin`.
+
+The encoding is a msgpack array: `[format_name, format_version, tags, attr_keys, tokens]`.
+`tags` and `attr_keys` are string tables, so that each distinct tag and attribute key is stored once.
+`tokens` is a flat pre-order sequence, which avoids msgpack nesting limits for deep documents.
+Each node is encoded as: tag index, attribute count, (key index, value) pairs, child count, children.
+A child is either a msgpack str (text), a msgpack bin (`EscapedStr` contents), or an int (the tag index of a child node).
+`Present` attribute values are encoded as a msgpack extension containing `[is_present, val]`.
+Tuple attribute values are encoded as a msgpack extension containing the array of their items,
+so that they are not confused with lists, which msgpack also encodes as arrays.
+'''
+
+from io import BytesIO
+from typing import Any, BinaryIO
+
+from .markup import Mu, MuChild, Present
+from .msgpack import ExtType, load_msgpack, write_msgpack
+from .string import EscapedStr
+
+
+format_name = 'pithy.mu'
+format_version = 2 # Version 1 did not distinguish tuples from lists; it is still readable.
+
+_present_ext_code = 1
+_tuple_ext_code = 2
+
+
+def dump_mu_bin(node:Mu, file:BinaryIO) -> None:
+  'Write the binary encoding of the tree rooted at `node` to `file`.'
+  tags:dict[str,int] = {}
+  keys:dict[str,int] = {}
+  tokens:list[Any] = []
+  append = tokens.append
+  stack:list[MuChild] = [node]
+  while stack:
+    item = stack.pop()
+    if isinstance(item, str):
+      append(item)
+      continue
+    if isinstance(item, EscapedStr):
+      append(item.string.encode())
+      continue
+    tag = item.tag
+    try: append(tags[tag])
+    except KeyError: append(tags.setdefault(tag, len(tags)))
+    attrs = item.attrs
+    append(len(attrs))
+    for k, v in attrs.items():
+      try: append(keys[k])
+      except KeyError: append(keys.setdefault(k, len(keys)))
+      append(_encode_attr_val(v))
+    children = item._
+    append(len(children))
+    stack.extend(reversed(children))
+  write_msgpack(file, [format_name, format_version, list(tags), list(keys), tokens])
+
+
+def load_mu_bin(cls:type[Mu], file:BinaryIO) -> Mu:
+  '''
+  Read a tree written by `dump_mu_bin`.
+  As with `Mu.from_raw`, the root node type is chosen by `cls.tag_types`,
+  and each child type is chosen by the `tag_types` of its parent's type.
+  '''
+  data = load_msgpack(file, use_list=True, ext_hook=_decode_ext)
+  try: name, version, tags, keys, tokens = data
+  except (TypeError, ValueError): raise ValueError('not a Mu binary encoding') from None
+  if name != format_name: raise ValueError(f'not a Mu binary encoding: {name!r}')
+  if version not in (1, format_version): raise ValueError(f'unsupported Mu binary encoding version: {version!r}')
+
+  classes:dict[tuple[type[Mu],int],tuple[type[Mu],str]] = {} # Maps (parent class, tag index) to (class, tag argument).
+  root:Mu|None = None
+  frames:list[list[Any]] = [] # Each frame is [children list, remaining child count, node class].
+  parent_class:type[Mu] = cls
+  i = 0
+  while True:
+    # Decode a node header.
+    tag_index = tokens[i]
+    n_attrs = tokens[i+1]
+    i += 2
+    try: node_class, tag_arg = classes[(parent_class, tag_index)]
+    except KeyError:
+      tag = tags[tag_index]
+      node_class = parent_class.tag_types.get(tag, parent_class.generic_tag_type)
+      tag_arg = '' if node_class.tag == tag else tag # Only set an instance tag when the class tag differs.
+      classes[(parent_class, tag_index)] = (node_class, tag_arg)
+    attrs = {}
+    for _ in range(n_attrs):
+      attrs[keys[tokens[i]]] = tokens[i+1]
+      i += 2
+    n_children = tokens[i]
+    i += 1
+    children:list[MuChild] = []
+    node = node_class.raw(attrs, children, tag=tag_arg) # The children list is filled below.
+    if frames: frames[-1][0].append(node)
+    else: root = node
+    frames.append([children, n_children, node_class])
+
+    # Decode text children until the next child node header, or the end of the tree.
+    while frames:
+      frame = frames[-1]
+      if not frame[1]:
+        frames.pop()
+        continue
+      frame[1] -= 1
+      token = tokens[i]
+      if type(token) is str:
+        frame[0].append(token)
+        i += 1
+      elif type(token) is bytes:
+        frame[0].append(EscapedStr(token.decode()))
+        i += 1
+      else:
+        parent_class = frame[2]
+        break
+    else:
+      break
+
+  assert root is not None
+  if i != len(tokens): raise ValueError(f'Mu binary encoding has {len(tokens) - i} extra tokens')
+  return root
+
+
+def _encode_attr_val(val:Any) -> Any:
+  'Encode the `Present` and tuple values in an attribute value as extensions.'
+  if isinstance(val, Present): return _encode_ext(_present_ext_code, [val.is_present, _encode_attr_val(val.val)])
+  if isinstance(val, tuple): return _encode_ext(_tuple_ext_code, [_encode_attr_val(el) for el in val])
+  if isinstance(val, list): return [_encode_attr_val(el) for el in val]
+  return val
+
+
+def _encode_ext(code:int, val:Any) -> Any: # Returns an ExtType; msgpack is untyped.
+  f = BytesIO()
+  write_msgpack(f, val)
+  return ExtType(code, f.getvalue())
+
+
+def _decode_ext(code:int, data:bytes) -> Any:
+  if code == _present_ext_code:
+    is_present, val = load_msgpack(BytesIO(data), use_list=True, ext_hook=_decode_ext)
+    return Present(is_present, val=val)
+  if code == _tuple_ext_code:
+    return tuple(load_msgpack(BytesIO(data), use_list=True, ext_hook=_decode_ext))
+  return ExtType(code, data)
@@ -0,0 +1,73 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+import sqlite3
+from typing import Callable, Generic, TypeVar
+from weakref import WeakKeyDictionary
+
+from .util import sql_quote_entity
+
+
+_K = TypeVar('_K')
+_V = TypeVar('_V')
+
+
+class DataVersionCache(Generic[_K,_V]):
+  '''
+  A cache of values derived from database contents (e.g. counts), invalidated whenever the database changes.
+
+  Validity is determined by the pair of `PRAGMA data_version`, which changes when other connections commit,
+  and `Connection.total_changes`, which reflects changes made through the connection itself.
+  Because `data_version` values are only meaningful within a single connection,
+  entries are kept per connection (weakly referenced); long-lived connections benefit the most.
+  Each connection/schema pair holds at most `max_size` entries; the oldest entries are evicted first.
+  '''
+
+  def __init__(self, max_size:int=256) -> None:
+    if max_size < 1: raise ValueError(f'max_size must be positive; received {max_size!r}')
+    self.max_size = max_size
+    self._conns:WeakKeyDictionary[sqlite3.Connection,dict[str,tuple[tuple[int,int],dict[_K,_V]]]] = WeakKeyDictionary()
+    self.hits = 0
+    self.misses = 0
+
+
+  def get(self, conn:sqlite3.Connection, key:_K, compute:Callable[[],_V], *, schema:str='main') -> _V:
+    '''
+    Return the cached value for `key`, or call `compute` and cache its result if the database has changed.
+    '''
+    entries = self._entries(conn, schema)
+    try: val = entries[key]
+    except KeyError: pass
+    else:
+      self.hits += 1
+      return val
+    self.misses += 1
+    val = compute()
+    if len(entries) >= self.max_size: del entries[next(iter(entries))]
+    entries[key] = val
+    return val
+
+
+  def clear(self) -> None:
+    self._conns.clear()
+
+
+  def _entries(self, conn:sqlite3.Connection, schema:str) -> dict[_K,_V]:
+    version = (data_version(conn, schema), conn.total_changes)
+    try: schemas = self._conns[conn]
+    except KeyError: schemas = self._conns[conn] = {}
+    try: prev_version, entries = schemas[schema]
+    except KeyError: pass
+    else:
+      if prev_version == version: return entries
+    entries = {}
+    schemas[schema] = (version, entries)
+    return entries
+
+
+def data_version(conn:sqlite3.Connection, schema:str='main') -> int:
+  'Return the value of `PRAGMA data_version` for the given schema.'
+  c = sqlite3.Connection.cursor(conn, sqlite3.Cursor) # Plain cursor, so that the check itself is not profiled.
+  try:
+    row = c.execute(f'PRAGMA {sql_quote_entity(schema)}.data_version').fetchone()
+  finally: c.close()
+  return row[0] # type: ignore[no-any-return]
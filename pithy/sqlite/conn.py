@@ -10,6 +10,7 @@ from pithy.url import url_path
 from ..meta import caller_src_loc
 from ..typing_utils import OptBaseExc, OptTraceback, OptTypeBaseExc
 from .cursor import Cursor, SqlParameters
+from .profile import ProfilingCursor, QueryProfiler
 from .row import Row
 from .util import sql_quote_entity
 
@@ -49,6 +50,7 @@ class Conn(sqlite3.Connection):
     self.closing = closing
     self.closed = True
     self.caller_trace_loc = None
+    self.profiler:QueryProfiler|None = None
 
     if trace_caller_level:
       self.caller_trace_loc:tuple[str,int,str]|None = caller_src_loc(trace_caller_level) # type: ignore[no-redef]
@@ -126,7 +128,7 @@ class Conn(sqlite3.Connection):
 
 
   def cursor(self, factory:type[Cursor]|None=None) -> Cursor: # type: ignore[override]
-    if factory is None: factory = Cursor
+    if factory is None: factory = Cursor if self.profiler is None else ProfilingCursor
     assert issubclass(factory, Cursor)
     return super().cursor(factory)
 
@@ -204,6 +206,30 @@ class Conn(sqlite3.Connection):
     return self.cursor().run(sql, _dbg=_dbg, **args)
 
 
+  def start_profiling(self, *, explain_every:int=1000, explain_top:int=10, slow_threshold:float=0.0) -> QueryProfiler:
+    '''
+    Enable statement profiling. While enabled, cursors created by `cursor()` time each statement and count result rows,
+    and a trace callback counts every statement executed on the connection.
+    Returns the installed QueryProfiler; call `profiler.dump()` to print the results.
+    Cursors created before profiling was enabled are not profiled.
+    '''
+    if self.profiler is not None: raise ValueError('Conn is already profiling.')
+    self.profiler = QueryProfiler(self, explain_every=explain_every, explain_top=explain_top, slow_threshold=slow_threshold)
+    self.set_trace_callback(self.profiler.trace)
+    return self.profiler
+
+
+  def stop_profiling(self) -> QueryProfiler|None:
+    '''
+    Disable statement profiling, returning the previously installed profiler if any.
+    '''
+    profiler = self.profiler
+    if profiler is not None:
+      self.set_trace_callback(None)
+      self.profiler = None
+    return profiler
+
+
 def sqlite_file_uri(path:str, *, mode:str='') -> str:
   '''
   Format an SQLite file URI.
@@ -6,7 +6,9 @@ from typing import Any, cast, Iterable, Mapping, overload, Protocol, Self, Seque
 
 from ..typing_utils import OptBaseExc, OptTraceback, OptTypeBaseExc
 from .row import Row
-from .util import default_to_json, insert_values_stmt, sql_quote_entity, update_stmt, update_to_json
+from .stats import stat1_row_counts
+from .util import (default_to_json, insert_values_stmt, sql_quote_entity, sql_quote_entity_always, update_stmt,
+  update_to_json)
 
 
 _T_co = TypeVar('_T_co', covariant=True)
@@ -155,6 +157,41 @@ class Cursor(sqlite3.Cursor, AbstractContextManager):
     return bool(self.execute(f'SELECT EXISTS (SELECT 1 FROM {table} WHERE {where})', args))
 
 
+  def search(self, table:str, query:str, limit:int=20, *, offset:int=0, schema:str='main',
+   highlight:tuple[str,str]=('<mark>', '</mark>')) -> Self:
+    '''
+    Execute an FTS5 full-text search, yielding the best matching rows of the content table in rank order.
+    `table` is the name of an `FtsIndex`, or of a content table with exactly one FTS index.
+    `query` uses FTS5 query syntax; use `sql_fts_query_words` to convert arbitrary user input.
+    Each row has the content table columns, plus `rank` (lower is better) and `<column>_highlight` for each indexed column,
+    with matched phrases wrapped in the `highlight` strings.
+    The top `limit` matches are selected by the FTS index before joining to the content table.
+    '''
+    from .schema import introspect_schema # Deferred because schema pulls in the SQL parser.
+    intro = introspect_schema(self.connection, schema)
+    try: fts = intro.fts_indexes[table]
+    except KeyError:
+      candidates = [f for f in intro.fts_indexes.values() if f.table == table]
+      if len(candidates) != 1:
+        raise ValueError(f'{table!r} is not an FTS index nor a table with exactly one FTS index: {candidates!r}') from None
+      fts = candidates[0]
+    qs = sql_quote_entity(schema)
+    fts_name = sql_quote_entity_always(fts.name)
+    rowid = 'rowid' if fts.content_rowid == 'rowid' else sql_quote_entity(fts.content_rowid)
+    highlights = ''.join(
+      f', highlight({fts_name}, {i}, :hl_open, :hl_close) AS {sql_quote_entity_always(c + "_highlight")}'
+      for i, c in enumerate(fts.columns))
+    return self.execute(f'''
+      SELECT c.*, f.rank{''.join(f', f.{sql_quote_entity_always(c + "_highlight")}' for c in fts.columns)}
+      FROM (
+        SELECT rowid AS fts_rowid, rank{highlights} FROM {qs}.{fts_name}
+        WHERE {fts_name} MATCH :query ORDER BY rank LIMIT :limit OFFSET :offset
+      ) AS f
+      JOIN {qs}.{sql_quote_entity_always(fts.table)} AS c ON c.{rowid} = f.fts_rowid
+      ORDER BY f.rank''',
+      dict(query=query, limit=limit, offset=offset, hl_open=highlight[0], hl_close=highlight[1]))
+
+
   @overload
   def insert(self, *, with_:str='', or_:str='FAIL', into:str, returning:tuple[str,...], **kwargs:Any) -> Row: ...
 
@@ -224,13 +261,19 @@ class Cursor(sqlite3.Cursor, AbstractContextManager):
     self.execute(stmt, values)
 
 
-  def count_all_tables(self, *, schema:str='main', omit_empty:bool=False) -> list[tuple[str, int]]:
-    'Return an iterable of (table, count) pairs.'
+  def count_all_tables(self, *, schema:str='main', omit_empty:bool=False, approx:bool=False) -> list[tuple[str, int]]:
+    '''
+    Return an iterable of (table, count) pairs.
+    If `approx` is True, use the row estimates recorded in `sqlite_stat1` by `ANALYZE` where available,
+    and only count the tables that lack statistics.
+    '''
     schema_q = sql_quote_entity(schema)
     table_names = list(self.execute(f"SELECT name FROM {schema_q}.sqlite_schema WHERE type = 'table' ORDER BY name").col())
+    estimates = stat1_row_counts(self.connection, schema=schema) if approx else {}
     pairs = []
     for name in table_names:
-      count = self.count(f'{schema_q}.{name}')
+      count = estimates.get(name)
+      if count is None: count = self.count(f'{schema_q}.{sql_quote_entity(name)}')
       if omit_empty and count == 0: continue
       pairs.append((name, count))
     return pairs
@@ -0,0 +1,204 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Compare the contents of tables in two SQLite databases.
+
+For rowid tables, each side computes a content hash for every block of `block_size` consecutive rowid values
+in a single ordered scan, and only the blocks whose hashes differ are fetched and compared row by row.
+Both scans can optionally run in parallel threads, each with its own read-only connection.
+Mismatched blocks are compared directly rather than bisected into smaller hashed ranges:
+hashing a range requires reading all of its rows, so for local databases bisection would only add scans.
+WITHOUT ROWID tables are compared with a streaming merge of both sides ordered by primary key.
+'''
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from string import ascii_lowercase, ascii_uppercase
+from typing import Any, Callable, Iterable, Iterator, Literal
+
+from ..digest import digest_fns
+from .conn import Conn
+from .row import Row
+from .util import has_rowid, sql_quote_entity as qe
+
+
+type BlockHash = tuple[int,int,bytes] # (block index, row count, digest).
+
+type RowDiffKind = Literal['added', 'removed', 'changed']
+
+
+@dataclass(frozen=True)
+class RowDiff:
+  '''
+  A difference between the two sides: `removed` rows exist only in `a`, `added` rows only in `b`.
+  `key` is the rowid, or the tuple of primary key values for WITHOUT ROWID tables.
+  The rows contain the columns of the table, as selected by `*`.
+  '''
+  kind:RowDiffKind
+  key:Any
+  a:Row|None
+  b:Row|None
+
+
+def diff_table_rows(conn_a:Conn, conn_b:Conn, table:str, *, block_size:int=4096, parallel:bool=False) -> Iterator[RowDiff]:
+  '''
+  Yield the row differences of `table` between the two connections, ordered by rowid (or primary key).
+  The table must have the same columns on both sides.
+  If `parallel` is True, block hashes for both sides are computed concurrently in threads using new read-only connections,
+  so the databases must be files.
+  '''
+  if block_size < 1: raise ValueError(f'block_size must be positive; received {block_size!r}')
+  if not has_rowid(conn_a, table):
+    yield from diff_rows_by_primary_key(conn_a, conn_b, table)
+    return
+
+  if parallel:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+      fa = executor.submit(_block_hashes_for_path, conn_a.path, table, block_size)
+      fb = executor.submit(_block_hashes_for_path, conn_b.path, table, block_size)
+      hashes_a:Iterable[BlockHash] = fa.result()
+      hashes_b:Iterable[BlockHash] = fb.result()
+  else:
+    hashes_a = table_block_hashes(conn_a, table, block_size=block_size)
+    hashes_b = table_block_hashes(conn_b, table, block_size=block_size)
+
+  for block in mismatched_blocks(hashes_a, hashes_b):
+    yield from diff_rowid_range(conn_a, conn_b, table, lo=block*block_size, hi=(block+1)*block_size)
+
+
+def table_block_hashes(conn:sqlite3.Connection, table:str, *, block_size:int=4096) -> Iterator[BlockHash]:
+  '''
+  Yield (block, count, digest) for each nonempty block of `block_size` rowid values of the table, in a single ordered scan.
+  Blocks are aligned on rowid values, not row positions, so that insertions and deletions only affect their own blocks.
+  '''
+  blake3 = digest_fns['blake3']
+  c = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+  c.row_factory = None # Plain tuples are faster, and their reprs are stable.
+  block = None
+  reprs:list[bytes] = []
+  for row in c.execute(f'SELECT rowid, * FROM {qe(table)} ORDER BY rowid'):
+    b = row[0] // block_size
+    if b != block:
+      if block is not None: yield block, len(reprs), blake3(b'\n'.join(reprs)).digest()
+      block = b
+      reprs.clear()
+    reprs.append(repr(row).encode())
+  if block is not None: yield block, len(reprs), blake3(b'\n'.join(reprs)).digest()
+  c.close()
+
+
+def _block_hashes_for_path(path:str, table:str, block_size:int) -> list[BlockHash]:
+  with Conn(path, mode='ro') as conn:
+    return list(table_block_hashes(conn, table, block_size=block_size))
+
+
+def mismatched_blocks(hashes_a:Iterable[BlockHash], hashes_b:Iterable[BlockHash]) -> Iterator[int]:
+  'Merge two ordered block hash streams, yielding the indices of blocks that are missing from either side or differ.'
+  ia = iter(hashes_a)
+  ib = iter(hashes_b)
+  a = next(ia, None)
+  b = next(ib, None)
+  while a is not None or b is not None:
+    if b is None or (a is not None and a[0] < b[0]):
+      assert a is not None
+      yield a[0]
+      a = next(ia, None)
+    elif a is None or b[0] < a[0]:
+      yield b[0]
+      b = next(ib, None)
+    else:
+      if a != b: yield a[0]
+      a = next(ia, None)
+      b = next(ib, None)
+
+
+def diff_rowid_range(conn_a:Conn, conn_b:Conn, table:str, *, lo:int, hi:int) -> Iterator[RowDiff]:
+  'Compare the rows in the rowid range [lo, hi) row by row.'
+  rows_a = _rows_by_rowid(conn_a, table, lo=lo, hi=hi)
+  rows_b = _rows_by_rowid(conn_b, table, lo=lo, hi=hi)
+  for rowid in sorted(rows_a.keys() | rows_b.keys()):
+    ra = rows_a.get(rowid)
+    rb = rows_b.get(rowid)
+    if rb is None: yield RowDiff('removed', rowid, ra, None)
+    elif ra is None: yield RowDiff('added', rowid, None, rb)
+    elif tuple(ra) != tuple(rb): yield RowDiff('changed', rowid, ra, rb)
+
+
+def _rows_by_rowid(conn:Conn, table:str, *, lo:int, hi:int) -> dict[int,Row]:
+  'Return the rows in the rowid range [lo, hi), keyed by rowid. The rows do not include the rowid unless `*` does.'
+  desc_cursor = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+  desc_cursor.execute(f'SELECT * FROM {qe(table)} LIMIT 0') # Provides the column names of the rows.
+  c = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+  c.row_factory = None
+  c.execute(f'SELECT rowid, * FROM {qe(table)} WHERE rowid >= :lo AND rowid < :hi', dict(lo=lo, hi=hi))
+  rows = {values[0]: Row(desc_cursor, values[1:]) for values in c}
+  c.close()
+  desc_cursor.close()
+  return rows
+
+
+def diff_rows_by_primary_key(conn_a:Conn, conn_b:Conn, table:str) -> Iterator[RowDiff]:
+  '''
+  Compare a WITHOUT ROWID table by merging both sides in primary key order.
+  Keys are compared in Python using SQLite's ordering of storage classes, with text values transformed according to the
+  declared collation of each key column. Only the built-in BINARY, NOCASE and RTRIM collations are supported;
+  other collations raise ValueError.
+  '''
+  pk_cols = [row[1] for row in sorted(
+    (r for r in sqlite3.Connection.execute(conn_a, f'PRAGMA table_info({qe(table)})') if r[5]), key=lambda r: r[5])]
+  if not pk_cols: raise ValueError(f'Table {table!r} has neither a rowid nor a primary key.')
+  collations = primary_key_collations(conn_a, table)
+  try: text_key_fns = [sqlite_collation_key_fns[collations.get(c, 'BINARY').upper()] for c in pk_cols]
+  except KeyError as e: raise ValueError(f'Table {table!r} primary key has unsupported collation: {e.args[0]!r}') from e
+  order = ', '.join(qe(c) for c in pk_cols)
+  query = f'SELECT * FROM {qe(table)} ORDER BY {order}' # Each column is ordered by its declared collation.
+
+  def keyed(conn:Conn) -> Iterator[tuple[tuple,Row]]:
+    for row in conn.cursor().execute(query):
+      yield tuple(sqlite_sort_key(row[c], text_key_fn) for c, text_key_fn in zip(pk_cols, text_key_fns)), row
+
+  ia = keyed(conn_a)
+  ib = keyed(conn_b)
+  a = next(ia, None)
+  b = next(ib, None)
+  while a is not None or b is not None:
+    if b is None or (a is not None and a[0] < b[0]):
+      assert a is not None
+      yield RowDiff('removed', tuple(a[1][c] for c in pk_cols), a[1], None)
+      a = next(ia, None)
+    elif a is None or b[0] < a[0]:
+      yield RowDiff('added', tuple(b[1][c] for c in pk_cols), None, b[1])
+      b = next(ib, None)
+    else:
+      if tuple(a[1]) != tuple(b[1]): yield RowDiff('changed', tuple(a[1][c] for c in pk_cols), a[1], b[1])
+      a = next(ia, None)
+      b = next(ib, None)
+
+
+def primary_key_collations(conn:sqlite3.Connection, table:str) -> dict[str,str]:
+  'Return a dict mapping the primary key columns of a WITHOUT ROWID table to their collation names.'
+  for row in sqlite3.Connection.execute(conn, f'PRAGMA index_list({qe(table)})'):
+    if row[3] == 'pk':
+      return {r[2]: r[4] for r in sqlite3.Connection.execute(conn, f'PRAGMA index_xinfo({qe(row[1])})') if r[5] and r[2]}
+  return {}
+
+
+def sqlite_sort_key(val:Any, text_key_fn:Callable[[str],str]|None=None) -> tuple[int,Any]:
+  '''
+  A Python sort key matching SQLite ordering: NULL < numbers < text < blobs.
+  `text_key_fn` transforms text values to match a collation; see `sqlite_collation_key_fns`.
+  '''
+  if val is None: return (0, 0)
+  if isinstance(val, (int, float)): return (1, val)
+  if isinstance(val, str): return (2, val if text_key_fn is None else text_key_fn(val))
+  return (3, bytes(val))
+
+
+_ascii_lower_table = str.maketrans(ascii_uppercase, ascii_lowercase)
+
+sqlite_collation_key_fns:dict[str,Callable[[str],str]|None] = {
+  'BINARY': None, # Python compares str by code point, which matches the byte order of UTF-8.
+  'NOCASE': lambda s: s.translate(_ascii_lower_table), # NOCASE only folds ASCII characters.
+  'RTRIM': lambda s: s.rstrip(' '),
+}
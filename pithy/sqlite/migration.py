@@ -1,12 +1,16 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
-from typing import Iterable, NoReturn, Self
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Callable, Iterable, Iterator, NoReturn, Self
 
 from pithy.iterable import joinR
 
+from ..io import err_progress
+from ..json import render_json
 from ..parse import ParseError
 from . import Conn, Cursor, Row
-from .schema import Column, Schema, Table, TableDepStructure
+from .schema import Column, FtsIndex, Index, introspect_schema, Schema, Table, TableDepStructure
 from .util import sql_quote_entity as qe, sql_quote_entity_always as qea, sql_quote_qual_entity as qqe
 
 
@@ -28,12 +32,148 @@ class MigrationStep:
 
   def sql(self) -> str: raise NotImplementedError
 
+  def stmts(self) -> list[str]:
+    'The statements to execute for this step when it is run as part of a single transaction.'
+    return [self.sql()]
+
+  def __str__(self) -> str: return self.sql()
+
 
 class ReorderColumns(MigrationStep):
   pass
 
 
-def gen_migration(*, conn:Conn, schema:Schema) -> list[str]:
+type Migration = list[str|MigrationStep]
+
+
+def migration_stmts(migration:Iterable[str|MigrationStep]) -> Iterator[str]:
+  'Flatten a migration into SQL statements.'
+  for step in migration:
+    if isinstance(step, str): yield step
+    else: yield from step.stmts()
+
+
+@dataclass(frozen=True)
+class RebuildTable(MigrationStep):
+  '''
+  Steps 4-7 of the migration process: create a new table with a temporary name, copy the data,
+  drop the old table, and rename the new table.
+
+  When run by `run_migration`, the copy is a single `INSERT ... SELECT` within the migration transaction.
+  `run_online_migration` instead copies in rowid-ordered batches, each in its own short transaction,
+  while triggers on the old table mirror concurrent writes into the new table.
+  Batch copying requires that rows keep their rowids, i.e. both tables are rowid tables,
+  and if the new table has an INTEGER PRIMARY KEY (rowid alias) column, the old table has the same alias column.
+
+  `indexes` are the indexes of the new table; the indexes of the old table are dropped along with it.
+  `run_migration` creates them after the rename. `run_online_migration` creates the non-unique indexes on the new table
+  under temporary names before the copy, so that the batches maintain them incrementally,
+  and renames them in the final transaction. Unique indexes are created after the rename,
+  because the batch copy resolves conflicts by replacement and would otherwise silently drop conflicting rows.
+  '''
+  schema_name:str
+  name:str
+  tmp_name:str
+  create_sql:str
+  columns:tuple[str,...] # Material column names of the new table.
+  defaults:tuple[str|None,...] # For each column, the rendered default to coalesce NULL old values to, if any.
+  new_rowid_alias:str|None
+  old_rowid_alias:str|None
+  has_rowid:bool # Whether both the old and new tables are rowid tables.
+  indexes:tuple[Index,...] = ()
+
+  @property
+  def qname(self) -> str: return f'{self.schema_name}.{qea(self.name)}'
+
+  @property
+  def qname_tmp(self) -> str: return f'{self.schema_name}.{qea(self.tmp_name)}'
+
+  @property
+  def can_copy_online(self) -> bool:
+    return self.has_rowid and (self.new_rowid_alias is None or self.new_rowid_alias == self.old_rowid_alias)
+
+  @property
+  def copy_columns_str(self) -> str:
+    'The column list for the copy. Rowids are copied explicitly unless the new table has a rowid alias column.'
+    cols = ', '.join(qe(c) for c in self.columns)
+    return cols if self.new_rowid_alias else f'rowid, {cols}'
+
+  def select_exprs_str(self, prefix:str='') -> str:
+    '''
+    The select expressions for each new column in terms of the old table's columns.
+    `prefix` is prepended to each column reference, e.g. 'NEW.' for triggers.
+    '''
+    return ', '.join((f'COALESCE({prefix}{qe(c)}, {d})' if d else f'{prefix}{qe(c)}') for c, d in zip(self.columns, self.defaults))
+
+  def copy_exprs_str(self, prefix:str='') -> str:
+    exprs = self.select_exprs_str(prefix)
+    return exprs if self.new_rowid_alias else f'{prefix}rowid, {exprs}'
+
+  def sql(self) -> str: return ';\n'.join(self.stmts())
+
+  def stmts(self) -> list[str]:
+    return [
+      self.create_sql,
+      f'INSERT INTO {self.qname_tmp} SELECT {self.select_exprs_str()} FROM {self.qname}',
+      f'DROP TABLE {self.qname}',
+      f'ALTER TABLE {self.qname_tmp} RENAME TO {qea(self.name)}',
+      *(index.sql(schema=self.schema_name) for index in self.indexes),
+    ]
+
+  def batch_copy_sql(self) -> str:
+    'Copy the rows in the rowid range (:lo, :hi].'
+    return (f'INSERT OR REPLACE INTO {self.qname_tmp} ({self.copy_columns_str}) SELECT {self.copy_exprs_str()} FROM {self.qname}'
+      ' WHERE rowid > :lo AND rowid <= :hi')
+
+  def trigger_names(self) -> tuple[str,str,str]:
+    return tuple(f'{self.tmp_name}__{k}' for k in ('ins', 'upd', 'del')) # type: ignore[return-value]
+
+  def capture_trigger_stmts(self) -> list[str]:
+    '''
+    Triggers that mirror writes to the old table into the new table during an online copy.
+    Note that statements within trigger bodies cannot use schema-qualified table names.
+    They are dropped along with the old table.
+    '''
+    ins, upd, del_ = self.trigger_names()
+    s = self.schema_name
+    old = qea(self.name)
+    tmp = qea(self.tmp_name)
+    upsert = f'INSERT OR REPLACE INTO {tmp} ({self.copy_columns_str}) VALUES ({self.copy_exprs_str("NEW.")});'
+    return [
+      f'CREATE TRIGGER {s}.{qea(ins)} AFTER INSERT ON {old} BEGIN {upsert} END',
+      f'CREATE TRIGGER {s}.{qea(upd)} AFTER UPDATE ON {old} BEGIN '
+        f'DELETE FROM {tmp} WHERE rowid = OLD.rowid AND OLD.rowid IS NOT NEW.rowid; {upsert} END',
+      f'CREATE TRIGGER {s}.{qea(del_)} AFTER DELETE ON {old} BEGIN DELETE FROM {tmp} WHERE rowid = OLD.rowid; END',
+    ]
+
+  def drop_trigger_stmts(self) -> list[str]:
+    return [f'DROP TRIGGER IF EXISTS {self.schema_name}.{qea(n)}' for n in self.trigger_names()]
+
+  @property
+  def shadow_indexes(self) -> tuple[Index,...]:
+    'The indexes that are built on the new table during an online copy.'
+    return tuple(index for index in self.indexes if not index.is_unique)
+
+  def shadow_index_name(self, index:Index) -> str:
+    return f'{self.tmp_name}__index__{index.name}'
+
+  def shadow_index_stmts(self) -> list[str]:
+    return [replace(index, name=self.shadow_index_name(index), table=self.tmp_name).sql(schema=self.schema_name,
+      if_not_exists=True) for index in self.shadow_indexes]
+
+  def swap_stmts(self) -> list[str]:
+    '''
+    The statements that replace the old table with the new one after an online copy.
+    The shadow indexes must then be renamed; see `_rename_shadow_indexes`.
+    '''
+    return [
+      f'DROP TABLE {self.qname}',
+      f'ALTER TABLE {self.qname_tmp} RENAME TO {qea(self.name)}',
+      *(index.sql(schema=self.schema_name) for index in self.indexes if index.is_unique),
+    ]
+
+
+def gen_migration(*, conn:Conn, schema:Schema) -> Migration:
 
   if not schema.name.isidentifier(): raise ValueError(f'Invalid schema name: {schema.name!r}')
 
@@ -45,24 +185,32 @@ def gen_migration(*, conn:Conn, schema:Schema) -> list[str]:
   old_table_sqls:dict[str,str] = dict(
     c.run(f"SELECT name, sql FROM {schema.name}.sqlite_schema WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"))
 
-  stmts = []
+  # Previously parsed tables are cached by schema_version; tables that failed to parse are reparsed to report the error.
+  intro = introspect_schema(conn, schema.name)
+
+  stmts:Migration = []
 
   for table in schema.tables:
     assert isinstance(table, Table), table
     qname = f'{schema.name}.{qea(table.name)}'
 
     try:
-      old_sql = old_table_sqls.get(table.name)
-      needs_rebuild, table_stmts = gen_table_migration(schema_name=schema.name, qname=qname, new=table, old=old_sql)
+      old:str|Table|None = old_table_sqls.get(table.name) if table.name in intro.errors else intro.tables.get(table.name)
+      needs_rebuild, table_stmts = gen_table_migration(schema_name=schema.name, qname=qname, new=table, old=old)
+      new_deps = schema.table_deps[table.name]
+      if needs_rebuild: # The rebuild step creates the indexes of the new table.
+        indexes = tuple(dep for dep in new_deps if isinstance(dep, Index))
+        table_stmts = [replace(step, indexes=indexes) if isinstance(step, RebuildTable) else step for step in table_stmts]
       stmts.extend(table_stmts)
 
+      # FTS indexes are virtual tables, so they are matched to their content table by parsing.
+      old_fts_names = [n for n, fts in intro.fts_indexes.items() if fts.table == table.name]
       old_deps = dict((row.name, row) for row in
         c.run(f'''
           SELECT type, name, sql FROM {schema.name}.sqlite_schema
-          WHERE type != 'table' AND tbl_name = :name AND name NOT LIKE 'sqlite_%'
-          ''', name=table.name))
-
-      new_deps = schema.table_deps[table.name]
+          WHERE ((type != 'table' AND tbl_name = :name) OR name IN (SELECT value FROM json_each(:fts_names)))
+          AND name NOT LIKE 'sqlite_%'
+          ''', name=table.name, fts_names=render_json(old_fts_names, indent=None)))
 
       stmts.extend(
         gen_deps_migration(schema_name=schema.name, new_deps=new_deps, old_deps=old_deps, needs_rebuild=needs_rebuild))
@@ -76,7 +224,7 @@ def gen_migration(*, conn:Conn, schema:Schema) -> list[str]:
   return stmts
 
 
-def gen_table_migration(*, schema_name:str, qname:str, new:Table, old:str|Table|None) -> tuple[bool,list[str]]:
+def gen_table_migration(*, schema_name:str, qname:str, new:Table, old:str|Table|None) -> tuple[bool,Migration]:
   '''
   Generate a migration from the given SQL statement or previous table to this table.
   Returns a tuple of (needs_rebuild, stmts).
@@ -105,7 +253,7 @@ def gen_table_migration(*, schema_name:str, qname:str, new:Table, old:str|Table|
       raise GenMigrationError.confusing_column_changes(table_name=qqe(schema_name, new.name), removed=removed, added=added)
     return False, gen_rename_columns(qname=qname, new=new, old=old, matched_cols=matched_cols)
 
-  stmts = []
+  stmts:Migration = []
   rebuild_reasons = []
   cols = list(old.columns)
 
@@ -138,9 +286,9 @@ def gen_table_migration(*, schema_name:str, qname:str, new:Table, old:str|Table|
   return needs_rebuild, stmts
 
 
-def gen_rename_columns(*, qname:str, new:Table, old:Table, matched_cols:dict[str,Column]) -> list[str]:
+def gen_rename_columns(*, qname:str, new:Table, old:Table, matched_cols:dict[str,Column]) -> Migration:
   assert len(new.columns) == len(old.columns)
-  stmts = ['-- Renaming columns.']
+  stmts:Migration = ['-- Renaming columns.']
   for i, (nc, oc) in enumerate(zip(new.columns, old.columns)):
     if nc.name == oc.name:
       if dh := nc.diff_hint(oc, include_name=True, exact_type=False):
@@ -154,50 +302,67 @@ def gen_rename_columns(*, qname:str, new:Table, old:Table, matched_cols:dict[str
   return stmts
 
 
-def gen_table_rebuild(*, schema_name:str, qname:str, new:Table, old:Table) -> list[str]:
+def gen_table_rebuild(*, schema_name:str, qname:str, new:Table, old:Table) -> Migration:
   '''
   Steps 4-7.
   '''
   tmp_name = new.name + '__rebuild_in_progress'
-  qname_tmp = f'{schema_name}.{qea(tmp_name)}'
 
-  selected_column_exprs = []
+  defaults:list[str|None] = []
   for col_name in new.material_column_names:
     new_col = new.columns_dict[col_name]
     old_col = old.columns_dict.get(col_name)
     if old_col is not None and old_col.is_opt and not new_col.is_opt and new_col.default is not None:
-      default_expr = new_col.default_rendered
-      col_expr = f'COALESCE({qe(col_name)}, {default_expr})'
+      defaults.append(new_col.default_rendered)
     else:
-      col_expr = qe(col_name)
-    selected_column_exprs.append(col_expr)
+      defaults.append(None)
 
-  selected_columns_str = ', '.join(selected_column_exprs)
+  return [RebuildTable(
+    schema_name=schema_name,
+    name=new.name,
+    tmp_name=tmp_name,
+    create_sql=new.sql(schema=schema_name, name=tmp_name), # 4. Create a new table with the desired schema and temporary name.
+    columns=new.material_column_names,
+    defaults=tuple(defaults),
+    new_rowid_alias=_rowid_alias(new),
+    old_rowid_alias=_rowid_alias(old),
+    has_rowid=not (new.without_rowid or old.without_rowid),
+  )]
 
-  stmts = []
-  stmts.append(new.sql(schema=schema_name, name=tmp_name)) # 4. Create a new table with the desired schema and temporary name.
-  stmts.append(f'INSERT INTO {qname_tmp} SELECT {selected_columns_str} FROM {qname}') # 5. Copy the data.
-  stmts.append(f'DROP TABLE {qname}') # 6. Remove the old table.
-  stmts.append(f'ALTER TABLE {qname_tmp} RENAME TO {new.quoted_name}') # 7.
 
-  return stmts
+def _rowid_alias(table:Table) -> str|None:
+  'Return the name of the INTEGER PRIMARY KEY column that aliases the rowid, if any.'
+  if table.without_rowid or table.primary_key: return None
+  col = table.primary_column
+  if col is not None and col.datatype is int: return col.name
+  return None
 
 
 def gen_deps_migration(*, schema_name:str, new_deps:tuple[TableDepStructure,...], old_deps:dict[str,Row],
  needs_rebuild:bool) -> list[str]:
   '''
   Steps 8-9: reconstruct all indexes, triggers, and views associated with the table.
+  If the table was rebuilt, its indexes are created by the `RebuildTable` step instead.
+  FTS indexes are compared structurally, and are only recreated and rebuilt if their definition changed
+  or the content table was rebuilt (which may renumber rowids); their sync triggers are handled like other triggers.
   '''
 
   stmts = []
 
   new_names = set(dep.name for dep in new_deps)
-  for name, dep in old_deps.items():
+  for dep in new_deps:
+    if isinstance(dep, FtsIndex): new_names.update(dep.trigger_names)
+
+  for name, old_row in old_deps.items():
     if name not in new_names:
-      stmts.append(f'DROP {dep.type.upper()} IF EXISTS {schema_name}.{qea(name)}')
+      stmts.append(f'DROP {old_row.type.upper()} IF EXISTS {schema_name}.{qea(name)}')
       #^ Use IF EXISTS because the structure may have been dropped by a table rebuild.
 
   for new in new_deps:
+    if isinstance(new, FtsIndex):
+      stmts.extend(gen_fts_migration(schema_name=schema_name, new=new, old_deps=old_deps, needs_rebuild=needs_rebuild))
+      continue
+    if needs_rebuild and isinstance(new, Index): continue
     new_sql = new.sql() # Note: the sql we use for comparison has no schema name.
     if old := old_deps.get(new.name):
       if not needs_rebuild and old.sql == new_sql: continue
@@ -207,7 +372,30 @@ def gen_deps_migration(*, schema_name:str, new_deps:tuple[TableDepStructure,...]
   return stmts
 
 
-def run_migration(conn:Conn, migration:list[str], max_errors:int=100, backup:bool=True) -> None:
+def gen_fts_migration(*, schema_name:str, new:FtsIndex, old_deps:dict[str,Row], needs_rebuild:bool) -> list[str]:
+  '''
+  Create or update an external-content FTS index and its sync triggers.
+  A new or changed index is populated with the FTS5 'rebuild' command, which reads the content table in one pass.
+  '''
+  stmts = []
+  changed = True
+  if old := old_deps.get(new.name):
+    try: changed = bool(new.diff_hints(FtsIndex.parse_sql(old.sql)))
+    except (ValueError, NotImplementedError): pass # Unrecognized definition; replace it.
+    if changed: stmts.append(f'DROP TABLE IF EXISTS {schema_name}.{qea(old.name)}')
+  if changed: stmts.append(new.sql(schema=schema_name))
+
+  for (name, trigger_sql), bare_sql in zip(new.trigger_sqls(schema=schema_name).items(), new.trigger_sqls().values()):
+    if old_trigger := old_deps.get(name):
+      if not needs_rebuild and old_trigger.sql == bare_sql: continue
+      stmts.append(f'DROP TRIGGER IF EXISTS {schema_name}.{qea(name)}')
+    stmts.append(trigger_sql)
+
+  if changed or needs_rebuild: stmts.append(new.rebuild_sql(schema=schema_name))
+  return stmts
+
+
+def run_migration(conn:Conn, migration:Migration, max_errors:int=100, backup:bool=True) -> None:
   '''
   12 migration steps: https://www.sqlite.org/lang_altertable.html#making_other_kinds_of_table_schema_changes
   '''
@@ -220,7 +408,7 @@ def run_migration(conn:Conn, migration:list[str], max_errors:int=100, backup:boo
     c.execute('PRAGMA foreign_keys = OFF') # 1.
     c.execute('BEGIN TRANSACTION') # 2.
     # 3 is implicit: the schema contains all indexes, triggers, and views associated with the table, so we can rebuild them.
-    for step in migration: c.execute(step) # 4-9.
+    for stmt in migration_stmts(migration): c.execute(stmt) # 4-9.
     run_check(c, 'foreign_key_check', max_errors=max_errors) # 10. Check for foreign key errors.
 
   except Exception:
@@ -246,3 +434,173 @@ def run_check(cursor:Cursor, check:str, args:str='', max_errors:int=100) -> None
     s = 's' if n > 1 else ''
     plus = '+' if n >= max_errors else ''
     raise MigrationError(f'{check} failed with {n}{plus} error{s}.')
+
+
+migration_progress_table = 'pithy_migration_progress'
+
+
+def run_online_migration(conn:Conn, migration:Migration, *, batch_size:int=10_000, checkpoint:bool=True,
+ progress:bool=True, max_errors:int=100) -> None:
+  '''
+  Run a migration without holding a write transaction for the duration of table copies.
+
+  Statements are grouped into short transactions around each table rebuild:
+  * the statements preceding a rebuild are run together with creation of the new table and the change capture triggers;
+  * rows are then copied in rowid-ordered batches of `batch_size`, each batch in its own transaction,
+    optionally followed by a passive WAL checkpoint so that the WAL does not grow with the size of the copy;
+    non-unique indexes of the new table are created before the copy, so that no index is built in a single transaction;
+  * the old table is dropped and the new table renamed in a later transaction, along with any following statements.
+  The final transaction also performs the foreign key check.
+
+  Copy progress is recorded in the `pithy_migration_progress` table of the migrated schema.
+  If the migration is interrupted, regenerating and rerunning it resumes each copy from the last completed batch;
+  the capture triggers keep the partially copied table up to date in the meantime.
+
+  Unlike `run_migration`, no backup is made; rebuilds that cannot be copied by rowid are copied in a single statement.
+  '''
+  if batch_size < 1: raise ValueError(f'batch_size must be positive; received {batch_size!r}')
+  c = conn.cursor()
+  pending:list[_PendingStep] = []
+  progress_schemas:set[str] = set()
+  print('Migrating (online)…')
+
+  c.execute('PRAGMA foreign_keys = OFF') # 1.
+  try:
+    for step in migration:
+      if isinstance(step, RebuildTable) and step.can_copy_online:
+        progress_schemas.add(step.schema_name)
+        _prepare_online_rebuild(c, step, pending)
+        pending = []
+        _copy_online(c, step, batch_size=batch_size, checkpoint=checkpoint, progress=progress)
+        pending.extend(step.swap_stmts())
+        if step.shadow_indexes: pending.append(partial(_rename_shadow_indexes, step=step))
+      elif isinstance(step, str): pending.append(step)
+      else: pending.extend(step.stmts())
+
+    c.execute('BEGIN IMMEDIATE')
+    try:
+      _run_pending(c, pending)
+      for schema_name in sorted(progress_schemas):
+        c.execute(f'DROP TABLE IF EXISTS {schema_name}.{migration_progress_table}')
+      run_check(c, 'foreign_key_check', max_errors=max_errors) # 10.
+    except Exception:
+      c.execute('ROLLBACK')
+      print('Migration failed.')
+      raise
+    c.execute('COMMIT') # 11.
+    print('Migration complete.')
+  finally:
+    c.execute('PRAGMA foreign_keys = ON') # 12.
+
+
+type _PendingStep = str|Callable[[Cursor],None]
+
+
+def _run_pending(c:Cursor, pending:list[_PendingStep]) -> None:
+  for step in pending:
+    if isinstance(step, str): c.execute(step)
+    else: step(c)
+
+
+def _prepare_online_rebuild(c:Cursor, step:RebuildTable, pending:list[_PendingStep]) -> None:
+  '''
+  In a single transaction, run the pending statements, and create the new table, shadow indexes, progress record and
+  capture triggers.
+  If a previous run was interrupted during the copy, the new table and its progress are kept.
+  '''
+  progress_table = f'{step.schema_name}.{migration_progress_table}'
+  c.execute('BEGIN IMMEDIATE')
+  try:
+    c.execute(f'CREATE TABLE IF NOT EXISTS {progress_table} (tmp_name TEXT PRIMARY KEY, last_rowid INTEGER, copied INTEGER NOT NULL)')
+    is_resuming = bool(c.run(f'SELECT 1 FROM {progress_table} WHERE tmp_name = :tmp_name', tmp_name=step.tmp_name).opt())
+    # Drop any existing capture triggers first, because the pending statements may alter columns that they reference.
+    for stmt in step.drop_trigger_stmts(): c.execute(stmt)
+    _run_pending(c, pending)
+    if not is_resuming:
+      c.execute(f'DROP TABLE IF EXISTS {step.qname_tmp}') # Left over from a run that failed before recording progress.
+      c.execute(step.create_sql) # 4.
+      c.run(f'INSERT INTO {progress_table} (tmp_name, last_rowid, copied) VALUES (:tmp_name, NULL, 0)', tmp_name=step.tmp_name)
+    for stmt in step.shadow_index_stmts(): c.execute(stmt) # IF NOT EXISTS, so that a resumed copy keeps the built indexes.
+    for stmt in step.capture_trigger_stmts(): c.execute(stmt)
+  except Exception:
+    c.execute('ROLLBACK')
+    print('Migration failed.')
+    raise
+  c.execute('COMMIT')
+
+
+def _copy_online(c:Cursor, step:RebuildTable, *, batch_size:int, checkpoint:bool, progress:bool) -> None:
+  '''
+  Step 5: copy rows from the old table to the new table in rowid-ordered batches.
+  '''
+  progress_table = f'{step.schema_name}.{migration_progress_table}'
+  row = c.run(f'SELECT last_rowid, copied FROM {progress_table} WHERE tmp_name = :tmp_name', tmp_name=step.tmp_name).one()
+  last_rowid:int|None = row[0]
+  copied:int = row[1]
+  total = c.execute(f'SELECT COUNT() FROM {step.qname}').one_col()
+  copy_sql = step.batch_copy_sql()
+  next_hi_sql = f'SELECT MAX(rowid) FROM (SELECT rowid FROM {step.qname} WHERE rowid > :lo ORDER BY rowid LIMIT :n)'
+  update_sql = f'UPDATE {progress_table} SET last_rowid = :hi, copied = copied + :n WHERE tmp_name = :tmp_name'
+  checkpoint_sql = f'PRAGMA {step.schema_name}.wal_checkpoint(PASSIVE)'
+
+  if last_rowid is None: # Start just before the minimum rowid, since the range lower bound is exclusive.
+    min_rowid = c.execute(f'SELECT MIN(rowid) FROM {step.qname}').one_col()
+    if min_rowid is not None: last_rowid = min_rowid - 1
+
+  def copy_batch() -> bool:
+    nonlocal last_rowid, copied
+    if last_rowid is None: return False # Empty table.
+    lo = last_rowid
+    c.execute('BEGIN IMMEDIATE')
+    try:
+      hi = c.run(next_hi_sql, lo=lo, n=batch_size).one_col()
+      if hi is None:
+        c.execute('ROLLBACK')
+        return False
+      n = c.run(copy_sql, lo=lo, hi=hi).rowcount
+      c.run(update_sql, hi=hi, n=n, tmp_name=step.tmp_name)
+    except Exception:
+      c.execute('ROLLBACK')
+      raise
+    c.execute('COMMIT')
+    last_rowid = hi
+    copied += n
+    if checkpoint: c.execute(checkpoint_sql).fetchall()
+    return True
+
+  batches = _Batches(copy_batch, count=max(0, -(-(total - copied) // batch_size)))
+  label = f'Copying {step.qname}' + (f' (resuming after {copied:,} rows)' if copied else '')
+  for _ in (err_progress(batches, label=label, suffix='batches') if progress else batches): pass
+
+
+def _rename_shadow_indexes(c:Cursor, step:RebuildTable) -> None:
+  '''
+  Give the shadow indexes of a swapped table their final names, within the final transaction.
+  SQLite has no statement to rename an index, but an index name is only recorded in `sqlite_schema`,
+  so this uses the documented procedure for schema changes that do not affect the stored content:
+  update `sqlite_schema` with `writable_schema` enabled, and increment the schema version.
+  See: https://www.sqlite.org/lang_altertable.html#otheralter.
+  '''
+  schema_name = step.schema_name
+  version = c.execute(f'PRAGMA {schema_name}.schema_version').one_col()
+  c.execute('PRAGMA writable_schema = ON')
+  try:
+    for index in step.shadow_indexes:
+      c.run(f"UPDATE {schema_name}.sqlite_schema SET name = :name, sql = :index_sql WHERE type = 'index' AND name = :shadow_name",
+        name=index.name, index_sql=replace(index, desc='').sql(), shadow_name=step.shadow_index_name(index))
+    c.execute(f'PRAGMA {schema_name}.schema_version = {version + 1}')
+  finally:
+    c.execute('PRAGMA writable_schema = OFF')
+
+
+class _Batches:
+  'A sized iterable that runs `copy_batch` until it returns False; the size is an estimate for progress reporting.'
+
+  def __init__(self, copy_batch:Callable[[],bool], count:int) -> None:
+    self.copy_batch = copy_batch
+    self.count = count
+
+  def __len__(self) -> int: return self.count
+
+  def __iter__(self) -> Iterator[None]:
+    while self.copy_batch(): yield None
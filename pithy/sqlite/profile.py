@@ -0,0 +1,355 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Opt-in statement profiling for `Conn`.
+
+Profiling is enabled with `Conn.start_profiling()`, which installs a `QueryProfiler` on the connection.
+While a profiler is installed, `Conn.cursor()` returns `ProfilingCursor` instances,
+which time `execute`/`executemany` (and therefore `run`) as well as result row fetching.
+When no profiler is installed the only cost is a single attribute check in `Conn.cursor()`.
+'''
+
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from os.path import dirname
+from time import perf_counter
+from types import FrameType
+from typing import Any, Iterable, Self, TYPE_CHECKING
+
+from ..json import render_json
+from ..string import fmt_rows
+from .cursor import Cursor, SqlParameters
+
+
+if TYPE_CHECKING:
+  from .conn import Conn
+
+
+type SrcLoc = tuple[str,int,str]
+
+
+@dataclass
+class QueryStats:
+  '''
+  Aggregated statistics for a single normalized SQL statement.
+  `calls` counts executions through a profiling cursor; `traced` counts all statements reported by the trace callback,
+  which includes statements run by `executescript` and implicit transaction control.
+  '''
+  sql:str
+  calls:int = 0
+  traced:int = 0
+  total_time:float = 0.0
+  max_time:float = 0.0
+  rows:int = 0
+  callers:dict[SrcLoc,int] = field(default_factory=dict)
+  sample_query:str = '' # The most recent raw query text, used for EXPLAIN QUERY PLAN.
+  sample_args:Any = () # The most recent arguments; None if unknown (e.g. from `executemany`).
+  plan:list[str]|None = None # The EXPLAIN QUERY PLAN detail lines, if captured.
+  full_scans:list[str] = field(default_factory=list) # Plan lines that indicate a full table scan.
+
+  @property
+  def avg_time(self) -> float: return self.total_time / self.calls if self.calls else 0.0
+
+  @property
+  def top_caller(self) -> SrcLoc|None:
+    return max(self.callers, key=self.callers.__getitem__) if self.callers else None
+
+  def json_dict(self) -> dict[str,Any]:
+    return dict(
+      sql=self.sql,
+      calls=self.calls,
+      traced=self.traced,
+      total_time=self.total_time,
+      max_time=self.max_time,
+      avg_time=self.avg_time,
+      rows=self.rows,
+      callers=[dict(file=f, line=l, fn=fn, count=n) for (f, l, fn), n in self.callers.items()],
+      plan=self.plan,
+      full_scans=self.full_scans,
+    )
+
+
+class QueryProfiler:
+  '''
+  Aggregates per-statement statistics for a connection, keyed by normalized SQL text.
+  Every `explain_every` profiled calls, `EXPLAIN QUERY PLAN` is captured for the `explain_top` queries by total time.
+  Set `explain_every` to 0 to disable automatic plan capture; `explain` can still be called manually.
+  '''
+
+  def __init__(self, conn:'Conn', *, explain_every:int=1000, explain_top:int=10, slow_threshold:float=0.0) -> None:
+    if explain_every < 0: raise ValueError(f'explain_every must be >= 0; received {explain_every!r}')
+    self.conn = conn
+    self.explain_every = explain_every
+    self.explain_top = explain_top
+    self.slow_threshold = slow_threshold # Calls taking at least this long (in seconds) are appended to `slow_log`.
+    self.stats:dict[str,QueryStats] = {}
+    self.slow_log:list[tuple[float,str,SrcLoc|None]] = []
+    self.calls_since_explain = 0
+    self.is_explaining = False
+
+
+  def stats_for(self, query:str) -> QueryStats:
+    sql = normalize_sql(query)
+    try: return self.stats[sql]
+    except KeyError:
+      s = self.stats[sql] = QueryStats(sql=sql)
+      return s
+
+
+  def trace(self, stmt:str) -> None:
+    'The `set_trace_callback` hook.'
+    if self.is_explaining: return
+    self.stats_for(stmt).traced += 1
+
+
+  def record_call(self, stats:QueryStats, query:str, args:Any, elapsed:float, caller:SrcLoc|None) -> None:
+    stats.calls += 1
+    stats.total_time += elapsed
+    if elapsed > stats.max_time: stats.max_time = elapsed
+    stats.sample_query = query
+    stats.sample_args = args
+    if caller is not None: stats.callers[caller] = stats.callers.get(caller, 0) + 1
+    if self.slow_threshold and elapsed >= self.slow_threshold:
+      self.slow_log.append((elapsed, query, caller))
+    if self.explain_every:
+      self.calls_since_explain += 1
+      if self.calls_since_explain >= self.explain_every:
+        self.calls_since_explain = 0
+        self.explain(n=self.explain_top)
+
+
+  def record_fetch(self, stats:QueryStats, elapsed:float, rows:int) -> None:
+    stats.total_time += elapsed
+    stats.rows += rows
+
+
+  def top(self, n:int=0, key:str='total_time') -> list[QueryStats]:
+    'Return the top `n` (or all, if `n` is 0) statistics ordered by `key` descending.'
+    ranked = sorted(self.stats.values(), key=lambda s: getattr(s, key), reverse=True)
+    return ranked[:n] if n else ranked
+
+
+  def explain(self, n:int=0) -> None:
+    '''
+    Capture `EXPLAIN QUERY PLAN` for the top `n` profiled queries by total time that do not yet have a plan.
+    Statements other than SELECT/INSERT/UPDATE/DELETE/REPLACE/WITH/VALUES are skipped,
+    as are statements whose sample arguments are unknown.
+    '''
+    self.is_explaining = True
+    try:
+      c = sqlite3.Connection.cursor(self.conn, sqlite3.Cursor) # Plain cursor: not profiled.
+      for s in self.top(n):
+        if s.plan is not None or s.sample_args is None or not explainable_re.match(s.sample_query): continue
+        try: rows = c.execute('EXPLAIN QUERY PLAN ' + s.sample_query, s.sample_args).fetchall()
+        except sqlite3.Error as e:
+          s.plan = [f'error: {e}']
+          continue
+        s.plan = [row[3] for row in rows]
+        s.full_scans = [d for d in s.plan if is_full_scan_detail(d)]
+      c.close()
+    finally:
+      self.is_explaining = False
+
+
+  def reset(self) -> None:
+    self.stats.clear()
+    self.slow_log.clear()
+    self.calls_since_explain = 0
+
+
+  def fmt_table(self, n:int=0, key:str='total_time', explain:bool=True) -> Iterable[str]:
+    'Format the top `n` statistics as lines of a text table.'
+    if explain: self.explain(n=n)
+    rows = []
+    for s in self.top(n, key=key):
+      loc = s.top_caller
+      loc_str = f'{loc[0]}:{loc[1]}:{loc[2]}' if loc else ''
+      scan = 'SCAN' if s.full_scans else ''
+      rows.append((s.calls, f'{s.total_time*1000:.3f}', f'{s.max_time*1000:.3f}', s.rows, scan, s.sql, loc_str))
+    return fmt_rows(rows, head=('calls', 'total_ms', 'max_ms', 'rows', 'flag', 'sql', 'caller'),
+      rjust=[True, True, True, True, False], max_col_width=96)
+
+
+  def render_json(self, n:int=0, key:str='total_time', explain:bool=True) -> str:
+    'Render the top `n` statistics as a JSON array.'
+    if explain: self.explain(n=n)
+    return render_json([s.json_dict() for s in self.top(n, key=key)])
+
+
+  def dump(self, file:Any=None, n:int=0, key:str='total_time', json:bool=False) -> None:
+    'Write the profile to `file` (default stderr), either as a table or as JSON.'
+    if file is None: file = sys.stderr
+    if json:
+      print(self.render_json(n=n, key=key), file=file)
+    else:
+      for line in self.fmt_table(n=n, key=key): print(line, file=file)
+
+
+
+class ProfilingCursor(Cursor):
+  '''
+  A Cursor subclass that reports timing and row counts to the connection's profiler.
+  Time spent fetching rows is attributed to the most recently executed statement.
+  '''
+
+  connection:'Conn' # ProfilingCursor is only created by `Conn.cursor`.
+  _prof_stats:QueryStats|None = None
+  _prof_elapsed:float = 0.0
+
+
+  def execute(self, query:str, args:SqlParameters=()) -> Self:
+    profiler = self.connection.profiler
+    if profiler is None: return super().execute(query, args)
+    stats = profiler.stats_for(query)
+    self._prof_stats = None # Do not attribute fetch time to the previous statement during execution.
+    start = perf_counter()
+    try: return super().execute(query, args)
+    finally:
+      elapsed = perf_counter() - start
+      if self.rowcount > 0: stats.rows += self.rowcount # DML statements.
+      self._prof_stats = stats
+      self._prof_elapsed = elapsed
+      profiler.record_call(stats, query, args, elapsed, external_caller_src_loc())
+
+
+  def executemany(self, query:str, it_args:Iterable[SqlParameters]) -> Self:
+    profiler = self.connection.profiler
+    if profiler is None: return super().executemany(query, it_args)
+    stats = profiler.stats_for(query)
+    self._prof_stats = None
+    start = perf_counter()
+    try: return super().executemany(query, it_args)
+    finally:
+      elapsed = perf_counter() - start
+      if self.rowcount > 0: stats.rows += self.rowcount
+      profiler.record_call(stats, query, None, elapsed, external_caller_src_loc())
+      #^ No sample args are recorded because `it_args` may be a consumed iterator; this also suppresses EXPLAIN.
+
+
+  def _prof_fetched(self, elapsed:float, rows:int) -> None:
+    stats = self._prof_stats
+    if stats is None: return
+    profiler = self.connection.profiler
+    if profiler is None or profiler.stats.get(stats.sql) is not stats:
+      # Profiling was stopped, restarted or reset since the statement was executed.
+      self._prof_stats = None
+      return
+    profiler.record_fetch(stats, elapsed, rows)
+    self._prof_elapsed += elapsed
+    if self._prof_elapsed > stats.max_time: stats.max_time = self._prof_elapsed
+
+
+  def __next__(self) -> Any:
+    start = perf_counter()
+    try:
+      row = super().__next__()
+    except StopIteration:
+      self._prof_fetched(perf_counter() - start, 0)
+      raise
+    self._prof_fetched(perf_counter() - start, 1)
+    return row
+
+
+  def fetchone(self) -> Any:
+    start = perf_counter()
+    row = super().fetchone()
+    self._prof_fetched(perf_counter() - start, 0 if row is None else 1)
+    return row
+
+
+  def fetchmany(self, size:int|None=None) -> list[Any]:
+    start = perf_counter()
+    rows = super().fetchmany(self.arraysize if size is None else size)
+    self._prof_fetched(perf_counter() - start, len(rows))
+    return rows
+
+
+  def fetchall(self) -> list[Any]:
+    start = perf_counter()
+    rows = super().fetchall()
+    self._prof_fetched(perf_counter() - start, len(rows))
+    return rows
+
+
+
+def external_caller_src_loc() -> SrcLoc|None:
+  '''
+  Return the source location of the nearest calling frame outside of the `pithy.sqlite` package,
+  in the same format as `meta.caller_src_loc`.
+  '''
+  f:FrameType|None = sys._getframe(1)
+  while f is not None:
+    code = f.f_code
+    if dirname(code.co_filename) != _pkg_dir: return code.co_filename, f.f_lineno, code.co_name
+    f = f.f_back
+  return None
+
+
+_pkg_dir = dirname(__file__)
+
+
+def normalize_sql(sql:str) -> str:
+  '''
+  Normalize SQL text so that statements differing only in literal values and whitespace aggregate together.
+  String, blob and numeric literals and parameter placeholders are replaced with '?';
+  comments are removed; whitespace is collapsed.
+  A sign is folded into a numeric literal only where it must be unary (after an operator, '(', ',' or a keyword);
+  otherwise it is a binary operator and is spaced uniformly, so that `a -1` and `a - 1` aggregate together.
+  Placeholders are normalized because the trace callback reports SQL with bound parameters expanded.
+  '''
+  sql = _sql_literal_re.sub(_normalize_sql_match, sql)
+  return _ws_re.sub(' ', sql).strip().rstrip(';')
+
+
+def _normalize_sql_match(m:re.Match) -> str:
+  entity:str|None = m.group('entity')
+  if entity is not None: return entity
+  if m.group('comment') is not None: return ' '
+  sign:str|None = m.group('sign')
+  if sign is not None and not _is_unary_sign_pos(m.string, m.start()): return f' {sign} ?'
+  return '?'
+
+
+def _is_unary_sign_pos(sql:str, pos:int) -> bool:
+  'Return True if a sign at `pos` in `sql` must be a unary operator, judging by the preceding token.'
+  i = pos - 1
+  while i >= 0 and sql[i].isspace(): i -= 1
+  if i < 0: return True
+  c = sql[i]
+  if c in _unary_sign_preceding_chars: return True
+  if not (c.isalnum() or c in '_$'): return False # A closing bracket, quote, or placeholder ends an operand.
+  end = i + 1
+  while i >= 0 and (sql[i].isalnum() or sql[i] in '_$'): i -= 1
+  return sql[i+1:end].upper() in _unary_sign_preceding_keywords
+
+
+_unary_sign_preceding_chars = frozenset('(,=<>!+-*/%|&~')
+
+_unary_sign_preceding_keywords = frozenset({'AND', 'BETWEEN', 'BY', 'CASE', 'DISTINCT', 'ELSE', 'GLOB', 'IN', 'IS', 'LIKE',
+  'LIMIT', 'NOT', 'OFFSET', 'OR', 'RETURNING', 'SELECT', 'SET', 'THEN', 'VALUES', 'WHEN', 'WHERE'})
+
+
+_sql_literal_re = re.compile(r'''(?x)
+  [xX]'[^']*' # Blob literal; must precede `entity` so that the `x` prefix is not matched as an identifier.
+| (?P<entity> "(?:[^"]|"")*" | `[^`]*` | \[[^\]]*\] | [A-Za-z_][A-Za-z0-9_$]* )
+| (?P<comment> --[^\n]* | /\*.*?\*/ )
+| '(?:[^']|'')*'
+| [:@$][A-Za-z_][A-Za-z0-9_]* | \?\d*
+| (?:(?P<sign>[-+])\s*)?(?<![\w.?])(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+''', re.DOTALL)
+
+_ws_re = re.compile(r'\s+')
+
+explainable_re = re.compile(r'(?i)\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH|VALUES)\b')
+
+
+def is_full_scan_detail(detail:str) -> bool:
+  '''
+  Return True if an EXPLAIN QUERY PLAN detail line describes a full scan of a table.
+  SQLite reports full scans as 'SCAN <table>'; index-assisted scans mention 'USING', and constant rows are not scans.
+  Older versions of SQLite report 'SCAN TABLE <table>'.
+  '''
+  if not detail.startswith('SCAN '): return False
+  return ' USING ' not in detail and not detail.startswith('SCAN CONSTANT ROW') and not detail.startswith('SCAN SUBQUERY')
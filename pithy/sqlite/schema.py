@@ -1,8 +1,14 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
+import re
+import sqlite3
 from collections import Counter, defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
+from hashlib import blake2b
+from os import replace as os_replace
+from os.path import realpath
+from threading import Lock
 from typing import Any, Callable, Iterable, Self
 
 from tolkien import Source
@@ -13,7 +19,7 @@ from ..transtruct import Input, Transtructor
 from .keywords import sqlite_keywords
 from .parse import sql_parse_entity, sql_parser
 from .util import (nonstrict_to_strict_types_for_sqlite, sql_comment_inline, sql_comment_lines, sql_quote_entity as qe,
-  sql_quote_entity_always as qea, strict_sqlite_to_types, types_to_strict_sqlite)
+  sql_quote_entity_always as qea, sql_quote_str, strict_sqlite_to_types, types_to_strict_sqlite)
 
 
 @dataclass(frozen=True, order=True)
@@ -337,11 +343,151 @@ class Index(TableDepStructure):
     return hints
 
 
+
+@dataclass(frozen=True, order=True)
+class FtsIndex(TableDepStructure):
+  '''
+  An external-content FTS5 full-text index of `columns` of `table`.
+  The index is an FTS5 virtual table that stores only the index; `search` results join back to the content table.
+  Three triggers on the content table keep the index in sync; see `trigger_sqls`.
+  `content_rowid` must be the rowid or an INTEGER PRIMARY KEY column that aliases it.
+  `tokenize` is the FTS5 tokenizer specification, e.g. 'porter unicode61'; empty means the default.
+  `prefix` lists the prefix lengths to index, which makes prefix queries (e.g. 'abc*') fast.
+  See https://www.sqlite.org/fts5.html#external_content_tables.
+  '''
+
+  name:str
+  table:str
+  columns:tuple[str,...] = ()
+  content_rowid:str = 'rowid'
+  tokenize:str = ''
+  prefix:tuple[int,...] = ()
+  desc:str = ''
+
+  def __post_init__(self) -> None:
+    if not isinstance(self.columns, tuple):
+      raise TypeError(f'FtsIndex.columns must be a tuple; received: {self.columns!r}')
+    if not self.columns: raise ValueError(f'FtsIndex {self.name!r} must have at least one column.')
+    if not isinstance(self.prefix, tuple):
+      raise TypeError(f'FtsIndex.prefix must be a tuple; received: {self.prefix!r}')
+
+
+  @cached_property
+  def trigger_names(self) -> tuple[str,str,str]:
+    'The names of the insert, delete, and update triggers on the content table.'
+    return (f'{self.name}__insert', f'{self.name}__delete', f'{self.name}__update')
+
+
+  def sql(self, *, schema:str='', name:str='', if_not_exists:bool=False) -> str:
+    if schema and not schema.isidentifier(): raise ValueError(f'Invalid schema name: {schema!r}')
+
+    qual_name = f'{schema}{schema and "."}{qea(name or self.name)}'
+    lines = []
+    if self.desc:
+      lines.append(f'-- {qual_name}')
+      lines.extend(sql_comment_lines(self.desc))
+
+    if_not_exists_str = 'IF NOT EXISTS ' if if_not_exists else ''
+    args = [qea(c) for c in self.columns]
+    args.append(f'content={sql_quote_str(self.table)}')
+    if self.content_rowid != 'rowid': args.append(f'content_rowid={sql_quote_str(self.content_rowid)}')
+    if self.tokenize: args.append(f'tokenize={sql_quote_str(self.tokenize)}')
+    if self.prefix: args.append(f"prefix='{' '.join(str(p) for p in self.prefix)}'")
+    lines.append(f'CREATE VIRTUAL TABLE {if_not_exists_str}{qual_name} USING fts5(')
+    lines.append(',\n'.join(f'  {a}' for a in args))
+    lines.append(')')
+    return '\n'.join(lines)
+
+
+  def trigger_sqls(self, *, schema:str='') -> dict[str,str]:
+    '''
+    Return a dict mapping trigger names to the CREATE TRIGGER statements that keep the index in sync with the content table.
+    The update trigger only fires when an indexed column (or the rowid alias) changes.
+    '''
+    if schema and not schema.isidentifier(): raise ValueError(f'Invalid schema name: {schema!r}')
+    s = f'{schema}{schema and "."}'
+    fts = qea(self.name)
+    table = qea(self.table)
+    rowid = 'rowid' if self.content_rowid == 'rowid' else qe(self.content_rowid)
+    cols_str = ', '.join(qe(c) for c in self.columns)
+    new_vals = ', '.join(f'new.{qe(c)}' for c in self.columns)
+    old_vals = ', '.join(f'old.{qe(c)}' for c in self.columns)
+    insert = f'INSERT INTO {fts}(rowid, {cols_str}) VALUES (new.{rowid}, {new_vals});'
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols_str}) VALUES ('delete', old.{rowid}, {old_vals});"
+    update_cols = self.columns if self.content_rowid == 'rowid' else (*self.columns, self.content_rowid)
+    update_of = ', '.join(qe(c) for c in update_cols)
+    insert_name, delete_name, update_name = self.trigger_names
+    return {
+      insert_name: f'CREATE TRIGGER {s}{qea(insert_name)} AFTER INSERT ON {table} BEGIN\n  {insert}\nEND',
+      delete_name: f'CREATE TRIGGER {s}{qea(delete_name)} AFTER DELETE ON {table} BEGIN\n  {delete}\nEND',
+      update_name: f'CREATE TRIGGER {s}{qea(update_name)} AFTER UPDATE OF {update_of} ON {table} BEGIN\n  {delete}\n  {insert}\nEND',
+    }
+
+
+  def rebuild_sql(self, *, schema:str='') -> str:
+    'Return the statement that rebuilds the entire index from the content table.'
+    if schema and not schema.isidentifier(): raise ValueError(f'Invalid schema name: {schema!r}')
+    qual_name = f'{schema}{schema and "."}{qea(self.name)}'
+    return f"INSERT INTO {qual_name}({qea(self.name)}) VALUES ('rebuild')"
+
+
+  def diff_hints(self, other:Self) -> list[str]:
+    if self.name != other.name: return ['name']
+    hints = []
+    if self.table != other.table: hints.append('table')
+    if self.columns != other.columns: hints.append('columns')
+    if self.content_rowid != other.content_rowid: hints.append('content_rowid')
+    if self.tokenize != other.tokenize: hints.append('tokenize')
+    if self.prefix != other.prefix: hints.append('prefix')
+    return hints
+
+
+  @classmethod
+  def parse_sql(cls, sql:str) -> 'FtsIndex':
+    '''
+    Parse the `CREATE VIRTUAL TABLE ... USING fts5(...)` statement of an external-content FTS5 index,
+    as stored in `sqlite_schema`.
+    Raises NotImplementedError for FTS5 features that FtsIndex does not represent.
+    '''
+    m = _fts5_create_re.fullmatch(sql.strip())
+    if not m: raise ValueError(f'Not an FTS5 CREATE VIRTUAL TABLE statement: {sql!r}')
+    name = sql_parse_entity(m['name'])
+    columns = []
+    options:dict[str,str] = {}
+    for arg in _fts5_args_re.findall(m['args']):
+      key, eq, val = arg.partition('=')
+      if eq: options[key.strip().lower()] = _fts5_unquote(val.strip())
+      else:
+        parts = arg.split()
+        if len(parts) != 1: raise NotImplementedError(f'FTS5 column options: {arg!r}')
+        columns.append(_fts5_unquote(parts[0]))
+    table = options.pop('content', '')
+    if not table: raise NotImplementedError(f'FTS5 table without external content: {name!r}')
+    content_rowid = options.pop('content_rowid', 'rowid')
+    tokenize = options.pop('tokenize', '')
+    prefix = tuple(int(p) for p in options.pop('prefix', '').split())
+    if options: raise NotImplementedError(f'FTS5 options: {options!r}')
+    return cls(name=name, table=table, columns=tuple(columns), content_rowid=content_rowid, tokenize=tokenize, prefix=prefix)
+
+
+_fts5_create_re = re.compile(r'''(?is)CREATE\s+VIRTUAL\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<name>"(?:[^"]|"")+"|\S+)\s+USING\s+fts5\s*\((?P<args>.*)\)''')
+
+_fts5_args_re = re.compile(r'''(?:'(?:[^']|'')*'|"(?:[^"]|"")*"|[^,'"])+''')
+
+
+def _fts5_unquote(s:str) -> str:
+  if len(s) >= 2 and s[0] == s[-1] and s[0] in '\'"`': return s[1:-1].replace(s[0]*2, s[0])
+  if s.startswith('[') and s.endswith(']'): return s[1:-1]
+  return s
+
+
+
 class Schema:
   name:str
   desc:str
   tables:list[Table]
   indexes:list[Index]
+  fts_indexes:list[FtsIndex]
 
 
   def __init__(self, name:str='', desc:str='', structures:Iterable[Structure]=()) -> None:
@@ -351,6 +497,7 @@ class Schema:
     self.desc = desc
     self.tables = []
     self.indexes = []
+    self.fts_indexes = []
 
     names = set()
     for s in structures:
@@ -358,6 +505,7 @@ class Schema:
       names.add(s.name)
       if isinstance(s, Table): self.tables.append(s)
       elif isinstance(s, Index): self.indexes.append(s)
+      elif isinstance(s, FtsIndex): self.fts_indexes.append(s)
       else: raise ValueError(f'Invalid Structure type: {s!r}')
 
 
@@ -365,6 +513,7 @@ class Schema:
   def structures(self) -> Iterable[Structure]:
     yield from self.tables
     yield from self.indexes
+    yield from self.fts_indexes
 
 
   @cached_property
@@ -382,6 +531,11 @@ class Schema:
     return {i.name: i for i in self.indexes}
 
 
+  @cached_property
+  def fts_indexes_dict(self) -> dict[str, FtsIndex]:
+    return {i.name: i for i in self.fts_indexes}
+
+
   @cached_property
   def table_deps(self) -> dict[str, tuple[TableDepStructure,...]]:
     '''
@@ -392,7 +546,7 @@ class Schema:
     for s in self.structures:
       if isinstance(s, TableDepStructure): deps[s.table].add(s)
 
-    return { n : tuple(sorted(deps[n])) for n in self.tables_dict } # type: ignore[type-var]
+    return { n : tuple(sorted(deps[n], key=lambda s: s.name)) for n in self.tables_dict }
 
 
 
@@ -410,6 +564,12 @@ class Schema:
       yield s.sql(schema=name, if_not_exists=if_not_exists)
       yield ';'
       yield '\n'
+      if isinstance(s, FtsIndex):
+        for trigger_sql in s.trigger_sqls(schema=name).values():
+          yield '\n'
+          yield trigger_sql.replace('CREATE TRIGGER ', 'CREATE TRIGGER IF NOT EXISTS ', 1) if if_not_exists else trigger_sql
+          yield ';'
+          yield '\n'
 
 
   def write_module_sql(self, if_not_exists:bool=False, steps:int=1) -> None:
@@ -646,3 +806,191 @@ def build_clean_row_record_fn(table:Table, renamed_keys:dict[str,str]|None=None,
     return d
 
   return build_clean_row_record
+
+
+
+@dataclass
+class IntrospectedSchema:
+  '''
+  The parsed structures of an existing database schema, as read from `sqlite_schema`.
+  Structures that could not be parsed are recorded in `errors` (name -> error description) instead.
+  Indexes are reconstructed from `PRAGMA index_list`/`index_info` rather than parsed;
+  for indexes on expressions, the indexed column list is taken verbatim from the index SQL.
+  FTS5 virtual tables are parsed into `fts_indexes`, and their shadow tables are omitted.
+  '''
+  schema_version:int
+  digest:str # Digest of the `sqlite_schema` text, used to validate persisted caches.
+  tables:dict[str,Table] = field(default_factory=dict)
+  indexes:dict[str,Index] = field(default_factory=dict)
+  fts_indexes:dict[str,FtsIndex] = field(default_factory=dict)
+  errors:dict[str,str] = field(default_factory=dict)
+
+  def schema(self, name:str='') -> Schema:
+    return Schema(name=name, structures=[*self.tables.values(), *self.indexes.values(), *self.fts_indexes.values()])
+
+
+class SchemaCache:
+  '''
+  A cache of parsed database schemas, keyed by (database path, `PRAGMA schema_version`).
+
+  The cache is shared by all connections in the process.
+  Because schema_version values are not unique across different database files
+  (a database recreated at the same path typically starts over at the same version),
+  every hit is validated against a digest of the `sqlite_schema` text;
+  checking the cache therefore costs two pragma queries and a read of `sqlite_schema`, but no parsing.
+  If `persist` is True, parsed schemas are also pickled to a sidecar file next to the database
+  (`<db path>-pithy-schema.pickle`), so that cold starts can skip the parser as well.
+  Persistence is opt-in because the sidecar is unpickled from the database directory;
+  only enable it for databases in trusted locations.
+  In-memory and temporary databases are parsed every time.
+  '''
+
+  def __init__(self, persist:bool=False) -> None:
+    self.persist = persist
+    self._entries:dict[tuple[str,int],IntrospectedSchema] = {}
+    self._lock = Lock()
+
+
+  def introspect(self, conn:sqlite3.Connection, schema_name:str='main') -> IntrospectedSchema:
+    qs = qe(schema_name)
+    path = ''
+    for row in sqlite3.Connection.execute(conn, 'PRAGMA database_list'):
+      if row[1] == schema_name:
+        path = row[2]
+        break
+    version = sqlite3.Connection.execute(conn, f'PRAGMA {qs}.schema_version').fetchone()[0]
+
+    if not path: return _introspect_schema(conn, schema_name, version) # In-memory or temporary database.
+
+    key = (realpath(path), version)
+    rows = _schema_rows(conn, schema_name)
+    digest = _schema_digest(rows)
+    with self._lock: entry = self._entries.get(key)
+    if entry is not None and entry.digest == digest: return entry
+
+    sidecar_path = key[0] + '-pithy-schema.pickle'
+    intro = self._load_sidecar(sidecar_path, version, digest) if self.persist else None
+    if intro is None:
+      intro = _introspect_schema(conn, schema_name, version, rows=rows, digest=digest)
+      if self.persist: self._write_sidecar(sidecar_path, intro)
+
+    with self._lock: self._entries[key] = intro
+    return intro
+
+
+  def clear(self) -> None:
+    with self._lock: self._entries.clear()
+
+
+  def _load_sidecar(self, path:str, version:int, digest:str) -> IntrospectedSchema|None:
+    from ..pickle import load_pickle
+    try:
+      with open(path, 'rb') as f: intro = load_pickle(f)
+    except FileNotFoundError: return None
+    except Exception: return None # Stale or incompatible cache file; it will be rewritten.
+    if not isinstance(intro, IntrospectedSchema) or intro.schema_version != version or intro.digest != digest: return None
+    return intro
+
+
+  def _write_sidecar(self, path:str, intro:IntrospectedSchema) -> None:
+    from ..pickle import write_pickle
+    tmp_path = f'{path}.{id(intro)}.tmp'
+    try:
+      with open(tmp_path, 'wb') as f: write_pickle(f, intro)
+      os_replace(tmp_path, path)
+    except OSError: pass # The cache is an optimization; read-only locations are not an error.
+
+
+schema_cache = SchemaCache()
+
+
+def introspect_schema(conn:sqlite3.Connection, schema_name:str='main') -> IntrospectedSchema:
+  '''
+  Return the parsed structures of an attached database schema, using the process-wide `schema_cache`.
+  '''
+  return schema_cache.introspect(conn, schema_name)
+
+
+def _schema_rows(conn:sqlite3.Connection, schema_name:str) -> list[tuple[str,str,str,str]]:
+  c = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+  c.row_factory = None # Plain tuples, whose reprs are used for the digest.
+  return c.execute(f"""
+    SELECT type, name, tbl_name, sql FROM {qe(schema_name)}.sqlite_schema
+    WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%' AND sql IS NOT NULL ORDER BY type, name""").fetchall()
+
+
+def _schema_digest(rows:list[tuple[str,str,str,str]]) -> str:
+  return blake2b(f'{_introspection_format}:{rows!r}'.encode()).hexdigest()
+
+
+_introspection_format = 4 # Increment when IntrospectedSchema changes, to invalidate persisted caches.
+
+
+def _introspect_schema(conn:sqlite3.Connection, schema_name:str, version:int, rows:list[tuple[str,str,str,str]]|None=None,
+ digest:str='') -> IntrospectedSchema:
+  if rows is None: rows = _schema_rows(conn, schema_name)
+  intro = IntrospectedSchema(schema_version=version, digest=(digest or _schema_digest(rows)))
+  qs = qe(schema_name)
+  virtual_names = [name for type_, name, _, sql in rows if type_ == 'table' and _virtual_table_re.match(sql)]
+  shadow_re = re.compile('|'.join(re.escape(n) + '_[a-z]+' for n in virtual_names)) if virtual_names else None
+  for type_, name, tbl_name, sql in rows:
+    try:
+      if type_ == 'table':
+        if name in virtual_names: intro.fts_indexes[name] = FtsIndex.parse_sql(sql)
+        elif shadow_re and shadow_re.fullmatch(name) and sql.startswith("CREATE TABLE '"): continue # Shadow table.
+        else: intro.tables[name] = Table.parse(f'{schema_name}.{name}', sql)
+      else:
+        intro.indexes[name] = _introspect_index(conn, qs, name, tbl_name, sql)
+    except Exception as e:
+      intro.errors[name] = f'{type(e).__name__}: {e}'
+  return intro
+
+
+def _introspect_index(conn:sqlite3.Connection, qs:str, name:str, table:str, sql:str) -> Index:
+  is_unique = False
+  for row in sqlite3.Connection.execute(conn, f'PRAGMA {qs}.index_list({qe(table)})'):
+    if row[1] == name:
+      is_unique = bool(row[2])
+      break
+  # index_xinfo rows: (seqno, cid, name, desc, coll, key); the non-key rows describe the rowid or primary key.
+  key_rows = [row for row in sqlite3.Connection.execute(conn, f'PRAGMA {qs}.index_xinfo({qea(name)})') if row[5]]
+  cols = [row[2] for row in key_rows]
+  if None in cols or any(row[3] or row[4].upper() != 'BINARY' for row in key_rows):
+    # Index on expressions, or with a sort order or collation that the column names omit; use the indexed columns verbatim.
+    cols = _sql_index_columns(sql)
+  m = _index_where_re.search(sql)
+  return Index(name=name, table=table, is_unique=is_unique, columns=tuple(cols), where=(m[1].strip() if m else ''))
+
+
+def _sql_index_columns(sql:str) -> list[str]:
+  '''
+  Split the parenthesized indexed-column list of a CREATE INDEX statement into the text of each indexed column.
+  Quoted strings and identifiers are skipped over, so that they may contain parentheses and commas.
+  '''
+  m = _index_on_re.search(sql)
+  if not m: raise ValueError(f'CREATE INDEX statement is missing the indexed column list: {sql!r}')
+  cols:list[str] = []
+  depth = 0
+  start = m.end()
+  for tm in _index_columns_token_re.finditer(sql, start):
+    t = tm[0]
+    if t == '(': depth += 1
+    elif t == ')':
+      if depth == 0:
+        cols.append(sql[start:tm.start()].strip())
+        return cols
+      depth -= 1
+    elif t == ',' and depth == 0:
+      cols.append(sql[start:tm.start()].strip())
+      start = tm.end()
+  raise ValueError(f'CREATE INDEX statement has unbalanced parentheses: {sql!r}')
+
+
+_index_on_re = re.compile(r'''(?is)\bON\s+(?:"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|[^\s(]+)\s*\(''')
+
+_index_columns_token_re = re.compile(r''''(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|[(),]''')
+
+
+_index_where_re = re.compile(r'(?is)\)\s*WHERE\s+(.*)$')
+
+_virtual_table_re = re.compile(r'(?i)CREATE\s+VIRTUAL\s+TABLE\b')
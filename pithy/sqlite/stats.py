@@ -0,0 +1,230 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Database statistics that avoid full table scans where possible.
+
+Row counts are estimated from `sqlite_stat1` (populated by `ANALYZE`) or, when sizes are requested,
+taken from the cell counts reported by the `dbstat` virtual table (if SQLite was compiled with it), which are exact.
+Byte sizes and fragmentation per table and index require `dbstat`; database-level page counts are always available.
+Exact counts can be requested; they are computed in parallel across read-only connections when the database is a file.
+Results are cached per connection until `PRAGMA data_version` changes.
+'''
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from ..string import fmt_rows, format_byte_count
+from .cache import DataVersionCache
+from .util import has_rowid, sql_quote_entity as qe
+
+
+@dataclass(frozen=True)
+class BtreeStats:
+  '''
+  Statistics for a single b-tree: a table or an index.
+  `rows` is the number of rows (or index entries), or None if unknown;
+  `rows_exact` indicates whether it was counted, either with `SELECT COUNT()` or from the `dbstat` cell counts.
+  The size fields are None if `dbstat` is unavailable or sizes were not requested.
+  '''
+  name:str
+  table:str
+  is_index:bool
+  rows:int|None = None
+  rows_exact:bool = False
+  pages:int|None = None
+  bytes:int|None = None
+  unused_bytes:int|None = None
+  payload_bytes:int|None = None
+
+  @property
+  def fragmentation(self) -> float|None:
+    'The fraction of allocated bytes that are unused.'
+    if not self.bytes or self.unused_bytes is None: return None
+    return self.unused_bytes / self.bytes
+
+
+@dataclass(frozen=True)
+class DbStats:
+  schema:str
+  page_size:int
+  page_count:int
+  freelist_count:int
+  btrees:tuple[BtreeStats,...]
+
+  @property
+  def bytes(self) -> int: return self.page_size * self.page_count
+
+  @property
+  def free_fraction(self) -> float:
+    'The fraction of database pages on the freelist, which `VACUUM` would reclaim.'
+    return self.freelist_count / self.page_count if self.page_count else 0.0
+
+  @property
+  def tables(self) -> dict[str,BtreeStats]:
+    return {b.name: b for b in self.btrees if not b.is_index}
+
+  def fmt_table(self) -> Iterable[str]:
+    'Format the statistics as lines of a text table.'
+    def fmt_opt(n:int|None, approx:bool=False) -> str:
+      if n is None: return ''
+      return f'~{n:,}' if approx else f'{n:,}'
+    rows = [(b.name, 'index' if b.is_index else 'table', fmt_opt(b.rows, not b.rows_exact), fmt_opt(b.pages),
+      '' if b.bytes is None else format_byte_count(b.bytes), '' if b.fragmentation is None else f'{b.fragmentation:.1%}')
+      for b in self.btrees]
+    yield (f'{self.schema}: {format_byte_count(self.bytes)}; {self.page_count:,} pages of {self.page_size:,} bytes; '
+      f'{self.freelist_count:,} free ({self.free_fraction:.1%}).')
+    yield from fmt_rows(rows, head=('name', 'type', 'rows', 'pages', 'bytes', 'unused'), rjust=[False, False, True])
+
+
+_db_stats_cache = DataVersionCache[tuple[bool,bool,int],DbStats](max_size=8)
+
+
+def db_stats(conn:sqlite3.Connection, *, schema:str='main', sizes:bool=True, exact:bool=False, workers:int=4) -> DbStats:
+  '''
+  Return statistics for every table and index in the schema.
+  `sizes`: compute per-b-tree sizes and cell counts from `dbstat`, if available. This reads every page but not every row.
+  `exact`: count rows of every table with `SELECT COUNT()`. For file databases, the counts are distributed across
+  up to `workers` threads, each using its own read-only connection.
+  Results are cached until the database changes.
+  '''
+  return _db_stats_cache.get(conn, (sizes, exact, workers), lambda: _compute_db_stats(conn, schema, sizes, exact, workers),
+    schema=schema)
+
+
+def _compute_db_stats(conn:sqlite3.Connection, schema:str, sizes:bool, exact:bool, workers:int) -> DbStats:
+  qs = qe(schema)
+  c = _plain_cursor(conn)
+
+  def pragma(name:str) -> int:
+    return c.execute(f'PRAGMA {qs}.{name}').fetchone()[0] # type: ignore[no-any-return]
+
+  page_size = pragma('page_size')
+  page_count = pragma('page_count')
+  freelist_count = pragma('freelist_count')
+
+  structures = c.execute(f"SELECT type, name, tbl_name FROM {qs}.sqlite_schema WHERE type IN ('table', 'index') ORDER BY name"
+    ).fetchall()
+  table_names = [name for type_, name, _ in structures if type_ == 'table']
+  intkey_tables = {name for name in table_names if _is_rowid_btree(conn, schema, name)}
+
+  estimates = stat1_row_counts(conn, schema=schema)
+  sizes_by_name = dbstat_sizes(conn, schema=schema, intkey_tables=intkey_tables) if sizes else {}
+  exact_counts = exact_row_counts(conn, schema=schema, tables=table_names, workers=workers) if exact else {}
+
+  btrees = []
+  for type_, name, tbl_name in structures:
+    is_index = (type_ == 'index')
+    size = sizes_by_name.get(name)
+    rows:int|None
+    if name in exact_counts:
+      rows = exact_counts[name]
+      rows_exact = True
+    elif size is not None and size[4] is not None:
+      rows = size[4] # Cell counts are exact as of the scan.
+      rows_exact = True
+    else:
+      rows = estimates.get(name) if not is_index else None
+      rows_exact = False
+    btrees.append(BtreeStats(name=name, table=tbl_name, is_index=is_index, rows=rows, rows_exact=rows_exact,
+      pages=(size[0] if size else None), bytes=(size[1] if size else None), unused_bytes=(size[2] if size else None),
+      payload_bytes=(size[3] if size else None)))
+
+  c.close()
+  return DbStats(schema=schema, page_size=page_size, page_count=page_count, freelist_count=freelist_count, btrees=tuple(btrees))
+
+
+def _plain_cursor(conn:sqlite3.Connection) -> sqlite3.Cursor:
+  c = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+  c.row_factory = None
+  return c
+
+
+def _is_rowid_btree(conn:sqlite3.Connection, schema:str, table:str) -> bool:
+  if table.startswith('sqlite_'): return True
+  return has_rowid(conn, table, schema=schema)
+
+
+def dbstat_available(conn:sqlite3.Connection) -> bool:
+  'Return True if SQLite was compiled with the `dbstat` virtual table.'
+  try: _plain_cursor(conn).execute('SELECT 1 FROM dbstat LIMIT 0')
+  except sqlite3.OperationalError: return False
+  return True
+
+
+def dbstat_sizes(conn:sqlite3.Connection, *, schema:str='main', intkey_tables:set[str]
+ ) -> dict[str,tuple[int,int,int,int,int|None]]:
+  '''
+  Return a dict mapping b-tree names to (pages, bytes, unused bytes, payload bytes, cells) using `dbstat`,
+  or an empty dict if `dbstat` is unavailable.
+  For rowid tables (named in `intkey_tables`), rows are stored only in leaf cells;
+  for indexes and WITHOUT ROWID tables, interior cells hold entries too.
+  '''
+  if not dbstat_available(conn): return {}
+  rows = _plain_cursor(conn).execute('''
+    SELECT name, COUNT(), SUM(pgsize), SUM(unused), SUM(payload),
+      SUM(CASE WHEN pagetype = 'leaf' THEN ncell ELSE 0 END), SUM(CASE WHEN pagetype != 'overflow' THEN ncell ELSE 0 END)
+    FROM dbstat(?) GROUP BY name''', (schema,))
+  return {name: (pages, bytes_, unused, payload, (leaf_cells if name in intkey_tables else all_cells))
+    for name, pages, bytes_, unused, payload, leaf_cells, all_cells in rows}
+
+
+def stat1_row_counts(conn:sqlite3.Connection, *, schema:str='main') -> dict[str,int]:
+  '''
+  Return the approximate row counts of all tables recorded in `sqlite_stat1` by the most recent `ANALYZE`.
+  The first integer of each `stat` entry is the (approximate) number of rows in the table or index;
+  the maximum over all entries for a table is used because partial indexes may cover fewer rows.
+  '''
+  try: rows = _plain_cursor(conn).execute(f'SELECT tbl, stat FROM {qe(schema)}.sqlite_stat1').fetchall()
+  except sqlite3.OperationalError: return {} # sqlite_stat1 does not exist.
+  counts:dict[str,int] = {}
+  for tbl, stat in rows:
+    try: n = int(stat.split(None, 1)[0])
+    except (AttributeError, IndexError, ValueError): continue
+    if n > counts.get(tbl, -1): counts[tbl] = n
+  return counts
+
+
+def stat1_row_count(conn:sqlite3.Connection, *, schema:str='main', table:str) -> int|None:
+  '''
+  Return the approximate row count of `table` as recorded in `sqlite_stat1` by the most recent `ANALYZE`,
+  or None if no statistics are available.
+  '''
+  return stat1_row_counts(conn, schema=schema).get(table)
+
+
+def exact_row_counts(conn:sqlite3.Connection, *, schema:str='main', tables:Iterable[str], workers:int=4) -> dict[str,int]:
+  '''
+  Count the rows of each table exactly.
+  For file databases with `workers` > 1, tables are counted concurrently, each thread using its own read-only connection.
+  Note that the counts may then reflect slightly different points in time.
+  '''
+  from .conn import sqlite_file_uri # Imported here because `conn` imports this module indirectly.
+  tables = list(tables)
+  path = _schema_path(conn, schema)
+  if not path or workers <= 1 or len(tables) <= 1:
+    c = _plain_cursor(conn)
+    return {t: c.execute(f'SELECT COUNT() FROM {qe(schema)}.{qe(t)}').fetchone()[0] for t in tables}
+
+  def count_tables(chunk:list[str]) -> list[tuple[str,int]]:
+    ro = sqlite3.connect(sqlite_file_uri(path, mode='ro'), uri=True)
+    try: return [(t, ro.execute(f'SELECT COUNT() FROM {qe(t)}').fetchone()[0]) for t in chunk]
+    finally: ro.close()
+
+  n = min(workers, len(tables))
+  chunks = [tables[i::n] for i in range(n)]
+  with ThreadPoolExecutor(max_workers=n) as executor:
+    return dict(pair for result in executor.map(count_tables, chunks) for pair in result)
+
+
+def _schema_path(conn:sqlite3.Connection, schema:str) -> str:
+  for _, name, path in _plain_cursor(conn).execute('PRAGMA database_list'):
+    if name == schema: return path # type: ignore[no-any-return]
+  return ''
+
+
+def iter_table_row_counts(conn:sqlite3.Connection, *, schema:str='main', exact:bool=False) -> Iterator[tuple[str,int|None,bool]]:
+  'Yield (table, rows, is_exact) for each table, using cached statistics.'
+  for b in db_stats(conn, schema=schema, sizes=False, exact=exact).btrees:
+    if not b.is_index: yield b.name, b.rows, b.rows_exact
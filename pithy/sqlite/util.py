@@ -1,6 +1,7 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
 import re
+import sqlite3
 from datetime import date, datetime
 from functools import cache, lru_cache
 from typing import Any, get_args, Iterable, NamedTuple
@@ -210,6 +211,26 @@ def sql_fuzzy_search_words(query:str) -> str:
   return f'%{"%".join(words)}%'
 
 
+def sql_fts_query_words(query:str, prefix:bool=True) -> str:
+  '''
+  Convert arbitrary user input to an FTS5 query that matches all of the words, in any order.
+  Each word is quoted as an FTS5 string so that punctuation and keywords (e.g. 'AND', 'NEAR') are not interpreted as syntax.
+  If `prefix` is True, the last word is treated as a prefix, which suits search-as-you-type.
+  '''
+  words = [w.replace('"', '""') for w in query.strip().split()]
+  if not words: return '""'
+  terms = [f'"{w}"' for w in words]
+  if prefix: terms[-1] += '*'
+  return ' '.join(terms)
+
+
+def has_rowid(conn:sqlite3.Connection, table:str, *, schema:str='') -> bool:
+  'Return True if `table` has a rowid, i.e. it is not a WITHOUT ROWID table.'
+  try: sqlite3.Connection.execute(conn, f'SELECT rowid FROM {sql_quote_qual_entity(schema, table)} LIMIT 0')
+  except sqlite3.OperationalError: return False
+  return True
+
+
 def sql_quote_qual_entity(*entity_parts:str) -> str:
   return '.'.join(sql_quote_entity(p) for p in entity_parts if p)
 
@@ -5,8 +5,10 @@ SVG types based on Markup (`Mu` class family).
 SVG elements reference: https://developer.mozilla.org/en-US/docs/Web/SVG/Element.
 '''
 
+import re
+from array import array
 from os import PathLike
-from typing import Any, BinaryIO, cast, ClassVar, Iterable, Self, TextIO
+from typing import Any, BinaryIO, cast, ClassVar, Iterable, Self, Sequence, TextIO
 
 from ..default import Default
 from ..markup import _Mu, Mu, MuAttrs, NoMatchError, prefer_int
@@ -19,6 +21,7 @@ Vec = tuple[float,float]|V
 VecOrNum = Vec|float
 BoundsF2 = tuple[tuple[float,float],tuple[float,float]]
 PathCommand = str|tuple[int|float|str,...]
+CoordArray = Any # A NumPy array of shape (n, 2), or an `array.array` of interleaved x, y coordinates.
 
 _LxmlFilePath = str | bytes | PathLike[str] | PathLike[bytes]
 _LxmlFileReadSource = _LxmlFilePath | BinaryIO | TextIO
@@ -57,10 +60,10 @@ class SvgNode(Mu):
       title_el = self.pick('title')
     except NoMatchError:
       if title is not None:
-        self._.insert(0, Title(_=title))
+        self._writable_children().insert(0, Title(_=title))
     else:
       if title is None:
-        self._.remove(title_el)
+        self._writable_children().remove(title_el)
       else:
         title_el._ = [title]
 
@@ -69,7 +72,7 @@ class SvgNode(Mu):
     'Remove the title child element.'
     try: title_el = self.pick('title')
     except NoMatchError as e: raise AttributeError('title') from e
-    else: self._.remove(title_el)
+    else: self._writable_children().remove(title_el)
 
 
   @classmethod
@@ -111,7 +114,7 @@ class _MixinViewBox:
 
   def viewbox(self, vx:float=0, vy:float=0, vw:float|None=None, vh:float|None=None) -> Self:
     'Set the viewBox attribute.'
-    cast(SvgNode, self).attrs['viewBox'] = fmt_viewBox(vx, vy, vw, vh)
+    cast(SvgNode, self)['viewBox'] = fmt_viewBox(vx, vy, vw, vh)
     return self
 
 
@@ -164,61 +167,52 @@ class Line(SvgNode):
 
 @_tag
 class Path(SvgNode):
-  'SVG Path element.'
+  '''
+  SVG Path element.
+  The `precision`, `relative` and `tolerance` options select the compact encoding of `fmt_path`.
+  '''
 
-  def __init__(self, *args:Any, d:Iterable[PathCommand]|Default=Default._, **kw_attrs:Any) -> None:
+  def __init__(self, *args:Any, d:Iterable[PathCommand]|Default=Default._, precision:int|None=None, relative:bool=False,
+   tolerance:float=0, **kw_attrs:Any) -> None:
 
     if isinstance(d, Default):
       super().__init__(*args, **kw_attrs)
       return
 
     if not isinstance(d, str):
-      cmd_strs = []
-
-      for c in d:
-
-        if isinstance(c, str):
-          if c: cmd_strs.append(c) # Ignore empty strings.
-          continue
-
-        try: code = c[0]
-        except IndexError: continue # Ignore empty tuples.
-
-        if not isinstance(code, str): raise Exception(f'path command code must be a string; received command: {c!r}')
-
-        try: exp_len = _path_command_lens[code]
-        except KeyError as e: raise Exception(f'bad path command code: {code!r}; received command: {c!r}') from e
-
-        if len(c) != exp_len + 1:
-          raise Exception(f'path command code {code!r} requires {exp_len} arguments; received command: {c!r}')
-
-        cmd_strs.append(code + ','.join(str(prefer_int(n)) for n in c[1:]))
-
-      d = ' '.join(cmd_strs)
+      if precision is not None or relative or tolerance > 0:
+        d = fmt_path(d, precision=precision, relative=relative, tolerance=tolerance)
+      else:
+        cmd_strs = []
+        for c in d:
+          if isinstance(c, str):
+            if c: cmd_strs.append(c) # Ignore empty strings.
+            continue
+          if not c: continue # Ignore empty tuples.
+          code = validate_path_command(c)
+          cmd_strs.append(code + ','.join(str(prefer_int(n)) for n in c[1:]))
+        d = ' '.join(cmd_strs)
 
     super().__init__(*args, d=d, **kw_attrs)
 
 
 @_tag
 class SvgPoly(SvgNode):
-  'Abstract class for SVG polygon and polyline elements.'
+  '''
+  Abstract class for SVG polygon and polyline elements.
+  The `precision` and `tolerance` options are passed to `fmt_points`.
+  '''
 
-  def __init__(self, *args:Any, points:str|Iterable[str|Vec]|Default=Default._, **kw_attrs:Any) -> None:
+  def __init__(self, *args:Any, points:str|Iterable[str|Vec]|CoordArray|Default=Default._, precision:int|None=None,
+   tolerance:float=0, **kw_attrs:Any) -> None:
 
     if isinstance(points, Default):
       super().__init__(*args, **kw_attrs)
       return
 
     if not isinstance(points, str):
-      point_strs = []
-      for p in points:
-        if isinstance(p, str):
-          point_strs.append(p)
-        elif len(p) < 2:
-          raise Exception(f'invalid point for {self.tag}: {p!r}')
-        else:
-          point_strs.append(f'{prefer_int(p[0])},{prefer_int(p[1])}')
-      points = ' '.join(point_strs)
+      try: points = fmt_points(points, precision=precision, tolerance=tolerance)
+      except ValueError as e: raise Exception(f'invalid points for {self.tag}: {e}') from e
 
     super().__init__(*args, points=points, **kw_attrs)
 
@@ -250,7 +244,7 @@ class Text(SvgNode, _MixinPos):
   def alignment_baseline(self, alignment_baseline:str|None) -> Self:
     if alignment_baseline:
       if alignment_baseline not in alignment_baselines: raise ValueError(alignment_baseline)
-      self.attrs['alignment-baseline'] = alignment_baseline
+      self['alignment-baseline'] = alignment_baseline
     return self
 
 
@@ -352,12 +346,12 @@ class SvgBranch(SvgNode):
     return self.append(Path(d=d, **kw_attrs))
 
 
-  def polygon(self, points:Iterable[Vec], **kw_attrs:Any) -> Polygon:
+  def polygon(self, points:Iterable[Vec]|CoordArray, **kw_attrs:Any) -> Polygon:
     'Create a child `polygon` element.'
     return self.append(Polygon(points=points, **kw_attrs))
 
 
-  def polyline(self, points:Iterable[Vec], **kw_attrs:Any) -> Polyline:
+  def polyline(self, points:Iterable[Vec]|CoordArray, **kw_attrs:Any) -> Polyline:
     'Create a child `polyline` element.'
     return self.append(Polyline(points=points, **kw_attrs))
 
@@ -472,7 +466,7 @@ class G(SvgBranch):
       else:
         t = ' '.join(transform)
       if t:
-        self.attrs['transform'] = t
+        self['transform'] = t
     return self
 
 
@@ -518,10 +512,246 @@ def apply_transforms(svg:SvgNode, transforms:Iterable[str]) -> SvgNode:
   if transforms:
     if existing := svg.attrs.get('transform'):
       transforms += existing
-  svg.attrs['transform'] = ' '.join(transforms)
+  svg['transform'] = ' '.join(transforms)
   return svg
 
 
+# Geometry simplification and compact formatting.
+
+
+def simplify_rdp(points:Sequence[tuple[float,float]], tolerance:float) -> list[int]:
+  '''
+  Simplify a polyline using the Ramer-Douglas-Peucker algorithm.
+  Returns the ascending indices of the retained points; the first and last points are always retained,
+  and every removed point lies within `tolerance` of the simplified polyline.
+  '''
+  count = len(points)
+  if count < 3: return list(range(count))
+  keep = bytearray(count)
+  keep[0] = keep[-1] = 1
+  tol_sq = tolerance * tolerance
+  stack = [(0, count - 1)]
+  while stack:
+    start, end = stack.pop()
+    ax, ay = points[start]
+    bx, by = points[end]
+    dx = bx - ax
+    dy = by - ay
+    seg_len_sq = dx * dx + dy * dy
+    max_dist_sq = -1.0
+    max_i = start
+    for i in range(start + 1, end):
+      px, py = points[i]
+      if seg_len_sq:
+        cross = dx * (py - ay) - dy * (px - ax)
+        dist_sq = cross * cross / seg_len_sq
+      else: # Degenerate segment; use the distance to the endpoint.
+        dist_sq = (px - ax) ** 2 + (py - ay) ** 2
+      if dist_sq > max_dist_sq:
+        max_dist_sq = dist_sq
+        max_i = i
+    if max_dist_sq > tol_sq:
+      keep[max_i] = 1
+      stack.append((start, max_i))
+      stack.append((max_i, end))
+  return [i for i, k in enumerate(keep) if k]
+
+
+def fmt_num(v:float, precision:int|None=None) -> str:
+  '''
+  Format a number for SVG output.
+  If `precision` is None, integral floats are formatted as ints.
+  Otherwise the value is rounded to `precision` decimal places, and trailing zeros and leading integral zeros are omitted.
+  '''
+  if precision is None: return str(prefer_int(v))
+  return _compact_fixed(f'{v:.{precision}f}')
+
+
+def fmt_points(points:Iterable[str|Vec]|CoordArray, *, precision:int|None=None, tolerance:float=0) -> str:
+  '''
+  Format points as an SVG `points` attribute string.
+  `points` can be an iterable of (x, y) pairs, or a `CoordArray`, which is formatted in bulk without creating a tuple per point.
+  Preformatted string points are only allowed when `precision` and `tolerance` are not specified.
+  If `tolerance` is positive, the points are first simplified with `simplify_rdp`.
+  '''
+  flat = _flat_coords(points)
+  if flat is None:
+    if precision is None and tolerance <= 0:
+      point_strs = []
+      for p in points:
+        if isinstance(p, str): point_strs.append(p)
+        elif len(p) < 2: raise ValueError(f'invalid point: {p!r}')
+        else: point_strs.append(f'{prefer_int(p[0])},{prefer_int(p[1])}')
+      return ' '.join(point_strs)
+    flat = []
+    for p in points:
+      if isinstance(p, str) or len(p) < 2: raise ValueError(f'invalid point: {p!r}')
+      flat.append(p[0])
+      flat.append(p[1])
+  elif len(flat) % 2: raise ValueError(f'coordinate array has an odd number of values: {len(flat)}')
+
+  if tolerance > 0:
+    xs = flat[0::2]
+    ys = flat[1::2]
+    flat = []
+    for i in simplify_rdp(list(zip(xs, ys)), tolerance):
+      flat.append(xs[i])
+      flat.append(ys[i])
+
+  if not flat: return ''
+  n = len(flat) // 2
+  if precision is None:
+    return _integral_float_re.sub('', ('%s,%s ' * n % tuple(flat))[:-1])
+  fmt = f'%.{precision}f,%.{precision}f '
+  return _compact_fixed((fmt * n % tuple(flat))[:-1])
+
+
+def fmt_path(d:Iterable[PathCommand], *, precision:int|None=None, relative:bool=False, tolerance:float=0) -> str:
+  '''
+  Format path commands as a compact SVG path `d` attribute string.
+  Input commands are tuples as accepted by `Path`; preformatted string commands are not allowed.
+  * `precision`: round coordinates to this many decimal places (see `fmt_num`).
+  * `relative`: emit lowercase relative commands, which are much shorter for detailed paths with large coordinates.
+    Offsets are computed between rounded absolute positions, so rounding errors do not accumulate;
+    without `precision`, offsets are rounded to 12 decimal places to remove floating point noise.
+  * `tolerance`: if positive, simplify each run of line commands with `simplify_rdp`.
+  Repeated command letters and separators before negative numbers are omitted.
+  '''
+  cmds = _abs_path_commands(d)
+  if tolerance > 0: cmds = _simplify_path_lines(cmds, tolerance)
+  parts:list[str] = []
+  prev_code = ''
+  cx = cy = sx = sy = 0.0 # The current point and subpath start, in rounded absolute coordinates.
+  for cmd in cmds:
+    code = cmd[0]
+    if code == 'Z':
+      prev_code = 'z' if relative else 'Z'
+      parts.append(prev_code)
+      cx, cy = sx, sy
+      continue
+    x = cmd[-2]
+    y = cmd[-1]
+    if precision is not None:
+      x = round(x, precision)
+      y = round(y, precision)
+    if relative:
+      out_code = code.lower()
+      # Round away the representation error of the subtraction, e.g. 0.3 - 0.1 = 0.19999999999999998.
+      ox = round(x - cx, _relative_offset_digits if precision is None else precision)
+      oy = round(y - cy, _relative_offset_digits if precision is None else precision)
+    else:
+      out_code = code
+      ox = x
+      oy = y
+    nums = [fmt_num(n, precision) for n in cmd[1:-2]]
+    nums.append(fmt_num(ox, precision))
+    nums.append(fmt_num(oy, precision))
+    text = nums[0]
+    for n in nums[1:]: text += n if n[0] == '-' else ',' + n
+    if _implied_path_codes.get(prev_code) == out_code: # Omit the repeated command letter.
+      parts.append(text if text[0] == '-' else ' ' + text)
+    else:
+      parts.append(out_code + text)
+    prev_code = out_code
+    cx = x
+    cy = y
+    if code == 'M':
+      sx = x
+      sy = y
+  return ''.join(parts)
+
+
+_relative_offset_digits = 12 # Well above the precision of drawing coordinates, and well below that of doubles.
+
+
+def validate_path_command(c:tuple) -> str:
+  'Validate a path command tuple and return its code.'
+  code = c[0]
+  if not isinstance(code, str): raise Exception(f'path command code must be a string; received command: {c!r}')
+  try: exp_len = _path_command_lens[code]
+  except KeyError as e: raise Exception(f'bad path command code: {code!r}; received command: {c!r}') from e
+  if len(c) != exp_len + 1:
+    raise Exception(f'path command code {code!r} requires {exp_len} arguments; received command: {c!r}')
+  return code
+
+
+def _abs_path_commands(d:Iterable[PathCommand]) -> list[tuple]:
+  'Validate path commands and convert them to absolute uppercase commands.'
+  cmds:list[tuple] = []
+  cx = cy = sx = sy = 0.0
+  for c in d:
+    if isinstance(c, str):
+      if c: raise ValueError(f'string path commands cannot be reformatted: {c!r}')
+      continue
+    if not c: continue
+    code = validate_path_command(c)
+    if code in 'Zz':
+      cmds.append(('Z',))
+      cx, cy = sx, sy
+      continue
+    x = cast(float, c[-2])
+    y = cast(float, c[-1])
+    if code.islower():
+      x += cx
+      y += cy
+      code = code.upper()
+    cmds.append((code, *c[1:-2], x, y))
+    cx = x
+    cy = y
+    if code == 'M':
+      sx = x
+      sy = y
+  return cmds
+
+
+def _simplify_path_lines(cmds:list[tuple], tolerance:float) -> list[tuple]:
+  'Simplify each run of absolute `L` commands, starting from the current point.'
+  simplified:list[tuple] = []
+  run:list[tuple[float,float]] = []
+  cx = cy = sx = sy = 0.0
+  for cmd in [*cmds, None]:
+    if cmd is not None and cmd[0] == 'L':
+      if not run: run.append((cx, cy))
+      run.append(cmd[1:])
+      cx, cy = cmd[1:]
+      continue
+    if run:
+      simplified.extend(('L', *run[i]) for i in simplify_rdp(run, tolerance)[1:])
+      run.clear()
+    if cmd is None: break
+    simplified.append(cmd)
+    if cmd[0] == 'Z':
+      cx, cy = sx, sy
+    else:
+      cx, cy = cmd[-2:]
+      if cmd[0] == 'M': sx, sy = cx, cy
+  return simplified
+
+
+def _flat_coords(points:Any) -> list[float]|None:
+  'Return a flat list of coordinates for a `CoordArray`, or None for other iterables.'
+  if isinstance(points, array): return points.tolist()
+  ravel = getattr(points, 'ravel', None) # NumPy arrays.
+  if ravel is not None: return cast(list[float], ravel().tolist())
+  return None
+
+
+def _compact_fixed(s:str) -> str:
+  'Remove redundant characters from fixed point numbers in `s`.'
+  s = _fixed_trailing_zeros_re.sub(lambda m: m[1] if len(m[1]) > 1 else '', s)
+  s = _negative_zero_re.sub('0', s)
+  return _leading_zero_re.sub('', s)
+
+
+_implied_path_codes = { 'M': 'L', 'm': 'l', 'L': 'L', 'l': 'l', 'A': 'A', 'a': 'a' }
+#^ Maps each command code to the code that is implied when a command is followed by more arguments without a letter.
+
+_integral_float_re = re.compile(r'\.0(?![\de])')
+_fixed_trailing_zeros_re = re.compile(r'(\.\d*?)0+(?!\d)')
+_negative_zero_re = re.compile(r'-0(?![\d.])')
+_leading_zero_re = re.compile(r'(?<!\d)0(?=\.)')
+
+
 # Miscellaneous.
 
 
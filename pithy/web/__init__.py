@@ -6,10 +6,10 @@ from html import escape as html_escape
 from http import HTTPStatus
 from io import BufferedReader
 from os import fstat as os_fstat
-from typing import BinaryIO, TextIO
-from urllib.parse import unquote as url_unquote, urlsplit as url_split
+from typing import BinaryIO, Iterable, Iterator, TextIO, TypeIs
+from urllib.parse import parse_qs, unquote as url_unquote, urlsplit as url_split
 
-from ..http import http_methods, may_send_body
+from ..http import format_header_date, http_methods, may_send_body
 from ..markup import Mu
 from ..path import norm_path, path_ext
 from ..util import lazy_property
@@ -18,12 +18,12 @@ from ..util import lazy_property
 pithy_web_static_dir_path = sys.modules[__name__].__path__[0] + '/static'
 
 
-ResponseBody = str|bytes|bytearray|BufferedReader|Mu|None
+ResponseBody = str|bytes|bytearray|BufferedReader|Mu|Iterator[bytes]|None
 
-BinaryResponseBody = bytes|bytearray|BufferedReader|None
+BinaryResponseBody = bytes|bytearray|BufferedReader|Iterator[bytes]|None
 #^ Note: normally we would use the abstract BinaryIO type
 #  but mypy does not understand the difference between the unions when testing the runtime file type.
-# TODO: support iterable[bytes]?
+# Because BufferedReader is itself an iterator, it must always be tested for first.
 
 
 @dataclass
@@ -65,6 +65,18 @@ class Request:
     except Exception as exc: raise BadRequest('Failed to read request body') from exc
 
 
+  @lazy_property
+  def query_params_multi(self) -> dict[str,list[str]]:
+    'Parse the query string.'
+    return parse_qs(self.query)
+
+
+  @lazy_property
+  def query_params_single(self) -> dict[str,str]:
+    'Parse the query string; if a parameter is repeated, the last value wins.'
+    return { k : vs[-1] for k, vs in self.query_params_multi.items() }
+
+
   @lazy_property
   def post_params_multi(self) -> dict[str,list[str]]:
     '''
@@ -107,7 +119,13 @@ class Response:
   * media_type: The Content-Type header.
   * last_modified: The Last-Modified header.
 
-  'Content-Length' is automatically set based on the status and body.
+  For file bodies, `file_range` is the (start, end) byte range of the file to send, where `end` is exclusive.
+  It defaults to the whole file.
+
+  An iterator of bytes is a streamed body. Its length is not known in advance,
+  so servers send it with chunked transfer coding, and iterate it on the thread that sends the response.
+
+  'Content-Length' is automatically set based on the status and body, except for streamed bodies.
 
   The constructor checks that the body is appropriate for the status code.
   '''
@@ -115,10 +133,11 @@ class Response:
   status:HTTPStatus
   headers:dict[str,float|int|str]
   body:BinaryResponseBody
+  file_range:tuple[int,int]|None
 
 
   def __init__(self, status:HTTPStatus=HTTPStatus.OK, *, headers:dict[str,float|int|str]|None=None, body:ResponseBody|None=None,
-   media_type:str='', last_modified:float=0.0) -> None:
+   media_type:str='', last_modified:float=0.0, file_range:tuple[int,int]|None=None) -> None:
 
     self.status = status
     self.headers = {} if headers is None else headers
@@ -141,23 +160,44 @@ class Response:
     self.body = binary_body
 
     if isinstance(binary_body, BufferedReader):
-      content_length = content_length_for_file(binary_body)
-    elif binary_body is not None: # Non-file body.
+      if file_range is None: file_range = (0, content_length_for_file(binary_body))
+      content_length = file_range[1] - file_range[0]
+    elif file_range is not None:
+      raise ValueError(f'file_range requires a file body: {file_range!r}')
+    elif isinstance(binary_body, (bytes, bytearray)):
       content_length = len(binary_body)
-    else:
+    elif binary_body is None:
       content_length = 0
-    self.headers['Content-Length'] = content_length
+    else: # Streamed body.
+      content_length = -1
+    self.file_range = file_range
+    if content_length >= 0: self.headers['Content-Length'] = content_length
 
     if media_type:
       self.headers['Content-Type'] = media_type
     if last_modified:
-      self.headers['Last-Modified'] = last_modified
+      self.headers['Last-Modified'] = format_header_date(last_modified)
 
 
   def headers_list(self) -> list[tuple[str,str]]:
     return [(k, str(v)) for (k,v) in self.headers.items()]
 
 
+  def set_file_range(self, start:int, end:int) -> None:
+    '''
+    Restrict a full file response to the byte range [start, end) of its representation,
+    making it a 206 Partial Content response.
+    '''
+    if not isinstance(self.body, BufferedReader) or self.file_range is None: raise ValueError('Response body is not a file')
+    offset, full_end = self.file_range
+    size = full_end - offset
+    if not (0 <= start < end <= size): raise ValueError(f'Invalid file range: {(start, end)}')
+    self.status = HTTPStatus.PARTIAL_CONTENT
+    self.file_range = (offset + start, offset + end)
+    self.headers['Content-Range'] = f'bytes {start}-{end-1}/{size}'
+    self.headers['Content-Length'] = end - start
+
+
 error_html_format = '''\
 <!DOCTYPE html>
 <html>
@@ -174,6 +214,7 @@ error_html_format = '''\
 
 
 html_media_type = 'text/html;charset=utf-8'
+json_media_type = 'application/json'
 error_media_type = html_media_type
 
 
@@ -217,6 +258,29 @@ def BadRequest(reason:str='') -> ResponseError:
   return ResponseError(HTTPStatus.BAD_REQUEST, reason=reason)
 
 
+def is_streamed_body(body:BinaryResponseBody) -> TypeIs[Iterator[bytes]]:
+  'Return True if `body` is a streamed (iterator) body.'
+  return body is not None and not isinstance(body, (bytes, bytearray, BufferedReader))
+
+
+def iter_byte_chunks(parts:Iterable[str|bytes], chunk_size:int=1<<16) -> Iterator[bytes]:
+  '''
+  Encode and batch `parts` into chunks of at least `chunk_size` bytes (except for the last), for streamed response bodies.
+  Batching keeps the per-chunk overhead of the server and transfer coding low when the parts are small.
+  '''
+  buffer:list[bytes] = []
+  size = 0
+  for part in parts:
+    b = part.encode('utf-8', errors='replace') if isinstance(part, str) else part
+    buffer.append(b)
+    size += len(b)
+    if size >= chunk_size:
+      yield b''.join(buffer)
+      buffer.clear()
+      size = 0
+  if size: yield b''.join(buffer)
+
+
 def content_length_for_file(file:BufferedReader) -> int:
   '''Get a file's size in bytes using its file descriptor and fstat.'''
   fd = file.fileno()
@@ -1,30 +1,113 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
 import mimetypes
-from html import escape as html_escape
+import re
+from dataclasses import dataclass
+from fnmatch import translate as glob_to_regex
+from functools import lru_cache
+from hashlib import algorithms_available as hashlib_algorithms, file_digest
 from http import HTTPStatus
 from io import BufferedReader
-from typing import Any, cast, Iterable, TYPE_CHECKING
-from urllib.parse import quote as url_quote, unquote as url_unquote
+from os import fstat as os_fstat, stat as os_stat, stat_result as StatResult
+from stat import S_ISREG
+from time import monotonic
+from typing import Any, Iterable, Literal, Sequence, TYPE_CHECKING
+from urllib.parse import unquote as url_unquote
 
-from pithy.path import path_ext, path_join
+from pithy.path import path_dir_or_dot, path_ext, path_join
 
-from ..fs import is_dir, path_exists, scan_dir
-from ..http import format_header_date, http_status_response_strings
-from . import compute_local_path, html_media_type, norm_url_path, Request, Response, ResponseError
+from ..compress import compress_fn_available, compress_fns
+from ..fs import is_dir, path_exists
+from ..http import (content_coding_exts, etag_list_matches, format_header_date, http_status_response_strings, if_range_matches,
+  negotiate_content_codings, parse_byte_range, parse_header_date, UnsatisfiableRange)
+from . import (compute_local_path, html_media_type, is_streamed_body, iter_byte_chunks, json_media_type, norm_url_path, Request,
+  Response, ResponseError)
+from .cache import SizedLRUCache
+from .listing import DirListing, ListingQuery, render_listing_html, render_listing_json
 
 
 if TYPE_CHECKING:
   from _typeshed.wsgi import StartResponse
 
 
+EtagMode = Literal['', 'stat', 'weak', 'digest']
+#^ '': no ETag; 'stat': strong ETag from inode, size and mtime; 'weak': the same as a weak ETag;
+# 'digest': strong ETag from a content digest, cached by path and stat.
+
+not_modified_header_names = ('Cache-Control', 'Content-Location', 'ETag', 'Expires', 'Last-Modified', 'Vary')
+#^ The headers that a 304 response carries over from the 200 response it replaces.
+# See https://www.rfc-editor.org/rfc/rfc9110#section-15.4.5.
+
+compressible_media_types = frozenset({
+  'application/javascript',
+  'application/json',
+  'application/manifest+json',
+  'application/wasm',
+  'application/xhtml+xml',
+  'application/xml',
+  'image/svg+xml',
+})
+
+
+def is_compressible_media_type(media_type:str) -> bool:
+  'Return True if content of `media_type` typically benefits from compression.'
+  media_type = media_type.partition(';')[0].strip().lower()
+  return media_type.startswith('text/') or media_type in compressible_media_types
+
+
 class WebApp:
+  '''
+  Local file responses carry `Last-Modified` and an `ETag` as chosen by `etag_mode`,
+  and conditional GET and HEAD requests that match them receive 304 Not Modified responses.
+  `cache_control` is a sequence of (glob pattern, Cache-Control value) pairs that are matched against request paths;
+  the first matching pattern sets the Cache-Control header of successful responses that do not already have one.
 
-  def __init__(self, local_dir:str|None=None, prevent_client_caching:bool=False, map_bare_names_to_html:bool=False) -> None:
+  `content_codings` lists the content codings (in order of preference) that local files may be served with,
+  either from precompressed sibling files (see `pithytools/bin/precompress.py`),
+  or, if `compression_cache_size` is nonzero, compressed in memory and cached up to that many bytes.
+
+  If `file_cache_size` is nonzero, responses for local files of up to `file_cache_max_file_size` bytes
+  are held in memory, up to that many bytes in total, and revalidated against the file system
+  at most once every `file_cache_check_interval` seconds. See `cache_stats` for hit and miss counts.
+
+  Directory listings are paginated to `listing_per_page` entries by default;
+  if `listing_cache_size` is nonzero, scanned listings are cached up to approximately that many bytes.
+  '''
+
+  compression_min_size = 1024 # Smaller files are not worth compressing on the fly.
+
+  def __init__(self, local_dir:str|None=None, prevent_client_caching:bool=False, map_bare_names_to_html:bool=False,
+   etag_mode:EtagMode='stat', etag_digest:str='blake2b', cache_control:Iterable[tuple[str,str]]=(),
+   content_codings:Sequence[str]=tuple(content_coding_exts), compression_cache_size:int=0,
+   file_cache_size:int=0, file_cache_max_file_size:int=1<<16, file_cache_check_interval:float=1.0,
+   listing_cache_size:int=0, listing_per_page:int=1000) -> None:
 
     self.local_dir = local_dir
     self.prevent_client_caching = prevent_client_caching
     self.map_bare_names_to_html = map_bare_names_to_html
+    self.etag_mode = etag_mode
+    self.etag_digest = etag_digest
+    self.cache_control = [(re.compile(glob_to_regex(pattern)), value) for pattern, value in cache_control]
+
+    for coding in content_codings:
+      if coding not in content_coding_exts: raise ValueError(f'unsupported content coding: {coding!r}')
+    self.content_codings = tuple(content_codings)
+    self.compression_cache:SizedLRUCache[tuple[str,int,int,str],bytes]|None = None
+    self.compress_codings:tuple[str,...] = ()
+    if compression_cache_size:
+      self.compression_cache = SizedLRUCache(max_size=compression_cache_size)
+      self.compress_codings = tuple(c for c in self.content_codings if compress_fn_available(content_coding_exts[c]))
+
+    self.file_cache:SizedLRUCache[tuple[str,tuple[str,...]],CachedFile]|None = None
+    if file_cache_size:
+      self.file_cache = SizedLRUCache(max_size=file_cache_size, size_fn=lambda cached: cached.cache_size)
+    self.file_cache_max_file_size = file_cache_max_file_size
+    self.file_cache_check_interval = file_cache_check_interval
+
+    self.listing_cache:SizedLRUCache[str,DirListing]|None = None
+    if listing_cache_size:
+      self.listing_cache = SizedLRUCache(max_size=listing_cache_size, size_fn=lambda listing: listing.cache_size)
+    self.listing_per_page = listing_per_page
 
     if not mimetypes.inited: mimetypes.init()
 
@@ -83,7 +166,12 @@ class WebApp:
     start(http_status_response_strings[response.status], response.headers_list())
 
     if isinstance(response.body, BufferedReader):
-      return [response.body.read()] # TODO: consider iterating over large chunks.
+      with response.body as file:
+        file_start, file_end = response.file_range or (0, -1)
+        file.seek(file_start)
+        return [file.read(file_end - file_start)] # TODO: consider iterating over large chunks.
+    elif is_streamed_body(response.body):
+      return response.body # The WSGI server applies the transfer coding.
     elif response.body:
       return [bytes(response.body)]
     else:
@@ -122,6 +210,13 @@ class WebApp:
 
     status = response.status
     headers = response.headers
+    if self.cache_control and status < 400 and 'Cache-Control' not in headers:
+      path = request.path
+      for pattern, value in self.cache_control:
+        if pattern.match(path):
+          headers['Cache-Control'] = value
+          break
+
     if status != HTTPStatus.CONTINUE and status != HTTPStatus.SWITCHING_PROTOCOLS:
       # According to https://datatracker.ietf.org/doc/html/rfc2616#section-14.18:
       # 100 and 101 may optionally include date. Otherwise it is required.
@@ -141,6 +236,15 @@ class WebApp:
 
     if not raw_path: raw_path = request.path
     norm_path = norm_url_path(raw_path)
+
+    cache_key:tuple[str,tuple[str,...]]|None = None
+    if self.file_cache is not None and 'Range' not in request.headers:
+      codings = negotiate_content_codings(request.headers.get('Accept-Encoding', ''), self.content_codings)
+      cache_key = (norm_path, tuple(codings)) # The acceptable codings determine which representation is served.
+      if cached := self.file_cache.lookup(cache_key, self.is_cached_file_fresh):
+        cached_response = Response(body=cached.body, headers=dict(cached.headers))
+        return self.check_not_modified(request, cached_response) or cached_response
+
     local_path = compute_local_path(local_dir=self.local_dir, norm_path=norm_path, map_bare_names_to_html=self.map_bare_names_to_html)
 
     if not local_path: raise ValueError(local_path) # Should never end up with an empty string.
@@ -161,7 +265,21 @@ class WebApp:
     except (FileNotFoundError, PermissionError): raise ResponseError(status=HTTPStatus.NOT_FOUND)
 
     assert isinstance(file, BufferedReader)
-    return self.transform_file_from_local_fs(request=request, norm_path=norm_path, local_path=local_path, file=file)
+    response = None
+    if self.content_codings:
+      response = self.encoded_file_response(request, local_path=local_path, file=file)
+    is_cacheable = response is not None
+    if response is None:
+      response = self.transform_file_from_local_fs(request=request, norm_path=norm_path, local_path=local_path, file=file)
+      if response.body is file: # Validators describe the file, so they only apply to untransformed content.
+        self.add_file_validators(response, local_path=local_path, file=file)
+        is_cacheable = True
+    if self.content_codings: add_vary(response.headers, 'Accept-Encoding')
+    if cache_key is not None and is_cacheable:
+      self.cache_file_response(cache_key, local_path=local_path, response=response)
+    if not_modified := self.check_not_modified(request, response): return not_modified
+    self.apply_range(request, response)
+    return response
 
 
   def transform_file_from_local_fs(self, request:Request, norm_path:str, local_path:str, file:BufferedReader) -> Response:
@@ -171,32 +289,210 @@ class WebApp:
     return Response(body=file, media_type=self.guess_media_type(local_path))
 
 
+  def encoded_file_response(self, request:Request, local_path:str, file:BufferedReader) -> Response|None:
+    '''
+    Negotiate a content coding for a local file using the request's `Accept-Encoding` header.
+    A precompressed sibling file (e.g. `app.js.br` for `app.js`) is served if it exists and is at least as new as the file.
+    Otherwise, if the compression cache is enabled and the file's media type is compressible,
+    the file is compressed in memory and the result is cached, keyed by path, mtime, size and coding.
+    Returns None if the file should be sent without a content coding; otherwise `file` is closed.
+    Encoded responses bypass `transform_file_from_local_fs`.
+    '''
+    accept_encoding = request.headers.get('Accept-Encoding')
+    if not accept_encoding: return None
+    codings = negotiate_content_codings(accept_encoding, self.content_codings)
+    if not codings: return None
+    media_type = self.guess_media_type(local_path)
+    stat = os_fstat(file.fileno())
+
+    for coding in codings:
+      encoded_path = local_path + content_coding_exts[coding]
+      try: encoded_file = open(encoded_path, 'rb')
+      except OSError: continue
+      encoded_stat = os_fstat(encoded_file.fileno())
+      if S_ISREG(encoded_stat.st_mode) and encoded_stat.st_mtime_ns >= stat.st_mtime_ns:
+        file.close()
+        response = Response(body=encoded_file, media_type=media_type, headers={'Content-Encoding': coding})
+        self.add_file_validators(response, local_path=encoded_path, file=encoded_file)
+        return response
+      encoded_file.close()
+
+    cache = self.compression_cache
+    if cache is None or not is_compressible_media_type(media_type): return None
+    if not (self.compression_min_size <= stat.st_size <= cache.max_size): return None
+    for coding in codings:
+      if coding not in self.compress_codings: continue
+      compress = compress_fns[content_coding_exts[coding]]
+      body = cache.get((local_path, stat.st_mtime_ns, stat.st_size, coding), lambda: compress(file.read(), None))
+      file.close()
+      response = Response(body=body, media_type=media_type, headers={'Content-Encoding': coding})
+      response.headers['Last-Modified'] = format_header_date(stat.st_mtime)
+      if etag := self.file_etag(local_path, stat):
+        response.headers['ETag'] = f'{etag[:-1]}-{coding}"' # Each coding is a distinct representation.
+      return response
+    return None
+
+
+  def cache_file_response(self, key:tuple[str,tuple[str,...]], local_path:str, response:Response) -> None:
+    '''
+    Add a local file response to the hot file cache if its body is small enough.
+    A file body is read into memory and replaces the response body.
+    The entry is validated against the stat of the source file, the served file (which may be a precompressed sibling),
+    and the served file's directory, so that new or removed siblings and index files are noticed.
+    '''
+    assert self.file_cache is not None
+    body = response.body
+    if isinstance(body, BufferedReader):
+      if response.file_range is None or response.file_range[1] > self.file_cache_max_file_size: return
+      served_path = str(body.name)
+      paths = dict.fromkeys((local_path, served_path, path_dir_or_dot(served_path)))
+      try: signatures = tuple((path, stat_signature(os_stat(path))) for path in paths)
+      except OSError: return
+      data = body.read()
+      body.close()
+      response.body = data
+      response.file_range = None
+      # Range requests bypass the cache and are served from the file, so advertise range support as `apply_range` would.
+      if response.status == HTTPStatus.OK: response.headers['Accept-Ranges'] = 'bytes'
+    elif isinstance(body, bytes) and len(body) <= self.file_cache_max_file_size: # Compressed in memory.
+      data = body
+      paths = dict.fromkeys((local_path, path_dir_or_dot(local_path)))
+      try: signatures = tuple((path, stat_signature(os_stat(path))) for path in paths)
+      except OSError: return
+    else:
+      return
+    self.file_cache.put(key, CachedFile(headers=dict(response.headers), body=data, signatures=signatures, checked=monotonic()))
+
+
+  def is_cached_file_fresh(self, cached:'CachedFile') -> bool:
+    '''
+    Validate a hot file cache entry by comparing the stat of its paths,
+    at most once per `file_cache_check_interval` seconds.
+    '''
+    now = monotonic()
+    if now - cached.checked < self.file_cache_check_interval: return True
+    for path, signature in cached.signatures:
+      try: stat = os_stat(path)
+      except OSError: return False
+      if stat_signature(stat) != signature: return False
+    cached.checked = now
+    return True
+
+
+  def cache_stats(self) -> dict[str,dict[str,int]]:
+    'Return the counters of the enabled caches, keyed by cache name, for monitoring and sizing.'
+    stats = {}
+    if self.file_cache is not None: stats['file'] = self.file_cache.stats()
+    if self.compression_cache is not None: stats['compression'] = self.compression_cache.stats()
+    if self.listing_cache is not None: stats['listing'] = self.listing_cache.stats()
+    return stats
+
+
+  def add_file_validators(self, response:Response, local_path:str, file:BufferedReader) -> None:
+    '''
+    Add `Last-Modified` and, depending on `etag_mode`, `ETag` headers to a response whose body is a local file.
+    Headers already set by `transform_file_from_local_fs` are preserved.
+    '''
+    headers = response.headers
+    stat = os_fstat(file.fileno())
+    headers.setdefault('Last-Modified', format_header_date(stat.st_mtime))
+    if 'ETag' not in headers and (etag := self.file_etag(local_path, stat)):
+      headers['ETag'] = etag
+
+
+  def file_etag(self, local_path:str, stat:StatResult) -> str:
+    'Return the ETag for a local file according to `etag_mode`, or the empty string.'
+    match self.etag_mode:
+      case '': return ''
+      case 'stat': return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+      case 'weak': return f'W/"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+      case 'digest': return file_digest_etag(local_path, stat.st_ino, stat.st_size, stat.st_mtime_ns, self.etag_digest)
+      case _: raise ValueError(f'invalid etag_mode: {self.etag_mode!r}')
+
+
+  def check_not_modified(self, request:Request, response:Response) -> Response|None:
+    '''
+    Evaluate the `If-None-Match` or `If-Modified-Since` precondition of a GET or HEAD request against a full response.
+    If the client's cached representation is current, close the response body and return a 304 Not Modified response;
+    otherwise return None.
+    See https://www.rfc-editor.org/rfc/rfc9110#section-13.2.2.
+    '''
+    if request.method not in ('GET', 'HEAD') or response.status != HTTPStatus.OK: return None
+    headers = response.headers
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None: # If-Modified-Since is ignored when If-None-Match is present.
+      if not etag_list_matches(if_none_match, str(headers.get('ETag', ''))): return None
+    else:
+      if_modified_since = request.headers.get('If-Modified-Since')
+      last_modified = headers.get('Last-Modified')
+      if not if_modified_since or not last_modified: return None
+      since_time = parse_header_date(if_modified_since)
+      modified_time = parse_header_date(str(last_modified))
+      if since_time is None or modified_time is None or modified_time > since_time: return None
+
+    if isinstance(response.body, BufferedReader): response.body.close()
+    not_modified = Response(HTTPStatus.NOT_MODIFIED, headers={k: headers[k] for k in not_modified_header_names if k in headers})
+    del not_modified.headers['Content-Length'] # A 304 has no body, and must not describe one of length zero.
+    return not_modified
+
+
+  def apply_range(self, request:Request, response:Response) -> None:
+    '''
+    Advertise byte range support on a full file response, and honor the request's `Range` and `If-Range` headers.
+    A satisfiable single range turns the response into a 206 Partial Content response.
+    Multiple or malformed ranges are ignored, as is a `Range` whose `If-Range` does not match the response's validators;
+    in these cases the full file is sent.
+    '''
+    if response.status != HTTPStatus.OK or response.file_range is None: return
+    response.headers['Accept-Ranges'] = 'bytes'
+    range_val = request.headers.get('Range')
+    if not range_val or request.method != 'GET': return
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and not if_range_matches(if_range, etag=str(response.headers.get('ETag', '')),
+     last_modified=str(response.headers.get('Last-Modified', ''))):
+      return
+    start, end = response.file_range
+    try: byte_range = parse_byte_range(range_val, end - start)
+    except UnsatisfiableRange:
+      assert isinstance(response.body, BufferedReader)
+      response.body.close()
+      raise ResponseError(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, headers={'Content-Range': f'bytes */{end - start}'})
+    if byte_range is not None: response.set_file_range(*byte_range)
+
+
   def list_directory(self, request:Request, local_path:str) -> Response:
     '''
-    Produce a directory listing html page (absent index.html).
+    Produce a directory listing (absent index.html), as an html page or, with `format=json`, a JSON object.
+    The query parameters `sort` (name, size or mtime), `order` (asc or desc), `page` (1-based)
+    and `per_page` (0 for all entries) select the page; the body is streamed as it is rendered.
+    If `listing_cache_size` is nonzero, scanned listings are cached and revalidated against the directory mtime.
     '''
-    try: listing = scan_dir(local_path)
+    query = ListingQuery.parse(request.query_params_single, default_per_page=self.listing_per_page)
+    try: listing = self.dir_listing(local_path)
     except OSError as exc:
       print('Failed to list directory:', local_path, exc, file=request.err)
       raise ResponseError(status=HTTPStatus.NOT_FOUND) from exc
-    listing.sort(key=lambda e: cast(str, e.name.lower()))
+    entries, page_count = listing.page(query)
 
     display_path = url_unquote(request.path, errors='replace')
-    title = html_escape(display_path, quote=False)
-
-    r = []
-    r.append('<!DOCTYPE html>\n<html>')
-    r.append(f'<head>\n<meta charset="utf-8" />\n<title>{title}</title>\n</head>')
-    r.append(f'<body>\n<h1>{title}</h1>')
-    r.append('<hr>\n<ul>')
-    for entry in listing:
-      n = entry.name + ('/' if entry.is_dir(follow_symlinks=True) else '')
-      link_href = url_quote(n, errors='replace')
-      link_text = html_escape(n, quote=False)
-      r.append(f'<li><a href="{link_href}">{link_text}</a></li>')
-    r.append('</ul>\n<hr>\n</body>\n</html>\n')
-    body = '\n'.join(r).encode(errors='replace')
-    return Response(body=body, media_type=html_media_type)
+    if query.format == 'json':
+      parts = render_listing_json(display_path, entries, page_count, total=len(listing.entries), query=query)
+      media_type = json_media_type
+    else:
+      parts = render_listing_html(display_path, entries, page_count, query=query, default_per_page=self.listing_per_page)
+      media_type = html_media_type
+    return Response(body=iter_byte_chunks(parts), media_type=media_type)
+
+
+  def dir_listing(self, local_path:str) -> DirListing:
+    'Scan a directory for `list_directory`, using the listing cache if it is enabled.'
+    cache = self.listing_cache
+    if cache is None: return DirListing.scan(local_path)
+    if listing := cache.lookup(local_path, lambda listing: listing.is_fresh(local_path)): return listing
+    listing = DirListing.scan(local_path)
+    listing.sorted_entries('name') # The default order; sort before caching so that the entry size accounts for it.
+    cache.put(local_path, listing)
+    return listing
 
 
   def guess_media_type(self, path:str) -> str:
@@ -204,3 +500,45 @@ class WebApp:
     ext = path_ext(path).lower()
     try: return self.ext_media_types[ext]
     except KeyError: return self.ext_media_types['']
+
+
+@dataclass
+class CachedFile:
+  '''
+  A hot file cache entry: the headers and body of a local file response,
+  and the (path, stat signature) pairs that it was derived from.
+  '''
+  headers:dict[str,float|int|str]
+  body:bytes
+  signatures:tuple[tuple[str,tuple[int,int,int]],...]
+  checked:float # Monotonic time of the last validation.
+
+  @property
+  def cache_size(self) -> int: return len(self.body) + 512 # Approximate overhead of the headers and entry.
+
+
+def stat_signature(stat:StatResult) -> tuple[int,int,int]:
+  return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def add_vary(headers:dict[str,float|int|str], name:str) -> None:
+  'Add `name` to the `Vary` header, unless it is already present.'
+  vary = str(headers.get('Vary', ''))
+  if not vary:
+    headers['Vary'] = name
+  elif vary != '*' and name.lower() not in (v.strip().lower() for v in vary.split(',')):
+    headers['Vary'] = f'{vary}, {name}'
+
+
+@lru_cache(maxsize=4096)
+def file_digest_etag(path:str, ino:int, size:int, mtime_ns:int, digest:str) -> str:
+  '''
+  Compute a strong ETag from the content digest of a file.
+  The stat arguments are not used directly; they are part of the cache key, so that a changed file is digested again.
+  '''
+  if digest in hashlib_algorithms: digest_fn:Any = digest
+  else: # Only the non-hashlib algorithms require `pithy.digest`, which imports the blake3 package.
+    from ..digest import digest_fns
+    digest_fn = digest_fns[digest]
+  with open(path, 'rb') as f:
+    return f'"{file_digest(f, digest_fn).hexdigest()[:32]}"' # 128 bits is ample to distinguish versions.
@@ -0,0 +1,106 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from threading import Lock
+from typing import Any, Callable, Generic, TypeVar
+
+
+_K = TypeVar('_K')
+_V = TypeVar('_V')
+
+
+class SizedLRUCache(Generic[_K,_V]):
+  '''
+  A thread-safe least-recently-used cache, bounded by the total size of its values as measured by `size_fn`.
+  Values larger than `max_size` are returned but not cached.
+  `hits`, `misses`, `evictions` and `invalidations` count cache activity, for sizing the cache.
+  '''
+
+  def __init__(self, max_size:int, size_fn:Callable[[Any],int]=len) -> None:
+    if max_size < 1: raise ValueError(f'max_size must be positive; received {max_size!r}')
+    self.max_size = max_size
+    self.size_fn = size_fn
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.invalidations = 0
+    self._entries:dict[_K,tuple[_V,int]] = {} # Ordered from least to most recently used.
+    self._lock = Lock()
+
+
+  def __len__(self) -> int: return len(self._entries)
+
+
+  def get(self, key:_K, compute:Callable[[],_V]) -> _V:
+    '''
+    Return the cached value for `key`, or call `compute` and cache its result.
+    `compute` is called without holding the lock, so concurrent misses for the same key may each compute the value.
+    '''
+    val = self.lookup(key)
+    if val is None:
+      val = compute()
+      self.put(key, val)
+    return val
+
+
+  def lookup(self, key:_K, is_valid:Callable[[_V],bool]|None=None) -> _V|None:
+    '''
+    Return the cached value for `key`, or None.
+    If `is_valid` is provided and returns False for the cached value, the entry is discarded and None is returned.
+    `is_valid` is called without holding the lock.
+    '''
+    entries = self._entries
+    with self._lock:
+      entry = entries.pop(key, None)
+      if entry is None:
+        self.misses += 1
+        return None
+      entries[key] = entry # Move to the most recently used position.
+      if is_valid is None:
+        self.hits += 1
+        return entry[0]
+    if is_valid(entry[0]):
+      with self._lock: self.hits += 1
+      return entry[0]
+    with self._lock:
+      self.misses += 1
+      self.invalidations += 1
+      if entries.get(key) is entry:
+        del entries[key]
+        self.size -= entry[1]
+    return None
+
+
+  def put(self, key:_K, val:_V) -> None:
+    'Cache `val` for `key`, evicting least recently used entries as necessary.'
+    size = self.size_fn(val)
+    if size > self.max_size: return
+    entries = self._entries
+    with self._lock:
+      prev = entries.pop(key, None)
+      if prev is not None: self.size -= prev[1]
+      entries[key] = (val, size)
+      self.size += size
+      while self.size > self.max_size:
+        old_key = next(iter(entries))
+        self.size -= entries.pop(old_key)[1]
+        self.evictions += 1
+
+
+  def discard(self, key:_K) -> None:
+    'Remove the entry for `key` if present.'
+    with self._lock:
+      prev = self._entries.pop(key, None)
+      if prev is not None: self.size -= prev[1]
+
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self.size = 0
+
+
+  def stats(self) -> dict[str,int]:
+    'Return a snapshot of the cache counters.'
+    return dict(entries=len(self._entries), size=self.size, max_size=self.max_size, hits=self.hits, misses=self.misses,
+      evictions=self.evictions, invalidations=self.invalidations)
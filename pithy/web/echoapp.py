@@ -34,6 +34,7 @@ class EchoApp(WebApp):
     addendum = f'\nresponse headers: {header_text}\n'
     assert isinstance(response.body, bytes)
     response.body += addendum.encode()
+    response.headers['Content-Length'] = len(response.body) # Keep the framing correct for keep-alive connections.
 
 
 def main() -> None:
@@ -56,6 +57,10 @@ def main() -> None:
       from ..http.server import HttpServer
       server = HttpServer(host=host, port=port, app=EchoApp())
       server.serve_forever()
+    case 'pithy-async':
+      from ..http.server import AsyncHttpServer
+      async_server = AsyncHttpServer(host=host, port=port, app=EchoApp())
+      async_server.serve_forever()
     case 'werkzeug':
       from werkzeug.serving import run_simple  # type: ignore[import-not-found]
       run_simple(hostname=host, port=port, application=EchoApp(), use_reloader=True, reloader_type='watchdog')
@@ -0,0 +1,206 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Directory listings for `WebApp`: scanning, sorting, pagination, and incremental HTML and JSON rendering.
+'''
+
+from dataclasses import dataclass, replace
+from html import escape as html_escape
+from json import dumps as json_dumps
+from os import stat as os_stat
+from time import gmtime, strftime
+from typing import Any, Callable, Iterator, Literal
+from urllib.parse import quote as url_quote, urlencode
+
+from ..fs import scan_dir
+from ..string import format_byte_count
+from . import BadRequest, ResponseNotFound
+
+
+ListingSort = Literal['name', 'size', 'mtime']
+ListingOrder = Literal['asc', 'desc']
+ListingFormat = Literal['html', 'json']
+
+listing_sorts:tuple[ListingSort,...] = ('name', 'size', 'mtime')
+listing_orders:tuple[ListingOrder,...] = ('asc', 'desc')
+listing_formats:tuple[ListingFormat,...] = ('html', 'json')
+
+
+@dataclass(frozen=True)
+class ListingEntry:
+  name:str
+  is_dir:bool
+  size:int # Zero for directories and entries that cannot be stat'ed.
+  mtime:float
+
+
+listing_sort_keys:dict[ListingSort,Callable[[ListingEntry],tuple]] = {
+  'name': lambda e: (e.name.lower(), e.name),
+  'size': lambda e: (e.size, e.name.lower()),
+  'mtime': lambda e: (e.mtime, e.name.lower()),
+}
+
+
+class DirListing:
+  '''
+  The scanned entries of a directory, and the directory's mtime at the time of the scan.
+  Sorted orderings are computed on demand and retained, so that cached listings are only sorted once per key.
+
+  The directory mtime changes when entries are added, removed or renamed, but not when an existing file is rewritten;
+  the sizes and mtimes of a cached listing can therefore be stale until the directory itself changes.
+  '''
+
+  def __init__(self, mtime_ns:int, entries:list[ListingEntry]) -> None:
+    self.mtime_ns = mtime_ns
+    self.entries = entries
+    self._sorted:dict[ListingSort,list[ListingEntry]] = {}
+
+
+  @classmethod
+  def scan(cls, path:str) -> 'DirListing':
+    'Scan the directory at `path`, omitting hidden entries. Raises OSError if the directory cannot be read.'
+    mtime_ns = os_stat(path).st_mtime_ns # Stat before scanning, so that a concurrent change makes the result stale.
+    entries = []
+    for e in scan_dir(path):
+      is_dir = e.is_dir(follow_symlinks=True)
+      try: stat = e.stat(follow_symlinks=True)
+      except OSError: size, mtime = 0, 0.0 # Broken symlink or concurrently removed.
+      else: size, mtime = (0 if is_dir else stat.st_size), stat.st_mtime
+      entries.append(ListingEntry(name=e.name, is_dir=is_dir, size=size, mtime=mtime))
+    return cls(mtime_ns=mtime_ns, entries=entries)
+
+
+  @property
+  def cache_size(self) -> int:
+    'The approximate memory footprint of the listing, for sizing the listing cache.'
+    return 256 + sum(160 + len(e.name) for e in self.entries) * (1 + len(self._sorted))
+
+
+  def is_fresh(self, path:str) -> bool:
+    'Return True if the directory at `path` has not changed since it was scanned.'
+    try: return os_stat(path).st_mtime_ns == self.mtime_ns
+    except OSError: return False
+
+
+  def sorted_entries(self, sort:ListingSort) -> list[ListingEntry]:
+    try: return self._sorted[sort]
+    except KeyError: pass
+    # Concurrent requests may both sort; the results are identical.
+    entries = self._sorted[sort] = sorted(self.entries, key=listing_sort_keys[sort])
+    return entries
+
+
+  def page(self, query:'ListingQuery') -> tuple[list[ListingEntry],int]:
+    '''
+    Return the entries for the page selected by `query`, and the page count.
+    Raises a 404 ResponseError if the page is out of range.
+    '''
+    entries = self.sorted_entries(query.sort)
+    total = len(entries)
+    per_page = query.per_page or max(total, 1)
+    page_count = max(1, -(-total // per_page))
+    if query.page > page_count: raise ResponseNotFound
+    if query.order == 'asc':
+      start = (query.page - 1) * per_page
+      return entries[start:start + per_page], page_count
+    else:
+      end = total - (query.page - 1) * per_page
+      return entries[max(0, end - per_page):end][::-1], page_count
+
+
+@dataclass(frozen=True)
+class ListingQuery:
+  '''
+  The listing parameters of a request: the sort key and order, the 1-based page, and the page size (0 for all entries).
+  '''
+  sort:ListingSort = 'name'
+  order:ListingOrder = 'asc'
+  page:int = 1
+  per_page:int = 0
+  format:ListingFormat = 'html'
+
+
+  @classmethod
+  def parse(cls, params:dict[str,str], default_per_page:int) -> 'ListingQuery':
+    'Parse the query parameters of a listing request. Raises a 400 ResponseError for invalid values.'
+    sort = params.get('sort', 'name')
+    if sort not in listing_sorts: raise BadRequest(f'Invalid listing sort: {sort!r}.')
+    order = params.get('order', 'asc')
+    if order not in listing_orders: raise BadRequest(f'Invalid listing order: {order!r}.')
+    fmt = params.get('format', 'html')
+    if fmt not in listing_formats: raise BadRequest(f'Invalid listing format: {fmt!r}.')
+    page = parse_nonnegative_int(params, 'page', 1)
+    if page < 1: raise BadRequest('Invalid listing page: 0.')
+    per_page = parse_nonnegative_int(params, 'per_page', default_per_page)
+    return cls(sort=sort, order=order, page=page, per_page=per_page, format=fmt)
+
+
+  def query_string(self, default_per_page:int, **changes:Any) -> str:
+    'Format the query string for a link to this listing with `changes` applied, omitting default values.'
+    q = replace(self, **changes)
+    params = [(name, val) for name, val, default in [
+      ('sort', q.sort, 'name'),
+      ('order', q.order, 'asc'),
+      ('page', q.page, 1),
+      ('per_page', q.per_page, default_per_page),
+      ('format', q.format, 'html'),
+    ] if val != default]
+    return '?' + urlencode(params) if params else '.'
+
+
+def parse_nonnegative_int(params:dict[str,str], name:str, default:int) -> int:
+  try: val = params[name]
+  except KeyError: return default
+  if not (val.isascii() and val.isdigit()): raise BadRequest(f'Invalid listing {name}: {val!r}.')
+  return int(val)
+
+
+def render_listing_html(display_path:str, entries:list[ListingEntry], page_count:int, query:ListingQuery,
+ default_per_page:int) -> Iterator[str]:
+  'Render a page of a directory listing as an HTML document, incrementally.'
+  title = html_escape(display_path, quote=False)
+  yield '<!DOCTYPE html>\n<html>\n'
+  yield f'<head>\n<meta charset="utf-8" />\n<title>{title}</title>\n</head>\n'
+  yield f'<body>\n<h1>{title}</h1>\n<hr>\n<table>\n<thead><tr>'
+  for sort, label in (('name', 'Name'), ('size', 'Size'), ('mtime', 'Modified')):
+    if sort == query.sort: # Link to the reverse order.
+      order = 'desc' if query.order == 'asc' else 'asc'
+      arrow = ' &#x25B2;' if query.order == 'asc' else ' &#x25BC;'
+    else:
+      order = 'asc'
+      arrow = ''
+    href = html_escape(query.query_string(default_per_page, sort=sort, order=order, page=1))
+    yield f'<th><a href="{href}">{label}</a>{arrow}</th>'
+  yield '</tr></thead>\n<tbody>\n'
+  for e in entries:
+    n = e.name + ('/' if e.is_dir else '')
+    link_href = url_quote(n, errors='replace')
+    link_text = html_escape(n, quote=False)
+    size = '-' if e.is_dir else format_byte_count(e.size, prec=1)
+    mtime = strftime('%Y-%m-%d %H:%M', gmtime(e.mtime))
+    yield f'<tr><td><a href="{link_href}">{link_text}</a></td><td>{size}</td><td>{mtime}</td></tr>\n'
+  yield '</tbody>\n</table>\n'
+  if page_count > 1:
+    yield '<nav>'
+    if query.page > 1:
+      href = html_escape(query.query_string(default_per_page, page=query.page-1))
+      yield f'<a href="{href}" rel="prev">Previous</a> '
+    yield f'Page {query.page} of {page_count}'
+    if query.page < page_count:
+      href = html_escape(query.query_string(default_per_page, page=query.page+1))
+      yield f' <a href="{href}" rel="next">Next</a>'
+    yield '</nav>\n'
+  yield '<hr>\n</body>\n</html>\n'
+
+
+def render_listing_json(display_path:str, entries:list[ListingEntry], page_count:int, total:int,
+ query:ListingQuery) -> Iterator[str]:
+  'Render a page of a directory listing as a JSON object, incrementally.'
+  head = dict(path=display_path, sort=query.sort, order=query.order, page=query.page, per_page=query.per_page,
+    page_count=page_count, total=total)
+  yield json_dumps(head)[:-1] + ', "entries": [\n'
+  sep = ''
+  for e in entries:
+    yield sep + json_dumps(dict(name=e.name, is_dir=e.is_dir, size=e.size, mtime=e.mtime))
+    sep = ',\n'
+  yield '\n]}\n'
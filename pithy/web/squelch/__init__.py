@@ -1,6 +1,8 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
+import re
 from collections import Counter
+from dataclasses import dataclass
 from typing import Any, Callable, Iterable
 from warnings import warn
 
@@ -10,13 +12,17 @@ from starlette.datastructures import QueryParams
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
 
-from ...html import (A, Details, Div, Form, H1, HtmlNode, Input, Label, MuChild, Pre, Present, Script, Select, Summary,
-  Table as HtmlTable, Tbody, Td, Th, Thead, Tr)
+from ...html import (A, Details, Div, Form, H1, HtmlNode, Input, Label, MuChild, Pre, Present, Script, Select,
+  Summary, Table as HtmlTable, Tbody, Td, Th, Thead, Tr)
 from ...html.parse import linkify
-from ...html.parts import pagination_control
+from ...html.parts import keyset_pagination_control, pagination_control
+from ...json import parse_json, render_json
+from ...markup import frozen_fragment
 from ...sqlite import Conn, Row, SqliteError
+from ...sqlite.cache import DataVersionCache
 from ...sqlite.parse import sql_parse_schema_table
 from ...sqlite.schema import Column, Schema, Table
+from ...sqlite.stats import stat1_row_count
 from ...sqlite.util import sql_quote_entity as qe, sql_quote_val as qv
 from .vis import Vis
 
@@ -59,15 +65,27 @@ class TableAbbrs:
 
 
 class Squelch:
-  'An object that provides a web interface for running SQL queries.'
+  '''
+  An object that provides a web interface for running SQL queries.
+
+  When the result ordering is by the table's primary key (or rowid) and no offset is requested,
+  results are paged by key ("keyset pagination") rather than with OFFSET, so deep pages are as cheap as the first.
+  Result counts are cached per connection until the database changes (see `DataVersionCache`).
+  If `approx_count_min` is nonzero, unfiltered counts of tables that `sqlite_stat1` estimates to have at least that many rows
+  are reported approximately from the statistics instead of being counted.
+  '''
 
   def __init__(self,
     schemas:Iterable[Schema],
     vis: dict[str,dict[str,dict[str,Vis|bool]]], # Maps schema -> table -> column -> Vis|bool.
     order_by: dict[str,dict[str,str]]|None=None,
+    approx_count_min:int=0,
+    count_cache_size:int=256,
   ) -> None:
 
     self.schemas = { s.name : s for s in schemas }
+    self.approx_count_min = approx_count_min
+    self.count_cache = DataVersionCache[str,int](max_size=count_cache_size)
 
     def _vis_for(schema:str, table:str, col:str) -> Vis:
       try: v = vis[schema][table][col]
@@ -235,7 +253,17 @@ class Squelch:
     where_clause = f'\nWHERE {where}' if where else ''
     order_by_clause = f'\nORDER BY {order_by}' if order_by else ''
 
-    query = f'SELECT{distinct_clause}{columns_part}{from_clause}{where_clause}{order_by_clause}\nLIMIT {limit} OFFSET {offset}'
+    keyset = None
+    if not (distinct or offset):
+      keyset = Keyset.for_table(table, t_abbr=abbrs.simple_abbr(schema.name, table.name), order_by=order_by)
+
+    if keyset:
+      try: page = KeysetPage.from_params(params, key_len=len(keyset.exprs))
+      except ValueError as e: raise HTTPException(400, f'invalid pagination parameter: {e}')
+      query = keyset.query(columns_part=columns_part, from_clause=from_clause, where=where, page=page, limit=limit)
+    else:
+      page = None
+      query = f'SELECT{distinct_clause}{columns_part}{from_clause}{where_clause}{order_by_clause}\nLIMIT {limit} OFFSET {offset}'
 
     c = conn.cursor()
     error = ''
@@ -245,25 +273,37 @@ class Squelch:
       error = f'Explain query failed: {e}'
       plan = ''
 
-    rows = []
+    result_rows:list[Row] = []
     if not error:
       try: c = c.run(query)
       except Exception as e:
         error = f'Query failed: {e}'
       else:
-        rows = [Tr(_=[rcf(row) for rcf in render_cell_fns]) for row in c]
+        result_rows = list(c)
+
+    has_prev = has_next = False
+    if keyset and page:
+      has_more = len(result_rows) > limit
+      del result_rows[limit:]
+      if page.is_reversed: result_rows.reverse()
+      has_prev, has_next = page.has_prev_next(has_more)
+
+    rows = [Tr.raw(children=[rcf(row) for rcf in render_cell_fns]) for row in result_rows]
 
     count:int|None = None
+    count_is_approx = False
     if not error:
-      if 0 < len(rows) < limit: count = offset + len(rows)
-      else:
-        try:
-          if distinct:
-            if len(en_cols) == 1: count_query = f'SELECT COUNT(DISTINCT{columns_part}){from_clause}{where_clause}'
-            else: count_query = f'SELECT COUNT() FROM (SELECT DISTINCT {columns_part}{from_clause}{where_clause})'
-          else:
-            count_query = f'SELECT COUNT(){from_clause}{where_clause}'
-          count = c.run(count_query).one_col()
+      if keyset:
+        if not (has_prev or has_next): count = len(rows)
+      elif 0 < len(rows) < limit: count = offset + len(rows)
+      if count is None:
+        if distinct:
+          if len(en_cols) == 1: count_query = f'SELECT COUNT(DISTINCT{columns_part}){from_clause}{where_clause}'
+          else: count_query = f'SELECT COUNT() FROM (SELECT DISTINCT {columns_part}{from_clause}{where_clause})'
+        else:
+          count_query = f'SELECT COUNT(){from_clause}{where_clause}'
+        try: count, count_is_approx = self.count(conn=conn, schema=schema, table=table, query=count_query,
+          is_filtered=bool(where or distinct))
         except SqliteError as e:
           error = f'Count query failed: {e}'
 
@@ -278,8 +318,15 @@ class Squelch:
     if error:
       parts.append(Details(Summary('Error'), Pre(cl='detail', _=error), open=''))
     else:
-      pagination = Div(id='pagination', cl='kv-grid-max',
-        _=pagination_control(count=count, limit=limit, offset=offset, params=params))
+      if keyset:
+        pagination = Div(id='pagination', cl='kv-grid-max',
+          _=keyset_pagination_control(count=count, count_is_approx=count_is_approx, shown=len(rows),
+            first_key=(keyset.encode_key(result_rows[0]) if result_rows else None),
+            last_key=(keyset.encode_key(result_rows[-1]) if result_rows else None),
+            has_prev=has_prev, has_next=has_next, params=params))
+      else:
+        pagination = Div(id='pagination', cl='kv-grid-max',
+          _=pagination_control(count=count, limit=limit, offset=offset, params=params))
       parts.extend([
         pagination,
         Div(id='results', _=HtmlTable(
@@ -291,6 +338,118 @@ class Squelch:
     return parts
 
 
+  def count(self, *, conn:Conn, schema:Schema, table:Table, query:str, is_filtered:bool) -> tuple[int,bool]:
+    '''
+    Return the result of the count query, and whether it is approximate.
+    Unfiltered counts of large tables are estimated from `sqlite_stat1` if `approx_count_min` is set.
+    Exact counts are cached until the database changes.
+    '''
+    if self.approx_count_min and not is_filtered:
+      est = stat1_row_count(conn, schema=schema.name, table=table.name)
+      if est is not None and est >= self.approx_count_min: return est, True
+
+    def count_query() -> int:
+      count = conn.cursor().run(query).one_col()
+      assert isinstance(count, int), count
+      return count
+
+    return self.count_cache.get(conn, query, count_query, schema=schema.name), False
+
+
+
+@dataclass(frozen=True)
+class Keyset:
+  '''
+  Keyset (seek) pagination over the primary key (or rowid) of a table.
+  Each page is selected with a row value comparison against the key of the first or last row of the adjacent page,
+  so that SQLite can seek directly to it using the key index instead of stepping over all preceding rows.
+  `exprs` are the qualified key expressions, and `desc` is the direction of the result ordering.
+  '''
+  exprs:tuple[str,...]
+  desc:bool
+
+
+  @classmethod
+  def for_table(cls, table:Table, *, t_abbr:str, order_by:str) -> 'Keyset|None':
+    '''
+    Return a Keyset for the table if `order_by` is empty or orders by exactly the table's key; otherwise None.
+    '''
+    if table.primary_key: key_cols = table.primary_key
+    elif primary_col := table.primary_column: key_cols = (primary_col.name,)
+    elif not table.without_rowid: key_cols = ('rowid',)
+    else: return None
+
+    if any(table.columns_dict[k].datatype is bytes for k in key_cols if k in table.columns_dict):
+      return None # Keys are encoded as JSON in the query string, which does not round trip bytes.
+
+    exprs = tuple(f'{t_abbr}.{qe(k)}' for k in key_cols)
+    norm_order_by = _normalize_order_by(order_by)
+    if not norm_order_by: return cls(exprs=exprs, desc=False)
+
+    for names in (exprs, tuple(qe(k) for k in key_cols), key_cols):
+      for desc, suffixes in ((False, ('', ' asc')), (True, (' desc',))):
+        for suffix in suffixes:
+          if norm_order_by == _normalize_order_by(', '.join(n + suffix for n in names)):
+            return cls(exprs=exprs, desc=desc)
+    return None
+
+
+  def query(self, *, columns_part:str, from_clause:str, where:str, page:'KeysetPage', limit:int) -> str:
+    '''
+    Generate the query for a page. One extra row is requested to determine whether there are more results.
+    '''
+    key_part = ''.join(f', {e} AS {qe(f"__key{i}")}' for i, e in enumerate(self.exprs))
+    conditions = [f'({where})'] if where else []
+    forward = not page.is_reversed
+    if page.key is not None:
+      op = '<' if (self.desc == forward) else '>'
+      conditions.append(f'({", ".join(self.exprs)}) {op} ({", ".join(qv(v) for v in page.key)})')
+    where_clause = ('\nWHERE ' + ' AND '.join(conditions)) if conditions else ''
+    dir_ = ' DESC' if (self.desc == forward) else ''
+    order_by_clause = '\nORDER BY ' + ', '.join(e + dir_ for e in self.exprs)
+    return f'SELECT{columns_part}{key_part}{from_clause}{where_clause}{order_by_clause}\nLIMIT {limit + 1}'
+
+
+  def encode_key(self, row:Row) -> str:
+    return render_json([row[f'__key{i}'] for i in range(len(self.exprs))], indent=None)
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+  '''
+  The requested page, parsed from the `after`, `before` and `last` query parameters.
+  Pages are fetched in reverse order for `before` and `last`.
+  '''
+  key:tuple[Any,...]|None = None
+  is_before:bool = False
+  is_last:bool = False
+
+  @classmethod
+  def from_params(cls, params:QueryParams, *, key_len:int) -> 'KeysetPage':
+    if params.get('last'): return cls(is_last=True)
+    for name in ('after', 'before'):
+      if text := params.get(name):
+        try: key = parse_json(text)
+        except ValueError as e: raise ValueError(f'{name}: {e}') from e
+        if not isinstance(key, list) or len(key) != key_len or any(isinstance(v, (list, dict)) for v in key):
+          raise ValueError(f'{name}: expected a list of {key_len} scalar values; received {text!r}')
+        return cls(key=tuple(key), is_before=(name == 'before'))
+    return cls()
+
+  @property
+  def is_reversed(self) -> bool: return self.is_before or self.is_last
+
+  def has_prev_next(self, has_more:bool) -> tuple[bool,bool]:
+    'Given whether the query found more rows than the page limit, return whether there are previous and next pages.'
+    if self.is_last: return has_more, False
+    if self.is_before: return has_more, True
+    return self.key is not None, has_more
+
+
+def _normalize_order_by(order_by:str) -> str:
+  return re.sub(r'\s*,\s*', ', ', re.sub(r'\s+', ' ', order_by.strip())).lower()
+
+
 
 def fmt_select_cols(schema:str, table:str, abbrs:TableAbbrs, path:str, cols:list[Column], table_vis:dict[str,Vis]
  ) -> tuple[str,str,list[Th],list[CellRenderFn]]:
@@ -361,8 +520,8 @@ def mk_cell_plain(col:Column) -> CellRenderFn:
   '''
   def cell_plain(row:Row) -> Td:
     val = row[col.name]
-    if val is None: return Td(cl='null', _='NULL')
-    return Td(_=linkify(str(val)))
+    if val is None: return Td.raw({'class': 'null'}, ['NULL'])
+    return Td.raw(children=list(linkify(str(val))))
 
   return cell_plain
 
@@ -375,7 +534,7 @@ def mk_cell_rendered(col:Column, render_fn:ValRenderFn, renders_row:bool) -> Cel
   def cell_rendered(row:Row) -> Td:
     val = row[col.name]
     cl, display_val = try_vis_render(render_fn, val, row if renders_row else val)
-    return Td(cl=cl, _=display_val)
+    return Td.raw({'class': cl}, [display_val])
 
   return cell_rendered
 
@@ -396,7 +555,7 @@ def mk_cell_joined(col:Column, vis:Vis, join_key:str, join_col_name:str, join_ta
     joined_key_val = row[join_key]
     if joined_key_val is None: # The join did not match.
       if val is None:
-        return Td(cl='null unjoined', _='NULL')
+        return Td.raw({'class': 'null unjoined'}, ['NULL'])
       else:
         return Td(cl='unjoined', _=val)
     joined_val = row[join_col_name]
@@ -412,7 +571,8 @@ def mk_cell_joined(col:Column, vis:Vis, join_key:str, join_col_name:str, join_ta
       cl = ''
       display_val = str(joined_val)
     where = f'{q_join_col}={qv(val)}'
-    return Td(cl=('joined', cl), _=A(href=fmt_url(app_path, table=vis.schema_table, where=where), title=val, _=display_val))
+    return Td.raw({'class': f'joined {cl}' if cl else 'joined'},
+      [A(href=fmt_url(app_path, table=vis.schema_table, where=where), title=val, _=display_val)])
 
   return cell_joined
 
@@ -433,6 +593,7 @@ def capital_letters_abbr(s:str) -> str:
   return ''.join(c for c in s if c.isupper())
 
 
+@frozen_fragment()
 def squelch_ui_script() -> Script:
   return Script('''
   function updateAllColCheckboxes(checked) {
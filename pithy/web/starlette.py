@@ -1,23 +1,24 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
 from time import sleep
-from typing import Any, Iterable, Mapping, overload, Sequence
+from typing import Any, Iterable, Iterator, Mapping, overload, Sequence
 
 from starlette.background import BackgroundTask
 from starlette.convertors import Convertor, register_url_convertor
 from starlette.datastructures import FormData, QueryParams
 from starlette.exceptions import HTTPException
 from starlette.requests import HTTPConnection, Request
-from starlette.responses import HTMLResponse, Response
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 from starlette.routing import Mount
 from starlette.staticfiles import StaticFiles
 
-from ..csv import Quoting, render_csv
+from ..csv import iter_csv_chunks, Quoting, render_csv
 from ..date import Date, parse_time_12hmp, Time, TZInfo
 from ..fs import is_dir, real_path
 from ..html import HtmlNode
-from ..markup import MuChildLax
+from ..markup import Mu, MuChildLax
 from ..transtruct import bool_str_vals
+from . import iter_byte_chunks
 
 
 class ClientError(Exception):
@@ -102,16 +103,9 @@ class HtmxResponse(HTMLResponse):
     `FAKE_LATENCY` is a float in seconds used to simulate a slow response.
     '''
 
-    if any((cache, hx_push, hx_redirect, hx_location, hx_refresh, hx_trigger, hx_trigger_after_swap, hx_trigger_after_settle)):
-      headers = {**headers} if headers else {}
-      if not cache: headers['Cache-Control'] = 'no-store'
-      if hx_refresh: headers['HX-Refresh'] = 'true'
-      if hx_push: headers['HX-Push'] = hx_push
-      if hx_redirect: headers['HX-Redirect'] = hx_redirect
-      if hx_location: headers['HX-Location'] = hx_location
-      if hx_trigger: headers['HX-Trigger'] = hx_trigger
-      if hx_trigger_after_swap: headers['HX-Trigger-After-Swap'] = hx_trigger_after_swap
-      if hx_trigger_after_settle: headers['HX-Trigger-After-Settle'] = hx_trigger_after_settle
+    headers = htmx_headers(headers, cache=cache, hx_push=hx_push, hx_refresh=hx_refresh, hx_redirect=hx_redirect,
+      hx_location=hx_location, hx_trigger=hx_trigger, hx_trigger_after_swap=hx_trigger_after_swap,
+      hx_trigger_after_settle=hx_trigger_after_settle)
 
     if FAKE_LATENCY: sleep(FAKE_LATENCY)
 
@@ -123,6 +117,111 @@ class HtmxResponse(HTMLResponse):
       **kwargs)
 
 
+class StreamingCsvResponse(StreamingResponse):
+  media_type = 'text/csv'
+
+  def __init__(self,
+    status_code:int=200,
+    *,
+    headers:Mapping[str,str]|None=None,
+    background:BackgroundTask|None=None,
+    quoting:Quoting|None=None,
+    head:Sequence[str]|None,
+    rows:Iterable[Sequence],
+    chunk_size:int=1<<16) -> None:
+
+    '''
+    A CSV response that is streamed as `rows` is consumed, in chunks of approximately `chunk_size` bytes.
+    `rows` can be a lazy iterator, e.g. over a database cursor; it is consumed on the Starlette thread pool.
+    '''
+
+    super().__init__(
+      content=iter_byte_chunks(iter_csv_chunks(quoting=quoting, header=head, rows=rows, chunk_size=chunk_size), chunk_size),
+      status_code=status_code,
+      headers=headers,
+      background=background)
+
+
+class StreamingHtmlResponse(StreamingResponse):
+  media_type = 'text/html'
+
+  def __init__(self,
+    content:HtmlNode,
+    *,
+    status_code:int=200,
+    headers:Mapping[str,str]|None=None,
+    background:BackgroundTask|None=None,
+    chunk_size:int=1<<16) -> None:
+
+    '''
+    An HTML response that is rendered incrementally, in chunks of approximately `chunk_size` bytes.
+    The first bytes are sent before the rest of the tree is rendered, and the full page is never held in memory.
+    '''
+
+    super().__init__(
+      content=iter_byte_chunks(content.render_chunks(chunk_size=chunk_size), chunk_size),
+      status_code=status_code,
+      headers=headers,
+      background=background)
+
+
+class StreamingHtmxResponse(StreamingResponse):
+  media_type = 'text/html'
+
+  def __init__(self,
+    *content:MuChildLax,
+    status_code:int=200,
+    headers:Mapping[str,str]|None=None,
+    background:BackgroundTask|None=None,
+    cache:bool=False,
+    hx_push:str='',
+    hx_refresh:bool=False,
+    hx_redirect:str='',
+    hx_location:str='',
+    hx_trigger:str='',
+    hx_trigger_after_swap:str='',
+    hx_trigger_after_settle:str='',
+    chunk_size:int=1<<16) -> None:
+
+    '''
+    A streamed version of `HtmxResponse`, for large fragments; the output and headers are the same.
+    The fragments are rendered incrementally, in chunks of approximately `chunk_size` bytes.
+    '''
+
+    headers = htmx_headers(headers, cache=cache, hx_push=hx_push, hx_refresh=hx_refresh, hx_redirect=hx_redirect,
+      hx_location=hx_location, hx_trigger=hx_trigger, hx_trigger_after_swap=hx_trigger_after_swap,
+      hx_trigger_after_settle=hx_trigger_after_settle)
+
+    super().__init__(
+      content=iter_byte_chunks(iter_htmx_fragments(content, chunk_size=chunk_size), chunk_size),
+      status_code=status_code,
+      headers=headers,
+      background=background)
+
+
+def htmx_headers(headers:Mapping[str,str]|None, *, cache:bool, hx_push:str, hx_refresh:bool, hx_redirect:str,
+ hx_location:str, hx_trigger:str, hx_trigger_after_swap:str, hx_trigger_after_settle:str) -> Mapping[str,str]|None:
+  'Return `headers` with the HTMX response headers added, copying the mapping if necessary.'
+  if any((cache, hx_push, hx_redirect, hx_location, hx_refresh, hx_trigger, hx_trigger_after_swap, hx_trigger_after_settle)):
+    headers = {**headers} if headers else {}
+    if not cache: headers['Cache-Control'] = 'no-store'
+    if hx_refresh: headers['HX-Refresh'] = 'true'
+    if hx_push: headers['HX-Push'] = hx_push
+    if hx_redirect: headers['HX-Redirect'] = hx_redirect
+    if hx_location: headers['HX-Location'] = hx_location
+    if hx_trigger: headers['HX-Trigger'] = hx_trigger
+    if hx_trigger_after_swap: headers['HX-Trigger-After-Swap'] = hx_trigger_after_swap
+    if hx_trigger_after_settle: headers['HX-Trigger-After-Settle'] = hx_trigger_after_settle
+  return headers
+
+
+def iter_htmx_fragments(content:Iterable[MuChildLax], chunk_size:int) -> Iterator[str]:
+  'Render HTMX fragments incrementally, with the same output as `HtmxResponse`.'
+  for i, child in enumerate(content):
+    if i: yield '\n\n'
+    if isinstance(child, Mu): yield from child.render_chunks(chunk_size=chunk_size)
+    else: yield HtmlNode.render_child(child)
+
 
 class DateConverter(Convertor):
   '''
@@ -0,0 +1,56 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Helpers for testing `WebApp` without a server: temporary content directories, synthetic requests, and response bodies.
+'''
+
+from io import BufferedReader, BytesIO
+from os import makedirs
+from os.path import dirname, join as path_join
+from sys import stderr
+from tempfile import TemporaryDirectory
+
+from . import Request, Response
+from .app import WebApp
+
+
+_tmp_dirs:list[TemporaryDirectory] = []
+
+
+def make_local_dir(files:dict[str,str|bytes]) -> str:
+  '''
+  Create a temporary directory containing `files` (relative path -> contents), and return its path.
+  The directory is removed when the test process exits.
+  '''
+  tmp_dir = TemporaryDirectory(prefix='pithy-web-test-')
+  _tmp_dirs.append(tmp_dir) # Keep the directory alive until exit.
+  for rel_path, contents in files.items():
+    path = path_join(tmp_dir.name, rel_path)
+    makedirs(dirname(path), exist_ok=True)
+    with open(path, 'wb') as f: f.write(contents.encode() if isinstance(contents, str) else contents)
+  return tmp_dir.name
+
+
+def make_request(path:str, query:str='', method:str='GET', **headers:str) -> Request:
+  'Create a request with an empty body. Header names that are not identifiers can be passed with `**{...}`.'
+  return Request(method=method, scheme='http', host='localhost', port=80, path=path, query=query, body_file=BytesIO(),
+    err=stderr, is_multiprocess=False, is_multithread=False, headers=headers)
+
+
+def read_body(response:Response) -> bytes:
+  'Read and close the body of a response, respecting the file range of file bodies.'
+  body = response.body
+  if body is None: return b''
+  if isinstance(body, (bytes, bytearray)): return bytes(body)
+  if isinstance(body, BufferedReader):
+    start, end = response.file_range or (0, -1)
+    with body as f:
+      f.seek(start)
+      return f.read(end - start)
+  return b''.join(body)
+
+
+def serve(app:WebApp, path:str, query:str='', **headers:str) -> tuple[Response,bytes]:
+  'Serve `path` from the app\'s local directory; return the response and its body.'
+  response = app.serve_content_from_local_fs(make_request(path, query=query, **headers))
+  return response, read_body(response)
@@ -34,3 +34,6 @@ class Xml(Mu):
    _parent:'Mu|None'=None,
    **kw_attrs:Any) -> None:
     super().__init__(tag=tag, attrs=attrs, _=_, cl=cl, _orig=_orig, _parent=_parent, **kw_attrs)
+
+
+Xml.generic_tag_type = Xml # Parsed nodes need a type with a `tag` slot. Note: this creates a circular reference.
@@ -3,21 +3,40 @@
 from argparse import ArgumentParser
 from html.parser import HTMLParser
 from sys import stdin
+from typing import TextIO
 
 
 def main() -> None:
   arg_parser = ArgumentParser('Extract a portion of an HTML document.')
-  arg_parser.add_argument('-id',help='The `id` of the DOM element to extract.')
+  target = arg_parser.add_mutually_exclusive_group(required=True)
+  target.add_argument('-id',help='The `id` of the DOM element to extract; the element source text is printed verbatim.')
+  target.add_argument('-select', help='A CSS selector; every matching element is parsed and rendered.')
   arg_parser.add_argument('path', nargs='?', help='path to the HTML document (defaults to stdin).')
   args = arg_parser.parse_args()
   path = args.path
 
   try: file = open(path) if path is not None else stdin
   except FileNotFoundError as e: exit(f'file not found: {e.filename}')
+
+  if args.select is not None:
+    select_and_render(file, args.select)
+    return
+
   parser = HtmlExtractParser(path=file.name, id=args.id, lines=list(file))
   parser.extract()
 
 
+def select_and_render(file:TextIO, selector:str) -> None:
+  from pithy.css_selector import SelectorSyntaxError
+  from pithy.html import HtmlNode
+
+  html = HtmlNode.parse(file.read())
+  try: matches = list(html.select(selector))
+  except SelectorSyntaxError as e: exit(f'error: {e}')
+  if not matches: exit('no elements matched the selector.')
+  for node in matches: print(node.render_str(), end='')
+
+
 Pos = tuple[int, int]
 
 
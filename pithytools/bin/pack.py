@@ -4,6 +4,7 @@ from argparse import ArgumentParser
 from time import time as now
 from typing import Callable
 
+from pithy.compress import default_levels
 from pithy.fs import file_size, path_exists, remove_path
 from pithy.io import confirm, outL, outZ, stderr, stdin
 from pithy.string import format_byte_count
@@ -64,19 +65,19 @@ def pack(path:str, ext:str, overwrite:bool, level:str|None, show_stats:bool) ->
 
 
 def br(path:str, level:str|None=None) -> None:
-  if not level: level = '5'
+  if not level: level = str(default_levels['.br'])
   run(['brotli', '--keep', f'-{level}', path])
 
 def gz(path:str, level:str|None=None) -> None:
-  if not level: level = '5'
+  if not level: level = str(default_levels['.gz'])
   run(['gzip', '--keep', f'-{level}', path])
 
 def xz(path:str, level:str|None=None) -> None:
-  if not level: level = '4'
+  if not level: level = str(default_levels['.xz'])
   run(['xz', '--keep', f'-{level}', '--threads=0', path])
 
 def zst(path:str, level:str|None=None) -> None:
-  if not level: level = '6'
+  if not level: level = str(default_levels['.zst'])
   run(['zstd', '--keep', f'-{level}', '--threads=0', '-q', path], err=stderr)
 
 
@@ -0,0 +1,104 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+'''
+Write precompressed siblings (e.g. `app.js.br`, `app.js.zst`, `app.js.gz`) for the compressible files in directory trees.
+`WebApp.serve_content_from_local_fs` serves these siblings to clients that accept the corresponding content coding.
+'''
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from os import replace as os_replace, stat as os_stat, utime
+from typing import NamedTuple
+
+from pithy.compress import compress_fn_available, compress_fns
+from pithy.fs import remove_file_if_exists, walk_files
+from pithy.http import content_coding_exts
+from pithy.io import errL, outL
+from pithy.string import format_byte_count
+from pithy.web.app import is_compressible_media_type, WebApp
+
+
+class Result(NamedTuple):
+  path:str
+  ext:str
+  orig_size:int
+  size:int # Zero if the output was skipped.
+
+
+def main() -> None:
+  parser = ArgumentParser(description='Precompress static assets for HTTP content negotiation.')
+  parser.add_argument('-br',  action='store_true', help='compress using brotli.')
+  parser.add_argument('-gz',  action='store_true', help='compress using gzip.')
+  parser.add_argument('-zst', action='store_true', help='compress using zstd.')
+  parser.add_argument('-level', type=int, help='compression level (format specific).')
+  parser.add_argument('-min-size', type=int, default=1024, help='skip files smaller than this many bytes.')
+  parser.add_argument('-max-ratio', type=float, default=0.9,
+    help='discard outputs that are larger than this fraction of the original size.')
+  parser.add_argument('-force', action='store_true', help='recompress even if an existing sibling is up to date.')
+  parser.add_argument('-quiet', action='store_true', help='do not print compression statistics.')
+  parser.add_argument('dirs', nargs='+', help='Directories to precompress.')
+  args = parser.parse_args()
+
+  exts = [ext for ext in content_coding_exts.values() if getattr(args, ext[1:])]
+  if not exts:
+    exts = [ext for ext in content_coding_exts.values() if compress_fn_available(ext)]
+  for ext in exts:
+    if not compress_fn_available(ext): exit(f'error: the {ext} codec is not available in this environment.')
+
+  app = WebApp() # For consistent media type guessing.
+  sibling_exts = tuple(content_coding_exts.values())
+  paths = [p for p in walk_files(*args.dirs)
+    if not p.endswith(sibling_exts) and is_compressible_media_type(app.guess_media_type(p))]
+
+  def work(path:str) -> list[Result]:
+    return precompress(path, exts=exts, level=args.level, min_size=args.min_size, max_ratio=args.max_ratio, force=args.force)
+
+  totals = { ext : [0, 0] for ext in exts }
+  with ThreadPoolExecutor() as executor: # The codecs release the GIL while compressing.
+    for results in executor.map(work, paths):
+      for r in results:
+        if not r.size: continue
+        totals[r.ext][0] += r.orig_size
+        totals[r.ext][1] += r.size
+        if not args.quiet: outL(f'{r.path}{r.ext}: {format_byte_count(r.orig_size)} -> {format_byte_count(r.size)}')
+
+  if not args.quiet:
+    for ext, (orig_size, size) in totals.items():
+      ratio = (size / orig_size) if orig_size else 0.0
+      errL(f'{ext}: {format_byte_count(orig_size)} -> {format_byte_count(size)} ({ratio:.0%}).')
+
+
+def precompress(path:str, exts:list[str], level:int|None, min_size:int, max_ratio:float, force:bool) -> list[Result]:
+  '''
+  Write the siblings of `path` for each extension in `exts`.
+  Each sibling is given the mtime of the original, so that the server considers it fresh until the original changes.
+  Siblings that are up to date are skipped unless `force` is set;
+  outputs that do not compress well enough are not written, and any stale sibling is removed.
+  '''
+  stat = os_stat(path)
+  if stat.st_size < min_size: return []
+  results = []
+  data:bytes|None = None
+  for ext in exts:
+    dst = path + ext
+    if not force:
+      try: dst_stat = os_stat(dst)
+      except FileNotFoundError: pass
+      else:
+        if dst_stat.st_mtime_ns >= stat.st_mtime_ns: continue
+    if data is None:
+      with open(path, 'rb') as f: data = f.read()
+    compressed = compress_fns[ext](data, level)
+    if len(compressed) > len(data) * max_ratio:
+      remove_file_if_exists(dst)
+      results.append(Result(path, ext, len(data), 0))
+      continue
+    tmp = dst + '.tmp'
+    with open(tmp, 'wb') as f: f.write(compressed)
+    utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os_replace(tmp, dst)
+    results.append(Result(path, ext, len(data), len(compressed)))
+  return results
+
+
+if __name__ == '__main__': main()
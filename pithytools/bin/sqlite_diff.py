@@ -3,6 +3,7 @@
 from argparse import ArgumentParser
 
 from pithy.sqlite import Conn
+from pithy.sqlite.diff import diff_table_rows
 
 
 def main() -> None:
@@ -10,13 +11,15 @@ def main() -> None:
   parser = ArgumentParser(description='Diff two SQLite database files.')
   parser.add_argument('path_a', help='Path to the first database file.')
   parser.add_argument('path_b', help='Path to the second database file.')
+  parser.add_argument('-block-size', type=int, default=4096, help='Number of rowid values per hashed block.')
+  parser.add_argument('-parallel', action='store_true', help='Hash both databases concurrently in separate threads.')
 
   args = parser.parse_args()
-  cn_a = Conn(args.path_a)
-  cn_b = Conn(args.path_b)
+  cn_a = Conn(args.path_a, mode='ro')
+  cn_b = Conn(args.path_b, mode='ro')
 
   a_tables = set(cn_a.cursor().run("SELECT name FROM sqlite_schema WHERE type = 'table'").col())
-  b_tables = set(cn_a.cursor().run("SELECT name FROM sqlite_schema WHERE type = 'table'").col())
+  b_tables = set(cn_b.cursor().run("SELECT name FROM sqlite_schema WHERE type = 'table'").col())
   common_tables = a_tables & b_tables
 
   if a_only_tables := a_tables - b_tables:
@@ -26,10 +29,13 @@ def main() -> None:
     print(f'Tables only in {args.path_b}: {b_only_tables}')
 
   for table in sorted(common_tables):
-    diff_table(cn_a, cn_b, table)
+    diff_table(cn_a, cn_b, table, block_size=args.block_size, parallel=args.parallel)
 
+  cn_a.close()
+  cn_b.close()
 
-def diff_table(cn_a:Conn, cn_b:Conn, table:str) -> None:
+
+def diff_table(cn_a:Conn, cn_b:Conn, table:str, *, block_size:int, parallel:bool) -> None:
   ca = cn_a.cursor()
   cb = cn_b.cursor()
   a_sql = ca.run("SELECT sql FROM sqlite_schema WHERE type = 'table' AND name = :table", table=table).one_col()
@@ -50,15 +56,16 @@ def diff_table(cn_a:Conn, cn_b:Conn, table:str) -> None:
     print()
     return
 
-  a_ids = set(ca.run(f'SELECT rowid FROM {table}').col())
-  b_ids = set(cb.run(f'SELECT rowid FROM {table}').col())
-
-  if a_only_ids := a_ids - b_ids:
-    msg(f'Rows only in {cn_a.path}:')
-    for id in sorted(a_only_ids):
-      print(ca.run(f'SELECT * FROM {table} WHERE rowid = :id', id=id).one().qdi())
-
-  if b_only_ids := b_ids - a_ids:
-    msg(f'Rows only in {cn_b.path}:')
-    for id in sorted(b_only_ids):
-      print(ca.run(f'SELECT * FROM {table} WHERE rowid = :id', id=id).one().qdi())
+  for d in diff_table_rows(cn_a, cn_b, table, block_size=block_size, parallel=parallel):
+    match d.kind:
+      case 'removed':
+        assert d.a is not None
+        msg(f'- {d.key!r}:', d.a.qdi())
+      case 'added':
+        assert d.b is not None
+        msg(f'+ {d.key!r}:', d.b.qdi())
+      case 'changed':
+        assert d.a is not None and d.b is not None
+        msg(f'~ {d.key!r}:')
+        print('  a:', d.a.qdi())
+        print('  b:', d.b.qdi())
@@ -0,0 +1,21 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from argparse import ArgumentParser
+
+from pithy.sqlite import Conn
+from pithy.sqlite.stats import db_stats
+
+
+def main() -> None:
+
+  parser = ArgumentParser(description='Show row counts, sizes, and fragmentation of the tables and indexes in an SQLite database.')
+  parser.add_argument('path', help='Path to the database file.')
+  parser.add_argument('-schema', default='main', help='Schema name.')
+  parser.add_argument('-no-sizes', action='store_true', help='Do not scan pages with `dbstat`; use `sqlite_stat1` estimates only.')
+  parser.add_argument('-exact', action='store_true', help='Count the rows of every table exactly.')
+  parser.add_argument('-workers', type=int, default=4, help='Number of threads used for exact counts.')
+
+  args = parser.parse_args()
+  with Conn(args.path, mode='ro') as conn:
+    stats = db_stats(conn, schema=args.schema, sizes=not args.no_sizes, exact=args.exact, workers=args.workers)
+    for line in stats.fmt_table(): print(line)
@@ -0,0 +1,43 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from pithy.css_selector import parse_selector, SelectorSyntaxError
+from pithy.html import Div, Em, Li, P, Span, Ul
+from pithy.markup import NoMatchError
+from utest import utest, utest_exc, utest_seq
+
+
+doc = Div(
+  Div(P('p0', cl='x'), P('p1', Span('s', lang='en-US')), Ul(*[Li(f'li{i}', cl=('sel' if i == 1 else None)) for i in range(5)]),
+    id='main', cl='a b'),
+  Div(P('p2', id='p2'), Em(), P('p3'), cl='b'))
+
+def texts(selector:str) -> list[str]: return [n.text.strip() for n in doc.select(selector)]
+
+utest(parse_selector('div p'), parse_selector, 'div p') # Cached parse.
+
+utest_seq(['p0', 'p1s'], texts, '#main p')
+utest_seq(['p2', 'p3'], texts, ':not(#main) > p')
+utest_seq(['p3'], texts, 'em + p')
+utest_seq(['li0', 'li2', 'li4'], texts, 'li:nth-child(odd)')
+utest_seq(['li3', 'li4'], texts, 'li:nth-child(3) ~ li:not(.sel)')
+utest_seq(['li0', 'li1'], texts, 'li:nth-child(-n+2)')
+utest_seq(['p1s', 's'], texts, '[lang|=en], #main > p:last-of-type')
+utest_seq(['s'], texts, '[lang="EN-us" i]')
+utest_seq([''], texts, ':empty')
+utest_seq(['p0', 'p1s', 'p2', 'p3'], texts, ':root > div > p')
+
+doc.index()
+utest_seq(['p0', 'p1s'], texts, '#main p')
+utest_seq(['p1s', 's'], texts, '[lang|=en], #main > p:last-of-type')
+
+utest('p2', lambda: doc.select_first('p#p2').text.strip())
+utest_exc(NoMatchError, doc.select_first, 'table')
+utest(('123', 'a b'), lambda: (parse_selector(r'#\31 23').complexes[0].compounds[0].id,
+  parse_selector(r'.a\20 b').complexes[0].compounds[0].classes[0])) # Hex escapes.
+
+num_doc = Div(P('one', id=1), P('two', id=2))
+num_doc.index()
+utest_seq(['two'], lambda: [n.text.strip() for n in num_doc.select(r'#\32')]) # Indexed lookup of a non-str id.
+
+utest_exc(SelectorSyntaxError, parse_selector, 'p >')
+utest_exc(SelectorSyntaxError, parse_selector, 'p::before')
@@ -1,6 +1,9 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
-from pithy.html import Div, Html, MultipleMatchesError, NoMatchError, P
+from typing import Any
+
+from pithy.html import A, Div, Html, MultipleMatchesError, NoMatchError, P, Table, Td, Th
+from pithy.html.parts import keyset_pagination_control
 from utest import utest, utest_exc, utest_seq, utest_val, utest_val_type
 
 
@@ -74,3 +77,21 @@ utest_val(div1, sd1.orig, 'sd1.orig')
 
 utest(div1, sd0.next)
 utest(div0, sd1.prev)
+
+
+_table_rows = [(1, 'a'), (2, None)]
+utest(Table().head(['n', Th('v', cl='v')]).rows([[Td(_=str(v)) for v in row] for row in _table_rows]).render_str(),
+  lambda: Table.from_rows(_table_rows, head=['n', Th('v', cl='v')]).render_str())
+utest('<td>1</td>', lambda: Table.from_rows([[1]], lambda v: Td(_=str(v))).find(Td).render_str().strip())
+
+
+def _keyset_hrefs(**kwargs:Any) -> tuple[list[str|None],str]:
+  control = keyset_pagination_control(count=9, shown=4, first_key='[5]', last_key='[8]', href='/t',
+    params={'q': 'x', 'after': '[1]'}, **kwargs)
+  return [a.get('href') for a in control.find_all(A)], control.find(cl='msg').text
+
+utest(([None, None, '/t?q=x&after=%5B8%5D', '/t?q=x&last=1'], '4 results shown of 9.'),
+  _keyset_hrefs, has_prev=False, has_next=True)
+utest((['/t?q=x&', '/t?q=x&before=%5B5%5D', None, None], '4 results shown of 9.'),
+  _keyset_hrefs, has_prev=True, has_next=False)
+utest(([None, None, None, None], '4 results.'), _keyset_hrefs, has_prev=False, has_next=False)
@@ -0,0 +1,55 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os import listdir, makedirs, utime
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+from typing import Any
+
+from pithy.html import Html, HtmlNode
+from pithy.html.loader import load_html_cached
+from utest import utest, utest_val
+
+
+parse_count = 0
+orig_parse_file = HtmlNode.parse_file.__func__ # type: ignore[attr-defined]
+
+def counting_parse_file(cls:type[HtmlNode], file:Any, **kwargs:Any) -> Html:
+  global parse_count
+  parse_count += 1
+  return orig_parse_file(cls, file, **kwargs) # type: ignore[no-any-return]
+
+HtmlNode.parse_file = classmethod(counting_parse_file) # type: ignore[method-assign, assignment]
+
+
+def load_text(path:str, cache_dir:str) -> str:
+  return str(load_html_cached(path, cache_dir).body.text).strip()
+
+
+with TemporaryDirectory(prefix='pithy-html-test-') as tmp_dir:
+  path = path_join(tmp_dir, 'doc.html')
+  cache_dir = path_join(tmp_dir, 'cache')
+  makedirs(cache_dir)
+  with open(path, 'w') as f: f.write('<html><body><p>one</p></body></html>')
+
+  utest('one', load_text, path, cache_dir) # Cold: parsed and cached.
+  utest_val(1, parse_count, 'cold parse')
+  utest_val(1, len(listdir(cache_dir)), 'cache entry written')
+
+  utest('one', load_text, path, cache_dir) # Warm: loaded from the cache.
+  utest_val(1, parse_count, 'warm hit')
+
+  # A changed source file gets a new entry, and the old entry is removed.
+  old_entries = listdir(cache_dir)
+  with open(path, 'w') as f: f.write('<html><body><p>two two</p></body></html>')
+  utime(path, ns=(1, 1))
+  utest('two two', load_text, path, cache_dir)
+  utest_val(2, parse_count, 'reparsed after change')
+  entries = listdir(cache_dir)
+  utest_val((1, False), (len(entries), entries == old_entries), 'stale entry replaced')
+
+  # A corrupt cache file is reparsed and rewritten.
+  with open(path_join(cache_dir, entries[0]), 'wb') as bf: bf.write(b'not msgpack')
+  utest('two two', load_text, path, cache_dir)
+  utest_val(3, parse_count, 'corrupt entry reparsed')
+  utest('two two', load_text, path, cache_dir)
+  utest_val(3, parse_count, 'rewritten entry hit')
@@ -0,0 +1,81 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from io import BufferedReader, StringIO
+from socket import create_connection, socket as Socket
+from threading import Thread
+
+from pithy.http.server import AsyncHttpServer
+from pithy.web import Request, Response
+from pithy.web.app import WebApp
+from utest import utest, utest_exc, utest_val
+
+
+class EchoBodyApp(WebApp):
+
+  def handle_request(self, request:Request) -> Response:
+    return Response(body=f'{request.method} {request.path} {request.body_bytes.decode()}', media_type='text/plain')
+
+
+def read_response(f:BufferedReader) -> tuple[int,dict[str,str],bytes]:
+  'Read a response with a Content-Length body from the socket file; return (status, headers, body).'
+  status = int(f.readline().split()[1])
+  headers = {}
+  while (line := f.readline()) not in (b'\r\n', b''):
+    name, _, val = line.decode('latin1').partition(':')
+    headers[name.strip().lower()] = val.strip()
+  body = f.read(int(headers.get('content-length', 0)))
+  return status, headers, body
+
+
+def connect() -> tuple[Socket,BufferedReader]:
+  sock = create_connection(('127.0.0.1', server.bound_port), timeout=5)
+  return sock, sock.makefile('rb')
+
+
+server = AsyncHttpServer(host='127.0.0.1', port=0, app=EchoBodyApp(), err=StringIO(), workers=2, idle_timeout=0.5)
+thread = Thread(target=server.serve_forever, daemon=True)
+thread.start()
+server.ready.wait()
+
+# Pipelined requests on one connection are answered in order.
+sock, f = connect()
+sock.sendall(b'GET /a HTTP/1.1\r\nHost: x\r\n\r\nPOST /b HTTP/1.1\r\nHost: x\r\nContent-Length: 5\r\n\r\nhello'
+  b'GET /c HTTP/1.1\r\nHost: x\r\n\r\n')
+utest_val((200, b'GET /a '), read_response(f)[::2], 'pipelined 1')
+utest_val((200, b'POST /b hello'), read_response(f)[::2], 'pipelined 2 with body')
+utest_val((200, b'GET /c '), read_response(f)[::2], 'pipelined 3')
+
+# Expect: 100-continue is answered before the body is sent.
+sock.sendall(b'PUT /d HTTP/1.1\r\nHost: x\r\nContent-Length: 3\r\nExpect: 100-continue\r\n\r\n')
+utest_val(100, read_response(f)[0], '100 continue')
+sock.sendall(b'abc')
+utest_val((200, b'PUT /d abc'), read_response(f)[::2], 'body after 100 continue')
+
+# An idle connection is closed after `idle_timeout`.
+utest_val(b'', f.read(1), 'idle connection closed')
+sock.close()
+
+# An overlong request line gets 414 and the connection is closed.
+sock, f = connect()
+sock.sendall(b'GET /' + b'x' * server.max_line_length + b' HTTP/1.1\r\n\r\n')
+status, headers, _ = read_response(f)
+utest_val((414, 'close'), (status, headers.get('connection')), '414')
+sock.close()
+
+# Chunked request bodies get 501.
+sock, f = connect()
+sock.sendall(b'POST /e HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n0\r\n\r\n')
+utest_val(501, read_response(f)[0], '501 for chunked body')
+utest_val(b'', f.read(1), 'closed after 501')
+sock.close()
+
+# Shutdown closes open connections and stops listening.
+sock, f = connect()
+sock.sendall(b'GET /f HTTP/1.1\r\nHost: x\r\n\r\n')
+utest_val(200, read_response(f)[0], 'before shutdown')
+server.shutdown()
+thread.join(timeout=5)
+utest(False, thread.is_alive)
+utest_val(b'', f.read(1), 'connection closed by shutdown')
+sock.close()
+utest_exc(ConnectionRefusedError, create_connection, ('127.0.0.1', server.bound_port), timeout=5)
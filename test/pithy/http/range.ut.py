@@ -0,0 +1,37 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from pithy.http import if_range_matches, parse_byte_range, UnsatisfiableRange
+from utest import utest, utest_exc
+
+
+utest((0, 10), parse_byte_range, 'bytes=0-9', 100)
+utest((90, 100), parse_byte_range, 'bytes=90-', 100)
+utest((90, 100), parse_byte_range, 'bytes=90-200', 100)
+utest((95, 100), parse_byte_range, 'bytes=-5', 100)
+utest((0, 100), parse_byte_range, 'bytes=-500', 100)
+
+# Ignored headers.
+utest(None, parse_byte_range, 'bytes=0-1,5-6', 100)
+utest(None, parse_byte_range, 'items=0-1', 100)
+utest(None, parse_byte_range, 'bytes=5-1', 100)
+utest(None, parse_byte_range, 'bytes=a-b', 100)
+utest(None, parse_byte_range, 'bytes=5', 100)
+utest(None, parse_byte_range, 'bytes=-', 100)
+utest(None, parse_byte_range, 'bytes=1_0-20', 100)
+utest(None, parse_byte_range, 'bytes=+1-20', 100)
+utest(None, parse_byte_range, 'bytes=1- 20', 100)
+utest(None, parse_byte_range, 'bytes=--5', 100)
+utest(None, parse_byte_range, 'bytes=\u0661-5', 100) # Arabic-Indic digit one.
+
+utest_exc(UnsatisfiableRange, parse_byte_range, 'bytes=100-', 100)
+utest_exc(UnsatisfiableRange, parse_byte_range, 'bytes=-0', 100)
+utest_exc(UnsatisfiableRange, parse_byte_range, 'bytes=0-', 0)
+
+
+lm = 'Sun, 06 Nov 1994 08:49:37 GMT'
+utest(True, if_range_matches, '"abc"', etag='"abc"', last_modified='')
+utest(False, if_range_matches, '"abc"', etag='"abd"', last_modified=lm)
+utest(False, if_range_matches, 'W/"abc"', etag='W/"abc"', last_modified='')
+utest(True, if_range_matches, lm, etag='', last_modified=lm)
+utest(False, if_range_matches, 'Sun, 06 Nov 1994 08:49:38 GMT', etag='', last_modified=lm)
+utest(False, if_range_matches, lm, etag='"abc"', last_modified='')
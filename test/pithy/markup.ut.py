@@ -1,8 +1,13 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
 from copy import replace
+from io import BytesIO
 
-from pithy.markup import Mu, TagMu
+from pithy.html import Div, HtmlNode, P
+from pithy.markup import Mu, MuCleanStats, Present, TagMu
+from pithy.string import EscapedStr
+from pithy.svg import Circle, Svg
+from pithy.xml import Xml
 from utest import utest, utest_exc
 
 
@@ -21,3 +26,85 @@ utest(Mu(cl='r'), replace, Mu(cl='o'), cl='r')
 utest(Mu(_=['x']), replace, Mu(_=['a', 'b']), _=['x'])
 
 utest(Mu(a='a2', b='b'), replace, Mu(a='a1', b='b'), a='a2')
+
+
+_doc = Mu(TagMu('t & <x>', tag='p'), TagMu(tag='br'), 'tail', id='i', cl='c', n=1.0, q="it's")
+utest(''.join(_doc._render()) + '\n', _doc.render_str)
+utest(''.join(_doc.render_children()), _doc.render_children_str)
+
+def _frozen_doc() -> TagMu: return TagMu(TagMu('a & b', tag='p'), TagMu(tag='br'), tag='div', id='f')
+_frozen = _frozen_doc().freeze()
+utest(_frozen_doc().render_str(), _frozen.render_str)
+utest(TagMu(_frozen_doc(), 'x', tag='p').render_str(), TagMu(_frozen, 'x', tag='p').render_str)
+utest(_frozen.content_hash, lambda: _frozen_doc().freeze().content_hash)
+utest_exc(TypeError, _frozen.__setitem__, 'id', 'g')
+utest_exc(TypeError, _frozen.append, 'x') # Frozen children are a tuple.
+
+_tree = TagMu(TagMu(TagMu('x', tag='b', cl='k'), tag='p', id='p1'), TagMu(TagMu(tag='b'), tag='p', id='p2'), tag='div')
+def _tree_matches() -> list[tuple[str,str]]:
+  return [(n.tag, n.id) for n in _tree.find_all('p')] + [(n.tag, n.cl) for n in _tree.find_all(cl='k')]
+_tree_walked = _tree_matches()
+_tree.index()
+utest(_tree_walked, _tree_matches)
+utest(_tree, lambda: _tree.find('p', id='p2').parent)
+utest('p2', lambda: _tree.find('p', id='p1').next('p').id)
+_tree.find('p', id='p2').append(TagMu(tag='b', cl='k')) # Invalidates the index.
+utest(2, lambda: len(list(_tree.find_all(cl='k'))))
+
+def _bin_round_trip(node:Mu) -> Mu:
+  f = BytesIO()
+  node.dump_bin(f)
+  f.seek(0)
+  return Xml.load_bin(f)
+
+_bin_doc = Xml(tag='div', id='d', n=1, _=[Xml(tag='p', hidden=Present(True), _=['a & b', EscapedStr('<i>x</i>')]), 'tail'])
+_bin_plain = Xml(tag='div', id='d', n=1, l=[1, 'x'], _=[Xml(tag='p', _=['a & b']), 'tail'])
+utest(_bin_plain, _bin_round_trip, _bin_plain)
+# `Present` and `EscapedStr` do not define equality, so compare rendered output.
+utest(_bin_doc.render_str(), lambda: _bin_round_trip(_bin_doc).render_str())
+utest_exc(ValueError, Xml.load_bin, BytesIO(b'\x90'))
+
+_bin_tuples = Xml(tag='div', t=(1, 'x'), l=[1, (2, 3)], p=Present(True, val=(4,)))
+utest({'t': (1, 'x'), 'l': [1, (2, 3)]}, lambda: {k: v for k, v in _bin_round_trip(_bin_tuples).attrs.items() if k != 'p'})
+utest((4,), lambda: _bin_round_trip(_bin_tuples).attrs['p'].val)
+
+def _bin_html_types() -> list[str]:
+  f = BytesIO()
+  Div(P('x'), Svg(Circle(r=1))).dump_bin(f)
+  f.seek(0)
+  root = HtmlNode.load_bin(f)
+  return [type(n).__name__ for n in [root, *root.find_all()]]
+
+utest(['Div', 'P', 'Svg', 'Circle'], _bin_html_types) # Svg children dispatch through `Svg.tag_types`.
+
+_raw_a = TagMu.raw(children=['a'], tag='p')
+_raw_b = TagMu.raw(tag='p')
+_raw_a['id'] = 'x' # Replaces the shared empty attrs with a dict.
+utest(TagMu('a', tag='p', id='x'), lambda: _raw_a)
+utest({}, lambda: dict(_raw_b.attrs))
+utest_exc(KeyError, _raw_b.__delitem__, 'id')
+_raw_sub = _raw_b.subnode(parent=_raw_a) # The subnode aliases the attrs, so writes through either are shared.
+_raw_b['id'] = 'y'
+utest('y', _raw_sub.get, 'id')
+_raw_sub['class'] = 'c'
+utest('c', _raw_b.get, 'class')
+
+_clean_p0 = TagMu(' a ', 'b', tag='p')
+_clean_p1 = TagMu(tag='p')
+_clean_doc = TagMu(_clean_p0, '  ', _clean_p1, tag='div')
+utest(MuCleanStats(nodes_visited=3, nodes_changed=2, strings_merged=1, strings_removed=1), _clean_doc.clean)
+utest([_clean_p0, _clean_p1], lambda: _clean_doc._) # The whitespace between the paragraphs is removed.
+utest(['a b'], lambda: _clean_p0._)
+utest(3, lambda: _clean_doc.clean().nodes_skipped) # Already clean.
+_clean_p1.append('  x  ')
+utest(1, lambda: _clean_doc.clean().nodes_changed)
+utest(['x'], lambda: _clean_p1._)
+
+_deep = _deep_leaf = TagMu('  deep  ', tag='div')
+for _ in range(5000): _deep = TagMu(_deep, tag='div')
+_deep.clean() # Does not recurse.
+utest(['deep'], lambda: _deep_leaf._)
+
+_chunks_doc = TagMu(*(TagMu(f'row {i} & more', tag='p', id=i) for i in range(2000)), tag='div')
+utest(_chunks_doc.render_str(), lambda: ''.join(_chunks_doc.render_chunks(chunk_size=1000)))
+utest(True, lambda: len(list(_chunks_doc.render_chunks(chunk_size=1000))) > 10)
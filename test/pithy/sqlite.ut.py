@@ -1,4 +1,28 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
 from pithy.sqlite import *
+from pithy.sqlite.profile import is_full_scan_detail, normalize_sql
+from pithy.sqlite.schema import FtsIndex
+from pithy.sqlite.util import sql_fts_query_words
 from utest import utest
+
+
+utest('SELECT * FROM t WHERE a = ? AND b = ?', normalize_sql, "SELECT *\n  FROM t WHERE a = :a AND b = 'x''y'")
+utest('SELECT t1.a FROM t1 WHERE x = ?', normalize_sql, 'SELECT t1.a FROM t1 WHERE x = -1.5e3 -- ?;')
+utest('SELECT * FROM "t 2" LIMIT ?', normalize_sql, 'SELECT * FROM "t 2" /* c */ LIMIT 10;')
+utest('SELECT ?, max(?) FROM t WHERE b = ?', normalize_sql, "SELECT x'ab', max('a') FROM t WHERE b = X''")
+utest('SELECT a - ? FROM t', normalize_sql, 'SELECT a -1 FROM t') # Binary minus.
+utest('SELECT a - ? FROM t', normalize_sql, 'SELECT a - 1 FROM t')
+utest('SELECT a + ?, (?) FROM t', normalize_sql, 'SELECT a+1, (-2) FROM t')
+utest('SELECT ?, ? FROM t WHERE a = ? LIMIT ?', normalize_sql, 'SELECT -1, + 2 FROM t WHERE a = -3 LIMIT -1')
+
+utest(True, is_full_scan_detail, 'SCAN t')
+utest(False, is_full_scan_detail, 'SCAN t USING COVERING INDEX t_a')
+utest(False, is_full_scan_detail, 'SEARCH t USING INDEX t_a (a=?)')
+utest(False, is_full_scan_detail, 'SCAN CONSTANT ROW')
+
+utest('"fox" "and" "dog-s"*', sql_fts_query_words, ' fox and dog-s ')
+utest('"say" """hi"""', sql_fts_query_words, 'say "hi"', prefix=False)
+
+_fts = FtsIndex('doc_fts', 'doc', columns=('title', 'body'), content_rowid='id', tokenize='porter unicode61', prefix=(2, 3))
+utest(_fts, FtsIndex.parse_sql, _fts.sql())
@@ -0,0 +1,50 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+
+from pithy.sqlite import Conn
+from pithy.sqlite.cache import DataVersionCache
+from utest import utest, utest_exc, utest_val
+
+
+utest_exc(ValueError, DataVersionCache, max_size=0)
+
+
+with TemporaryDirectory(prefix='pithy-sqlite-test-') as tmp_dir:
+  path = path_join(tmp_dir, 'test.sqlite')
+  conn = Conn(path)
+  other = Conn(path)
+  conn.execute('CREATE TABLE t (a INTEGER)')
+  conn.executemany('INSERT INTO t (a) VALUES (?)', [(i,) for i in range(3)])
+
+  cache = DataVersionCache[str,int](max_size=2)
+  def count() -> int: return cache.get(conn, 'count', lambda: conn.cursor().execute('SELECT count(*) FROM t').one_col())
+
+  utest(3, count)
+  utest(3, count)
+  utest_val((1, 1), (cache.hits, cache.misses), 'hit')
+
+  conn.execute('INSERT INTO t (a) VALUES (3)') # Write through the same connection.
+  utest(4, count)
+  utest_val((1, 2), (cache.hits, cache.misses), 'invalidated by own write')
+
+  other.execute('INSERT INTO t (a) VALUES (4)') # Commit through another connection.
+  utest(5, count)
+  utest_val((1, 3), (cache.hits, cache.misses), 'invalidated by other connection')
+
+  other.cursor().execute('SELECT count(*) FROM t').one_col() # Reads do not invalidate.
+  utest(5, count)
+  utest_val((2, 3), (cache.hits, cache.misses), 'hit after read')
+
+  # Entries are kept per connection.
+  utest(5, cache.get, other, 'count', lambda: 5)
+  utest_val((2, 4), (cache.hits, cache.misses), 'miss for other connection')
+
+  # The oldest entry is evicted when the connection's entries are full.
+  cache.get(conn, 'a', lambda: 1)
+  cache.get(conn, 'b', lambda: 2)
+  utest(3, cache.get, conn, 'count', lambda: 3)
+
+  other.close()
+  conn.close()
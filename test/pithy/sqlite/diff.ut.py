@@ -0,0 +1,54 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+
+from pithy.sqlite import Conn
+from pithy.sqlite.diff import diff_table_rows, RowDiff
+from utest import utest, utest_exc
+
+
+def summarize(diffs:list[RowDiff]) -> list[tuple]:
+  return [(d.kind, d.key, d.a and tuple(d.a), d.b and tuple(d.b)) for d in diffs]
+
+
+with TemporaryDirectory(prefix='pithy-sqlite-test-') as tmp_dir:
+  conn_a = Conn(path_join(tmp_dir, 'a.sqlite'))
+  conn_b = Conn(path_join(tmp_dir, 'b.sqlite'))
+  for conn in (conn_a, conn_b):
+    conn.execute('CREATE TABLE t (name TEXT, n INTEGER)')
+    conn.executemany('INSERT INTO t (rowid, name, n) VALUES (?, ?, ?)', [(i, f'r{i}', i) for i in range(1, 101)])
+  conn_a.execute('DELETE FROM t WHERE rowid = 5')
+  conn_b.execute('UPDATE t SET n = -1 WHERE rowid = 50')
+  conn_b.execute("INSERT INTO t (rowid, name, n) VALUES (1000, 'new', 0)")
+
+  expected = [
+    ('added', 5, None, ('r5', 5)),
+    ('changed', 50, ('r50', 50), ('r50', -1)),
+    ('added', 1000, None, ('new', 0)),
+  ]
+  utest(expected, lambda: summarize(list(diff_table_rows(conn_a, conn_b, 't', block_size=8))))
+  utest(expected, lambda: summarize(list(diff_table_rows(conn_a, conn_b, 't', block_size=8, parallel=True))))
+  first_b = next(diff_table_rows(conn_a, conn_b, 't')).b
+  assert first_b is not None
+  utest(['name', 'n'], first_b.keys) # No synthetic rowid column.
+  utest([], lambda: list(diff_table_rows(conn_a, conn_a, 't')))
+
+  # WITHOUT ROWID tables are merged in the order of the declared primary key collation.
+  for conn, rows in ((conn_a, [('a', 1), ('B', 2), ('c', 3)]), (conn_b, [('A', 1), ('b', 5), ('d', 4)])):
+    conn.execute('CREATE TABLE w (k TEXT COLLATE NOCASE PRIMARY KEY, v INTEGER) WITHOUT ROWID')
+    conn.executemany('INSERT INTO w (k, v) VALUES (?, ?)', rows)
+  utest([
+    ('changed', ('a',), ('a', 1), ('A', 1)),
+    ('changed', ('B',), ('B', 2), ('b', 5)),
+    ('removed', ('c',), ('c', 3), None),
+    ('added', ('d',), None, ('d', 4)),
+  ], lambda: summarize(list(diff_table_rows(conn_a, conn_b, 'w'))))
+
+  for conn in (conn_a, conn_b):
+    conn.create_collation('REVERSE', lambda x, y: (x < y) - (x > y))
+    conn.execute('CREATE TABLE r (k TEXT COLLATE REVERSE PRIMARY KEY) WITHOUT ROWID')
+  utest_exc(ValueError, lambda: list(diff_table_rows(conn_a, conn_b, 'r')))
+
+  conn_a.close()
+  conn_b.close()
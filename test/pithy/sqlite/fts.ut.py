@@ -0,0 +1,63 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from dataclasses import replace
+
+from pithy.sqlite import Conn
+from pithy.sqlite.migration import gen_migration, run_migration
+from pithy.sqlite.schema import Column, FtsIndex, Schema, Table
+from utest import utest, utest_exc, utest_val
+
+
+docs = Table('docs', columns=(Column('id', int, is_primary=True, is_unique=True), Column('title', str), Column('body', str)))
+fts = FtsIndex('docs_fts', 'docs', columns=('title', 'body'))
+schema = Schema(name='main', structures=[docs, fts])
+
+
+def search_ids(conn:Conn, query:str, table:str='docs') -> list[int]:
+  return [row['id'] for row in conn.cursor().search(table, query)]
+
+
+with Conn(':memory:') as conn:
+  conn.execute(docs.sql())
+  conn.executemany('INSERT INTO docs (id, title, body) VALUES (?, ?, ?)',
+    [(1, 'Apples', 'red fruit'), (2, 'Pears', 'green apple pie'), (3, 'Plums', 'purple')])
+
+  # Creating the index populates it from the existing rows.
+  mig = gen_migration(conn=conn, schema=schema)
+  utest_val(['CREATE VIRTUAL TABLE', 'CREATE TRIGGER', 'CREATE TRIGGER', 'CREATE TRIGGER', 'INSERT INTO'],
+    [str(stmt).split(' main.')[0] for stmt in mig], 'create migration')
+  run_migration(conn, mig, backup=False)
+  utest([], gen_migration, conn=conn, schema=schema) # Unchanged index: no-op.
+
+  utest_val([2], search_ids(conn, 'apple'), 'search')
+  utest_val([1, 2], sorted(search_ids(conn, 'apple*')), 'prefix search')
+  utest_val([2], search_ids(conn, 'apple', table='docs_fts'), 'search by index name')
+  row = conn.cursor().search('docs', 'pie', highlight=('[', ']')).one()
+  utest_val(('Pears', 'green apple [pie]'), (row['title_highlight'], row['body_highlight']), 'highlights')
+  utest_exc(ValueError, conn.cursor().search, 'nonexistent', 'apple')
+
+  # The sync triggers keep the index current.
+  conn.execute("INSERT INTO docs (id, title, body) VALUES (4, 'Cider', 'pressed apple juice')")
+  conn.execute("UPDATE docs SET body = 'baked' WHERE id = 2")
+  conn.execute('DELETE FROM docs WHERE id = 1')
+  utest_val([4], search_ids(conn, 'apple'), 'search after writes')
+  utest_val([2], search_ids(conn, 'baked'), 'search updated row')
+
+  # A changed definition recreates and rebuilds the index.
+  prefix_schema = Schema(name='main', structures=[docs, replace(fts, prefix=(2,))])
+  mig = gen_migration(conn=conn, schema=prefix_schema)
+  utest_val(True, any(str(stmt).startswith('DROP TABLE') for stmt in mig), 'changed index dropped')
+  utest_val(True, str(mig[-1]).endswith("VALUES ('rebuild')"), 'changed index rebuilt')
+  run_migration(conn, mig, backup=False)
+  utest([], gen_migration, conn=conn, schema=prefix_schema)
+  utest_val([4], search_ids(conn, 'ap*'), 'search after rebuild')
+
+  # Changing the indexed columns regenerates the sync triggers.
+  title_schema = Schema(name='main', structures=[docs, replace(fts, columns=('title',))])
+  mig = gen_migration(conn=conn, schema=title_schema)
+  utest_val(3, sum(str(stmt).startswith('DROP TRIGGER') for stmt in mig), 'triggers dropped')
+  run_migration(conn, mig, backup=False)
+  utest([], gen_migration, conn=conn, schema=title_schema)
+  utest_val([], search_ids(conn, 'apple'), 'body no longer indexed')
+  conn.execute("UPDATE docs SET title = 'Apple cider' WHERE id = 4")
+  utest_val([4], search_ids(conn, 'apple'), 'regenerated update trigger')
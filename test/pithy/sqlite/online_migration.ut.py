@@ -0,0 +1,82 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+from typing import Iterator
+
+from pithy.sqlite import Conn
+from pithy.sqlite import migration
+from pithy.sqlite.migration import gen_migration, RebuildTable, run_online_migration
+from pithy.sqlite.schema import Column, Index, Schema, Table
+from utest import utest, utest_val
+
+
+_id = Column('id', int, is_primary=True, is_unique=True)
+_a = Column('a', str)
+_b = Column('b', int, is_opt=True)
+old_table = Table('t', columns=(_id, _a, _b))
+new_table = Table('t', columns=(_id, _b, _a)) # Reordered columns require a rebuild.
+index_a = Index('t_a', 't', columns=('a',))
+index_b = Index('t_b', 't', is_unique=True, columns=('b',), where='b IS NOT NULL')
+index_ab = Index('t_ab', 't', columns=('a', 'b DESC'))
+
+
+with TemporaryDirectory(prefix='pithy-sqlite-test-') as tmp_dir:
+  path = path_join(tmp_dir, 'test.sqlite')
+  conn = Conn(path)
+  conn.execute(old_table.sql())
+  conn.execute(index_a.sql())
+  conn.executemany('INSERT INTO t (id, a, b) VALUES (?, ?, ?)', [(i, f'a{i}', i) for i in range(1, 1001)])
+  expected:dict[int,tuple[int|None,str]] = {i: (i, f'a{i}') for i in range(1, 1001)}
+
+  schema = Schema(name='main', structures=[new_table, index_a, index_b, index_ab])
+  mig = gen_migration(conn=conn, schema=schema)
+  utest_val(1, sum(isinstance(step, RebuildTable) for step in mig), 'one rebuild')
+
+  # Write through a second connection between batches: update and delete copied and uncopied rows, and insert rows.
+  writer = Conn(path)
+  batch_count = 0
+  shadow_index_names:list[str] = []
+  orig_iter = migration._Batches.__iter__
+
+  def iter_with_writes(self:migration._Batches) -> Iterator[None]:
+    global batch_count
+    for _ in orig_iter(self):
+      batch_count += 1
+      if batch_count == 1:
+        shadow_index_names.extend(writer.cursor().execute(
+          "SELECT name FROM sqlite_schema WHERE type = 'index' AND tbl_name = 't__rebuild_in_progress' ORDER BY name").col())
+      if batch_count > 12: # Each batch inserts a row past the end of the copy, so stop writing eventually.
+        yield None
+        continue
+      i = batch_count * 100
+      writer.execute('UPDATE t SET a = ? WHERE id IN (?, ?)', (f'u{i}', i - 50, i + 150))
+      writer.execute('DELETE FROM t WHERE id IN (?, ?)', (i - 10, i + 110))
+      writer.execute('INSERT INTO t (id, a, b) VALUES (?, ?, NULL)', (2000 + i, f'n{i}'))
+      for id_ in (i - 50, i + 150):
+        if id_ in expected: expected[id_] = (expected[id_][0], f'u{i}')
+      for id_ in (i - 10, i + 110): expected.pop(id_, None)
+      expected[2000 + i] = (None, f'n{i}')
+      yield None
+
+  migration._Batches.__iter__ = iter_with_writes # type: ignore[method-assign]
+  try: run_online_migration(conn, mig, batch_size=100, progress=False)
+  finally: migration._Batches.__iter__ = orig_iter # type: ignore[method-assign]
+  writer.close()
+
+  utest_val(True, batch_count >= 10, 'batches with writes')
+  # The non-unique indexes are built on the new table before the copy; the unique index is created after the swap.
+  utest_val(['t__rebuild_in_progress__index__t_a', 't__rebuild_in_progress__index__t_ab'], shadow_index_names,
+    'shadow indexes')
+  c = conn.cursor()
+  utest_val(expected, {row[0]: (row[1], row[2]) for row in c.execute('SELECT id, b, a FROM t')}, 'rows')
+  utest_val(['id', 'b', 'a'], [row[1] for row in c.execute('PRAGMA table_info(t)')], 'columns')
+  utest_val({index_a.sql(), index_b.sql(), index_ab.sql()},
+    set(c.execute("SELECT sql FROM sqlite_schema WHERE type = 'index' AND tbl_name = 't'").col()), 'index sql')
+  utest_val([('ok',)], [tuple(row) for row in c.execute('PRAGMA integrity_check')], 'integrity')
+  utest_val(True, 'INDEX t_b ' in c.execute('EXPLAIN QUERY PLAN SELECT a FROM t WHERE b = 1').fetchone()[3], 'index used')
+  utest([], gen_migration, conn=conn, schema=schema) # The migrated schema matches.
+  with Conn(path) as conn2: # A new connection reads the renamed indexes from the schema.
+    utest_val(3, len(conn2.cursor().execute("SELECT name FROM sqlite_schema WHERE type = 'index' AND tbl_name = 't'").fetchall()),
+      'index count')
+  conn.close()
@@ -0,0 +1,48 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from pithy.sqlite import Conn
+from utest import utest, utest_val
+
+
+conn = Conn(':memory:')
+conn.execute('CREATE TABLE t (a INTEGER)')
+conn.executemany('INSERT INTO t (a) VALUES (?)', [(i,) for i in range(5)])
+
+profiler = conn.start_profiling(explain_every=0)
+select = 'SELECT a FROM t WHERE a >= ?'
+
+c = conn.cursor()
+utest_val(3, len(c.execute(select, (2,)).fetchall()), 'fetchall rows')
+stats = profiler.stats_for(select)
+utest_val('SELECT a FROM t WHERE a >= ?', stats.sql, 'normalized sql')
+utest_val(1, stats.calls, 'calls after first execute')
+utest_val(3, stats.rows, 'rows after fetchall')
+utest_val(True, stats.traced >= 1, 'traced')
+utest_val(__file__, stats.top_caller and stats.top_caller[0], 'caller file')
+
+c.execute(select, (0,))
+utest_val(1, len(c.fetchmany(1)), 'fetchmany rows')
+utest_val(1, c.fetchone()[0], 'fetchone row')
+utest_val(3, len(list(c)), 'iterated rows')
+utest_val(2, stats.calls, 'calls after second execute')
+utest_val(8, stats.rows, 'rows after second execute')
+
+conn.execute('INSERT INTO t (a) VALUES (?)', (9,))
+utest_val(1, profiler.stats_for('INSERT INTO t (a) VALUES (?)').rows, 'DML rowcount')
+
+# Fetching from a cursor after profiling stops, and after it restarts, must not fail or touch the new profile.
+c.execute(select, (0,))
+utest(profiler, conn.stop_profiling)
+utest_val(6, len(c.fetchall()), 'fetch after stop')
+utest_val(8, stats.rows, 'rows unchanged after stop')
+utest_val(True, type(conn.cursor()).__name__ == 'Cursor', 'plain cursor after stop')
+
+c.execute(select, (0,)) # Not profiled: the cursor checks the connection's profiler on each execute.
+profiler2 = conn.start_profiling(explain_every=0)
+utest_val(6, len(c.fetchall()), 'fetch after restart')
+utest_val({}, {s.sql: s.rows for s in profiler2.stats.values() if s.rows}, 'no rows in new profile')
+c.execute(select, (4,))
+utest_val(2, len(c.fetchall()), 'fetch in new profile')
+utest_val(2, profiler2.stats_for(select).rows, 'rows in new profile')
+conn.stop_profiling()
+conn.close()
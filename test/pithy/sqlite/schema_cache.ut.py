@@ -0,0 +1,60 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+import sqlite3
+from os import listdir, remove
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+
+from pithy.sqlite.schema import SchemaCache
+from utest import utest, utest_val
+
+
+def create_db(path:str, *statements:str) -> sqlite3.Connection:
+  conn = sqlite3.connect(path)
+  for stmt in statements: conn.execute(stmt)
+  conn.commit()
+  return conn
+
+
+with TemporaryDirectory(prefix='pithy-sqlite-test-') as tmp_dir:
+  cache = SchemaCache()
+  path = path_join(tmp_dir, 'test.sqlite')
+
+  conn = create_db(path, 'CREATE TABLE t (a INTEGER)')
+  version = conn.execute('PRAGMA schema_version').fetchone()[0]
+  utest_val(('a',), cache.introspect(conn).tables['t'].material_column_names, 'initial columns')
+  utest_val(True, cache.introspect(conn) is cache.introspect(conn), 'cache hit')
+  conn.close()
+
+  # A database recreated at the same path starts over at the same schema_version.
+  remove(path)
+  conn = create_db(path, 'CREATE TABLE t (a INTEGER, b TEXT)')
+  utest_val(version, conn.execute('PRAGMA schema_version').fetchone()[0], 'recreated schema_version')
+  utest_val(('a', 'b'), cache.introspect(conn).tables['t'].material_column_names, 'recreated columns')
+
+  # A schema change bumps the version.
+  conn.execute('ALTER TABLE t ADD COLUMN c REAL')
+  conn.execute('CREATE INDEX t_lower_b ON t (lower(b), a DESC) WHERE c > 0')
+  intro = cache.introspect(conn)
+  utest_val(version + 2, intro.schema_version, 'bumped schema_version')
+  utest_val(('a', 'b', 'c'), intro.tables['t'].material_column_names, 'bumped columns')
+  utest_val({}, intro.errors, 'no errors')
+  utest_val(('lower(b)', 'a DESC'), intro.indexes['t_lower_b'].columns, 'expression index columns')
+  utest_val('c > 0', intro.indexes['t_lower_b'].where, 'expression index where')
+
+  conn.execute('CREATE INDEX t_a ON t (a)')
+  conn.execute('CREATE INDEX t_ab ON t (a, b DESC)')
+  conn.execute('CREATE INDEX t_b_nocase ON t (b COLLATE NOCASE)')
+  indexes = cache.introspect(conn).indexes
+  utest_val(('a',), indexes['t_a'].columns, 'plain index columns')
+  utest_val(('a', 'b DESC'), indexes['t_ab'].columns, 'descending index columns')
+  utest_val(('b COLLATE NOCASE',), indexes['t_b_nocase'].columns, 'collated index columns')
+  conn.close()
+
+  utest_val(['test.sqlite'], listdir(tmp_dir), 'no sidecar by default')
+
+  conn = create_db(path)
+  intro = SchemaCache(persist=True).introspect(conn)
+  utest_val(True, path + '-pithy-schema.pickle' in [path_join(tmp_dir, n) for n in listdir(tmp_dir)], 'persisted sidecar')
+  utest(intro, SchemaCache(persist=True).introspect, conn) # Loaded from the sidecar.
+  conn.close()
@@ -0,0 +1,39 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os import mkdir
+from os.path import join as path_join
+from tempfile import TemporaryDirectory
+
+from pithy.sqlite import Conn
+from pithy.sqlite.stats import db_stats, dbstat_available, exact_row_counts, stat1_row_count, stat1_row_counts
+from utest import utest, utest_val
+
+
+with TemporaryDirectory(prefix='pithy-sqlite-test-') as tmp_dir:
+  dir_path = path_join(tmp_dir, 'a?b#c%20d') # URI metacharacters must be escaped for the read-only worker connections.
+  mkdir(dir_path)
+  conn = Conn(path_join(dir_path, 'test.sqlite'))
+  conn.execute('CREATE TABLE t (n INTEGER)')
+  conn.execute('CREATE INDEX t_n ON t (n)')
+  conn.execute('CREATE TABLE u (n INTEGER)')
+  conn.executemany('INSERT INTO t (n) VALUES (?)', [(i,) for i in range(300)])
+  conn.executemany('INSERT INTO u (n) VALUES (?)', [(i,) for i in range(7)])
+
+  utest({'t': 300, 'u': 7}, exact_row_counts, conn, tables=['t', 'u'], workers=2)
+  utest({'t': 300, 'u': 7}, exact_row_counts, conn, tables=['t', 'u'], workers=1)
+
+  utest({}, stat1_row_counts, conn)
+  utest(None, stat1_row_count, conn, table='t')
+  conn.execute('ANALYZE')
+  utest({'t': 300, 'u': 7}, stat1_row_counts, conn)
+  utest(300, stat1_row_count, conn, table='t')
+  utest(None, stat1_row_count, conn, table='missing')
+
+  stats = db_stats(conn, sizes=False)
+  utest_val((300, False), (stats.tables['t'].rows, stats.tables['t'].rows_exact), 'stat1 estimate')
+  if dbstat_available(conn):
+    stats = db_stats(conn, sizes=True)
+    utest_val((300, True), (stats.tables['t'].rows, stats.tables['t'].rows_exact), 'dbstat cell count')
+    index_stats = next(b for b in stats.btrees if b.name == 't_n')
+    utest_val((300, True), (index_stats.rows, index_stats.rows_exact), 'dbstat index cell count')
+  conn.close()
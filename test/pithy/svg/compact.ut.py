@@ -0,0 +1,29 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from array import array
+
+from pithy.svg import fmt_num, fmt_path, fmt_points, Path, Polyline, simplify_rdp
+from utest import utest, utest_exc
+
+
+utest('12.35', fmt_num, 12.3456, 2)
+utest('-.5', fmt_num, -0.5, 2)
+utest('0', fmt_num, -0.001, 2)
+utest('100', fmt_num, 100.0, 2)
+
+utest([0, 2, 3, 4], simplify_rdp, [(0, 0), (1, 0.01), (2, 0), (3, 5), (4, 0)], 0.1)
+
+_pts = [(0, 0), (1.5, 2), (3, -4.25)]
+utest('0,0 1.5,2 3,-4.25', fmt_points, _pts)
+utest('0,0 1.5,2 3,-4.2', fmt_points, _pts, precision=1)
+utest('0,0 1.5,2 3,-4.25', fmt_points, array('d', [0, 0, 1.5, 2, 3, -4.25]))
+utest('0,0 3,-4.25', fmt_points, array('d', [0, 0, 1.5, -2.1, 3, -4.25]), tolerance=0.1)
+utest_exc(Exception, Polyline, points=array('d', [0, 0, 1]))
+
+_d = [('M', 100, 100), ('L', 110.25, 100), ('L', 120.5, 100.001), ('L', 130, 100), ('l', 0, -10), ('Z',),
+  ('M', 200, 200), ('A', 5, 5, 0, 0, 1, 210, 210)]
+utest('M100,100 L110.25,100 L120.5,100.001 L130,100 l0,-10 Z M200,200 A5,5,0,0,1,210,210', lambda: Path(d=_d).attrs['d'])
+utest('m100,100 10.2,0 10.3,0 9.5,0 0-10zm100,100a5,5,0,0,1,10,10', fmt_path, _d, precision=1, relative=True)
+utest('m100,100 30,0 0-10zm100,100a5,5,0,0,1,10,10', lambda: Path(d=_d, precision=1, relative=True, tolerance=0.1).attrs['d'])
+utest('m0.1,0 0.2,0', fmt_path, [('M', 0.1, 0), ('L', 0.3, 0)], relative=True) # Offsets are not noisy without `precision`.
+utest_exc(ValueError, fmt_path, ['M0,0'], relative=True)
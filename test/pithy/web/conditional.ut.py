@@ -0,0 +1,60 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+import sys
+from hashlib import sha256
+from http import HTTPStatus
+
+from pithy.http import etag_list_matches, format_header_date
+from pithy.web import Response
+from pithy.web.app import EtagMode, WebApp
+from pithy.web.testing import make_local_dir, make_request, read_body
+from utest import utest, utest_val
+
+
+utest(True, etag_list_matches, '"a"', '"a"')
+utest(True, etag_list_matches, 'W/"a"', '"a"')
+utest(True, etag_list_matches, '"b", W/"a"', 'W/"a"')
+utest(True, etag_list_matches, '*', '"a"')
+utest(False, etag_list_matches, '"b"', '"a"')
+utest(False, etag_list_matches, '*', '')
+
+
+local_dir = make_local_dir({'app.js': 'console.log(1);\n'})
+
+
+def serve(app:WebApp, path:str='/app.js', **headers:str) -> Response:
+  request = make_request(path, **headers)
+  response = app.serve_content_from_local_fs(request)
+  app.fill_response_headers(request, response, close_connection=False)
+  read_body(response) # Close the file.
+  return response
+
+
+mode:EtagMode
+for mode in ('stat', 'weak', 'digest'):
+  app = WebApp(local_dir=local_dir, etag_mode=mode)
+  full = serve(app)
+  etag = full.headers['ETag']
+  assert isinstance(etag, str)
+  utest_val(mode == 'weak', etag.startswith('W/'), f'{mode} ETag: {etag}')
+  utest_val(HTTPStatus.NOT_MODIFIED, serve(app, **{'If-None-Match': etag}).status, f'{mode} If-None-Match')
+  utest_val(HTTPStatus.OK, serve(app, **{'If-None-Match': '"other"'}).status, f'{mode} If-None-Match mismatch')
+
+app = WebApp(local_dir=local_dir, etag_mode='digest', etag_digest='sha256')
+utest_val(f'"{sha256(b"console.log(1);\n").hexdigest()[:32]}"', serve(app).headers['ETag'], 'sha256 digest ETag')
+utest_val(False, 'pithy.digest' in sys.modules, 'hashlib digests do not import pithy.digest')
+
+
+app = WebApp(local_dir=local_dir, etag_mode='', cache_control=[('/*.js', 'max-age=3600'), ('*', 'no-cache')])
+full = serve(app)
+last_modified = str(full.headers['Last-Modified'])
+utest_val(False, 'ETag' in full.headers, 'no ETag')
+utest_val('max-age=3600', full.headers['Cache-Control'], 'Cache-Control policy')
+
+not_modified = serve(app, **{'If-Modified-Since': last_modified})
+utest_val(HTTPStatus.NOT_MODIFIED, not_modified.status, 'If-Modified-Since')
+utest_val(None, not_modified.body, '304 body')
+utest_val(False, 'Content-Length' in not_modified.headers, '304 Content-Length')
+utest_val('max-age=3600', not_modified.headers['Cache-Control'], '304 Cache-Control')
+utest_val(HTTPStatus.OK, serve(app, **{'If-Modified-Since': format_header_date(0)}).status, 'If-Modified-Since stale')
+utest_val('no-cache', serve(app, path='/').headers['Cache-Control'], 'fallback Cache-Control policy')
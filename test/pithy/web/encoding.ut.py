@@ -0,0 +1,44 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from gzip import decompress
+from os import utime
+
+from pithy.http import negotiate_content_codings
+from pithy.web.app import WebApp
+from pithy.web.testing import make_local_dir, serve
+from utest import utest, utest_val
+
+
+utest(['br', 'gzip'], negotiate_content_codings, 'gzip, deflate, br', ['br', 'zstd', 'gzip'])
+utest(['gzip', 'br'], negotiate_content_codings, 'br;q=0.5, gzip', ['br', 'zstd', 'gzip'])
+utest(['br', 'zstd'], negotiate_content_codings, '*, gzip;q=0', ['br', 'zstd', 'gzip'])
+utest(['gzip'], negotiate_content_codings, 'x-gzip', ['br', 'zstd', 'gzip'])
+utest([], negotiate_content_codings, 'identity', ['br', 'zstd', 'gzip'])
+
+
+text = b'body { color: red; }\n' * 200
+local_dir = make_local_dir({'style.css': text, 'style.css.gz': b'precompressed', 'app.js': text})
+
+
+app = WebApp(local_dir=local_dir, content_codings=['gzip'], compression_cache_size=1<<20)
+
+response, body = serve(app, '/style.css', **{'Accept-Encoding': 'gzip'})
+utest_val(('gzip', 'Accept-Encoding', b'precompressed'), (response.headers['Content-Encoding'], response.headers['Vary'], body),
+  'fresh precompressed sibling')
+
+response, body = serve(app, '/style.css')
+utest_val((False, text), ('Content-Encoding' in response.headers, body), 'identity')
+
+utime(f'{local_dir}/style.css.gz', (0, 0)) # Stale sibling.
+response, body = serve(app, '/style.css', **{'Accept-Encoding': 'gzip'})
+utest_val(text, decompress(body), 'stale sibling compressed on the fly')
+
+response, body = serve(app, '/app.js', **{'Accept-Encoding': 'gzip'})
+etag = response.headers['ETag']
+utest_val(('gzip', text), (response.headers['Content-Encoding'], decompress(body)), 'compressed on the fly')
+utest_val(True, str(etag).endswith('-gzip"'), 'coding-specific ETag')
+response, body = serve(app, '/app.js', **{'Accept-Encoding': 'gzip'})
+assert app.compression_cache is not None
+utest_val((1, 2), (app.compression_cache.hits, app.compression_cache.misses), 'compression cache counts')
+response, _ = serve(app, '/app.js', **{'Accept-Encoding': 'gzip', 'If-None-Match': str(etag)})
+utest_val(304, response.status, 'conditional request for compressed representation')
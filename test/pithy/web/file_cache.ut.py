@@ -0,0 +1,41 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from os import remove
+
+from pithy.web.app import WebApp
+from pithy.web.testing import make_local_dir, serve
+from utest import utest_val
+
+
+local_dir = make_local_dir({'icon.svg': '<svg/>', 'big.bin': bytes(1000)})
+
+
+app = WebApp(local_dir=local_dir, file_cache_size=1<<20, file_cache_max_file_size=100, file_cache_check_interval=0)
+assert app.file_cache is not None
+
+response, body = serve(app, '/icon.svg')
+utest_val((b'<svg/>', 'image/svg+xml'), (body, response.headers['Content-Type']), 'first response')
+utest_val('bytes', response.headers.get('Accept-Ranges'), 'first response accepts ranges')
+response, body = serve(app, '/icon.svg')
+utest_val(b'<svg/>', body, 'cached response')
+utest_val('bytes', response.headers.get('Accept-Ranges'), 'cached response accepts ranges')
+response, body = serve(app, '/icon.svg', Range='bytes=1-3')
+utest_val((206, b'svg'), (response.status, body), 'range request bypasses the cache')
+utest_val((1, 1), (app.file_cache.hits, app.file_cache.misses), 'hits and misses')
+response, body = serve(app, '/icon.svg', **{'If-None-Match': str(response.headers['ETag'])})
+utest_val(304, response.status, 'cached conditional response')
+
+with open(f'{local_dir}/icon.svg', 'w') as f: f.write('<svg></svg>')
+response, body = serve(app, '/icon.svg')
+utest_val((b'<svg></svg>', 1), (body, app.file_cache.invalidations), 'modified file is revalidated')
+
+with open(f'{local_dir}/icon.svg.gz', 'wb') as f: f.write(b'gz')
+response, body = serve(app, '/icon.svg', **{'Accept-Encoding': 'gzip'})
+utest_val(b'gz', body, 'distinct entry per acceptable codings')
+remove(f'{local_dir}/icon.svg.gz')
+response, body = serve(app, '/icon.svg', **{'Accept-Encoding': 'gzip'})
+utest_val(b'<svg></svg>', body, 'removed sibling is noticed')
+
+serve(app, '/big.bin')
+utest_val(2, len(app.file_cache), 'large files are not cached')
+utest_val({'file'}, set(app.cache_stats()), 'cache_stats')
@@ -0,0 +1,35 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from json import loads as json_loads
+
+from pithy.web import ResponseError
+from pithy.web.app import WebApp
+from pithy.web.testing import make_local_dir, serve
+from utest import utest_exc, utest_val
+
+
+local_dir = make_local_dir({'d/b.txt': 'xxx', 'd/A.txt': 'x', 'd/c.txt': 'xx'})
+
+
+def list_names(app:WebApp, query:str) -> list[str]:
+  response, body = serve(app, '/d/', query=query)
+  assert 'Content-Length' not in response.headers # Streamed.
+  return [e['name'] for e in json_loads(body)['entries']]
+
+
+app = WebApp(local_dir=local_dir, listing_cache_size=1<<16, listing_per_page=2)
+assert app.listing_cache is not None
+
+utest_val(['A.txt', 'b.txt'], list_names(app, 'format=json'), 'default sort and page size')
+utest_val(['c.txt'], list_names(app, 'format=json&page=2'), 'second page')
+utest_val(['b.txt', 'c.txt', 'A.txt'], list_names(app, 'format=json&sort=size&order=desc&per_page=0'), 'size descending')
+utest_val(['A.txt'], list_names(app, 'format=json&order=desc&page=2'), 'descending last page')
+utest_val((3, 1), (app.listing_cache.hits, app.listing_cache.misses), 'listing cache hits and misses')
+
+with open(f'{local_dir}/d/0.txt', 'w') as f: f.write('')
+utest_val(['0.txt', 'A.txt', 'b.txt', 'c.txt'], list_names(app, 'format=json&per_page=0'), 'new entry invalidates the listing')
+utest_val(1, app.listing_cache.invalidations, 'invalidations')
+
+utest_exc(ResponseError, list_names, app, 'sort=color')
+utest_exc(ResponseError, list_names, app, 'page=9')
+utest_exc(ResponseError, list_names, app, 'page=\u00b2') # Superscript two: `isdigit` but not `int`.
@@ -0,0 +1,31 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from http import HTTPStatus
+
+from pithy.web import ResponseError
+from pithy.web.app import WebApp
+from pithy.web.testing import make_local_dir, serve as serve_path
+from utest import utest, utest_exc
+
+
+app = WebApp(local_dir=make_local_dir({'data.bin': bytes(range(100))}))
+
+
+def serve(**headers:str) -> tuple[int,dict,bytes]:
+  response, body = serve_path(app, '/data.bin', **headers)
+  return response.status, response.headers, body
+
+
+status, headers, body = serve()
+utest(HTTPStatus.OK, lambda: status)
+utest(('bytes', 100, bytes(range(100))), lambda: (headers['Accept-Ranges'], headers['Content-Length'], body))
+
+status, headers, body = serve(Range='bytes=10-19')
+utest(HTTPStatus.PARTIAL_CONTENT, lambda: status)
+utest(('bytes 10-19/100', 10, bytes(range(10, 20))), lambda: (headers['Content-Range'], headers['Content-Length'], body))
+
+# If-Range without a matching validator sends the whole file.
+status, headers, body = serve(Range='bytes=10-19', **{'If-Range': '"nope"'})
+utest(HTTPStatus.OK, lambda: status)
+
+utest_exc(ResponseError(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE), serve, Range='bytes=100-')
@@ -0,0 +1,74 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from json import loads as json_loads
+
+from pithy.sqlite import Conn
+from pithy.sqlite.schema import Column, Table
+from pithy.web.squelch import Keyset, KeysetPage
+from starlette.datastructures import QueryParams
+from utest import utest, utest_exc, utest_val
+
+
+table = Table('t', columns=(Column('a', int), Column('b', int), Column('v', str)), primary_key=('a', 'b'))
+limit = 4
+all_keys = [(a, b) for a in range(3) for b in range(3)] # Nine rows.
+
+utest(Keyset(exprs=('t.a', 't.b'), desc=False), Keyset.for_table, table, t_abbr='t', order_by='')
+utest(Keyset(exprs=('t.a', 't.b'), desc=True), Keyset.for_table, table, t_abbr='t', order_by='a DESC, b DESC')
+utest(None, Keyset.for_table, table, t_abbr='t', order_by='v')
+
+
+def fetch(conn:Conn, keyset:Keyset, query:str) -> tuple[list[tuple[int,int]],tuple[bool,bool],str|None,str|None]:
+  'Fetch a page; return its keys in display order, (has_prev, has_next), and the encoded first and last keys.'
+  page = KeysetPage.from_params(QueryParams(query), key_len=len(keyset.exprs))
+  sql = keyset.query(columns_part=' t.a, t.b', from_clause='\nFROM t', where='', page=page, limit=limit)
+  rows = conn.cursor().execute(sql).fetchall()
+  has_more = len(rows) > limit
+  rows = rows[:limit]
+  if page.is_reversed: rows.reverse()
+  keys = [(row['a'], row['b']) for row in rows]
+  first_key = keyset.encode_key(rows[0]) if rows else None
+  last_key = keyset.encode_key(rows[-1]) if rows else None
+  return keys, page.has_prev_next(has_more), first_key, last_key
+
+
+with Conn(':memory:') as conn:
+  conn.execute(table.sql())
+  conn.executemany('INSERT INTO t (a, b, v) VALUES (?, ?, ?)', [(a, b, f'{a}{b}') for a, b in all_keys])
+
+  for desc in (False, True):
+    keyset = Keyset(exprs=('t.a', 't.b'), desc=desc)
+    ordered = sorted(all_keys, reverse=desc)
+    name = 'desc' if desc else 'asc'
+
+    keys, prev_next, first_key, last_key = fetch(conn, keyset, '')
+    utest_val((ordered[:4], (False, True)), (keys, prev_next), f'{name} first page')
+    utest_val(list(ordered[3]), json_loads(last_key or ''), f'{name} encoded key')
+
+    keys, prev_next, first_key, last_key = fetch(conn, keyset, f'after={last_key}')
+    utest_val((ordered[4:8], (True, True)), (keys, prev_next), f'{name} after')
+
+    keys, prev_next, _, _ = fetch(conn, keyset, f'after={last_key}')
+    utest_val((ordered[8:], (True, False)), (keys, prev_next), f'{name} after to the end')
+
+    keys, prev_next, _, _ = fetch(conn, keyset, f'before={first_key}')
+    utest_val((ordered[:4], (False, True)), (keys, prev_next), f'{name} before to the start')
+
+    keys, prev_next, first_key, _ = fetch(conn, keyset, 'last=1')
+    utest_val((ordered[5:], (True, False)), (keys, prev_next), f'{name} last')
+
+    keys, prev_next, _, _ = fetch(conn, keyset, f'before={first_key}')
+    utest_val((ordered[1:5], (True, True)), (keys, prev_next), f'{name} before')
+
+  # Partial pages at either end of the result.
+  keyset = Keyset(exprs=('t.a', 't.b'), desc=False)
+  utest_val(([(2, 0), (2, 1), (2, 2)], (True, False)), fetch(conn, keyset, 'after=[1,2]')[:2], 'after, near the end')
+  utest_val(([(0, 0)], (False, True)), fetch(conn, keyset, 'before=[0,1]')[:2], 'before, near the start')
+
+
+utest(KeysetPage(), KeysetPage.from_params, QueryParams(''), key_len=2)
+utest(KeysetPage(key=(1, 'x'), is_before=True), KeysetPage.from_params, QueryParams('before=[1,"x"]'), key_len=2)
+utest_exc(ValueError, KeysetPage.from_params, QueryParams('after=[1,'), key_len=2) # Invalid JSON.
+utest_exc(ValueError, KeysetPage.from_params, QueryParams('after=1'), key_len=2) # Not a list.
+utest_exc(ValueError, KeysetPage.from_params, QueryParams('after=[1]'), key_len=2) # Wrong length.
+utest_exc(ValueError, KeysetPage.from_params, QueryParams('before=[1,[2]]'), key_len=2) # Nested value.
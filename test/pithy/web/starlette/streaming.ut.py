@@ -0,0 +1,42 @@
+# Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
+
+from asyncio import run as asyncio_run
+
+from pithy.html import Div, P
+from pithy.web.starlette import (CsvResponse, HtmlResponse, HtmxResponse, StreamingCsvResponse, StreamingHtmlResponse,
+  StreamingHtmxResponse)
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from utest import utest_val
+
+
+page = Div(*(P(f'row {i} & <more>') for i in range(5000)))
+head = ('n', 'text')
+rows = [(i, f'a,{i}') for i in range(5000)]
+
+def html(request:Request) -> Response: return HtmlResponse(page)
+def html_streamed(request:Request) -> Response: return StreamingHtmlResponse(page, chunk_size=4096)
+def htmx(request:Request) -> Response: return HtmxResponse(page, 'tail', hx_trigger='done')
+def htmx_streamed(request:Request) -> Response: return StreamingHtmxResponse(page, 'tail', hx_trigger='done', chunk_size=4096)
+def csv(request:Request) -> Response: return CsvResponse(head=head, rows=rows)
+def csv_streamed(request:Request) -> Response: return StreamingCsvResponse(head=head, rows=iter(rows), chunk_size=4096)
+
+app = Starlette(routes=[Route(f'/{f.__name__}', f) for f in (html, html_streamed, htmx, htmx_streamed, csv, csv_streamed)])
+client = TestClient(app)
+
+for name in ('html', 'htmx', 'csv'):
+  expected = client.get(f'/{name}')
+  streamed = client.get(f'/{name}_streamed')
+  utest_val(expected.content, streamed.content, f'{name} streamed body')
+  utest_val(expected.headers['Content-Type'], streamed.headers['Content-Type'], f'{name} media type')
+  utest_val(expected.headers.get('HX-Trigger'), streamed.headers.get('HX-Trigger'), f'{name} htmx headers')
+
+
+async def count_chunks(response:StreamingResponse) -> int: return len([chunk async for chunk in response.body_iterator])
+
+utest_val(True, asyncio_run(count_chunks(StreamingHtmlResponse(page, chunk_size=4096))) > 10, 'html streamed in chunks')
+utest_val(True, asyncio_run(count_chunks(StreamingCsvResponse(head=head, rows=iter(rows), chunk_size=4096))) > 10,
+  'csv streamed in chunks')
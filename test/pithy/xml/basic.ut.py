@@ -1,5 +1,7 @@
 # Dedicated to the public domain under CC0: https://creativecommons.org/publicdomain/zero/1.0/.
 
+from io import BytesIO
+
 from pithy.markup import MultipleMatchesError, NoMatchError
 from pithy.xml import Xml
 from utest import utest, utest_exc, utest_seq, utest_val
@@ -49,3 +51,8 @@ utest_val(div1, sd1.orig, 'sd1.orig')
 
 utest(div1, sd0.next)
 utest(div0, sd1.prev)
+
+
+feed = b'<feed><item id="0"><t>A</t></item><skip/><item id="1"><t>B<item>nested</item></t></item></feed>'
+utest_seq(["<item id='0'><t>A</t></item>\n", "<item id='1'><t>\nB\n<item>nested</item>\n</t></item>\n"],
+  lambda: [item.render_str() for item in Xml.iterparse(BytesIO(feed), ['item'])])